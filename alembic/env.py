@@ -12,7 +12,10 @@ if config.config_file_name is not None:
     fileConfig(config.config_file_name)
 
 from app.db.base import Base
-from app.models import Notebook, Source, Conversation, ChatMessage, ApiKey, DocumentEmbedding
+from app.models import (
+    Notebook, Source, Conversation, ChatMessage, ApiKey, DocumentEmbedding,
+    IngestionJob, IngestionJobItem, EmbeddingCacheEntry
+)
 
 target_metadata = Base.metadata
 
@@ -0,0 +1,39 @@
+"""add ANN index on document embeddings
+
+Revision ID: 004
+Revises: 003
+Create Date: 2026-10-18
+
+"""
+from alembic import op
+from app.core import settings
+
+
+# revision identifiers, used by Alembic.
+revision = '004'
+down_revision = '003'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction block
+    with op.get_context().autocommit_block():
+        if settings.VECTOR_INDEX_TYPE == "ivfflat":
+            op.execute(
+                'CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_document_embeddings_embedding_ann '
+                'ON document_embeddings USING ivfflat (embedding vector_cosine_ops) '
+                f'WITH (lists = {int(settings.VECTOR_IVFFLAT_LISTS)})'
+            )
+        else:
+            op.execute(
+                'CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_document_embeddings_embedding_ann '
+                'ON document_embeddings USING hnsw (embedding vector_cosine_ops) '
+                f'WITH (m = {int(settings.VECTOR_HNSW_M)}, '
+                f'ef_construction = {int(settings.VECTOR_HNSW_EF_CONSTRUCTION)})'
+            )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.execute('DROP INDEX CONCURRENTLY IF EXISTS ix_document_embeddings_embedding_ann')
@@ -0,0 +1,67 @@
+"""add ingestion job queue
+
+Revision ID: 005
+Revises: 004
+Create Date: 2026-10-18
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = '005'
+down_revision = '004'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table('ingestion_jobs',
+        sa.Column('id', sa.BigInteger(), autoincrement=True, nullable=False),
+        sa.Column('public_id', postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column('notebook_id', sa.BigInteger(), nullable=False),
+        sa.Column('kind', sa.String(), nullable=False),
+        sa.Column('status', sa.String(), nullable=False, server_default='pending'),
+        sa.Column('attempts', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('error', sa.Text(), nullable=True),
+        sa.Column('locked_by', sa.String(), nullable=True),
+        sa.Column('locked_at', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+        sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+        sa.Column('finished_at', sa.DateTime(timezone=True), nullable=True),
+        sa.ForeignKeyConstraint(['notebook_id'], ['notebooks.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_ingestion_jobs_public_id', 'ingestion_jobs', ['public_id'], unique=True)
+    # Workers claim the oldest pending (or stale running) job
+    op.create_index(
+        'ix_ingestion_jobs_claimable', 'ingestion_jobs', ['created_at'],
+        postgresql_where=sa.text("status IN ('pending', 'running')")
+    )
+
+    op.create_table('ingestion_job_items',
+        sa.Column('id', sa.BigInteger(), autoincrement=True, nullable=False),
+        sa.Column('job_id', sa.BigInteger(), nullable=False),
+        sa.Column('position', sa.Integer(), nullable=False),
+        sa.Column('name', sa.String(), nullable=False),
+        sa.Column('source_type', sa.String(), nullable=False),
+        sa.Column('payload', postgresql.JSONB(astext_type=sa.Text()), nullable=False),
+        sa.Column('status', sa.String(), nullable=False, server_default='pending'),
+        sa.Column('source_id', sa.BigInteger(), nullable=True),
+        sa.Column('extracted_chars', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('chunked_count', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('embedded_count', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('error', sa.Text(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+        sa.ForeignKeyConstraint(['job_id'], ['ingestion_jobs.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['source_id'], ['sources.id'], ondelete='SET NULL'),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_ingestion_job_items_job_id', 'ingestion_job_items', ['job_id'])
+
+
+def downgrade() -> None:
+    op.drop_table('ingestion_job_items')
+    op.drop_table('ingestion_jobs')
@@ -0,0 +1,32 @@
+"""add embedding cache
+
+Revision ID: 006
+Revises: 005
+Create Date: 2026-10-18
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from pgvector.sqlalchemy import Vector
+
+
+# revision identifiers, used by Alembic.
+revision = '006'
+down_revision = '005'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table('embedding_cache',
+        sa.Column('model', sa.String(), nullable=False),
+        sa.Column('task_type', sa.String(), nullable=False),
+        sa.Column('content_hash', sa.String(length=64), nullable=False),
+        sa.Column('embedding', Vector(), nullable=False),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+        sa.PrimaryKeyConstraint('model', 'task_type', 'content_hash')
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('embedding_cache')
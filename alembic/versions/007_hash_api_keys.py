@@ -0,0 +1,36 @@
+"""store api keys as sha-256 hashes
+
+Revision ID: 007
+Revises: 006
+Create Date: 2026-10-18
+
+Downgrading cannot recover plaintext keys: the key column is restored with the
+hashes, so every existing API key has to be recreated.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '007'
+down_revision = '006'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('api_keys', sa.Column('key_hash', sa.String(length=64), nullable=True))
+    op.execute("UPDATE api_keys SET key_hash = encode(sha256(convert_to(key, 'UTF8')), 'hex')")
+    op.alter_column('api_keys', 'key_hash', nullable=False)
+    op.create_index('ix_api_keys_key_hash', 'api_keys', ['key_hash'], unique=True)
+    op.drop_constraint('api_keys_key_key', 'api_keys', type_='unique')
+    op.drop_column('api_keys', 'key')
+
+
+def downgrade() -> None:
+    op.add_column('api_keys', sa.Column('key', sa.String(), nullable=True))
+    op.execute("UPDATE api_keys SET key = key_hash")
+    op.alter_column('api_keys', 'key', nullable=False)
+    op.create_unique_constraint('api_keys_key_key', 'api_keys', ['key'])
+    op.drop_index('ix_api_keys_key_hash', table_name='api_keys')
+    op.drop_column('api_keys', 'key_hash')
@@ -0,0 +1,38 @@
+"""add keyset pagination indexes
+
+Revision ID: 008
+Revises: 007
+Create Date: 2026-10-18
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '008'
+down_revision = '007'
+branch_labels = None
+depends_on = None
+
+
+# List endpoints page on (created_at, id) within their parent
+INDEXES = [
+    ('ix_chat_messages_conversation_id_created_at', 'chat_messages', 'conversation_id, created_at, id'),
+    ('ix_conversations_notebook_id_created_at', 'conversations', 'notebook_id, created_at, id'),
+    ('ix_sources_notebook_id_created_at', 'sources', 'notebook_id, created_at, id'),
+    ('ix_notebooks_created_at', 'notebooks', 'created_at, id'),
+    ('ix_api_keys_created_at', 'api_keys', 'created_at, id'),
+]
+
+
+def upgrade() -> None:
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction block
+    with op.get_context().autocommit_block():
+        for name, table, columns in INDEXES:
+            op.execute(f'CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} ON {table} ({columns})')
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name, _, _ in INDEXES:
+            op.execute(f'DROP INDEX CONCURRENTLY IF EXISTS {name}')
@@ -0,0 +1,42 @@
+"""add foreign key and filter indexes
+
+Revision ID: 009
+Revises: 008
+Create Date: 2026-10-18
+
+chat_messages.conversation_id, conversations.notebook_id and sources.notebook_id
+are already the leading columns of the pagination indexes from 008.
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '009'
+down_revision = '008'
+branch_labels = None
+depends_on = None
+
+
+INDEXES = [
+    # ON DELETE CASCADE from sources and per-source enable/disable
+    ('ix_document_embeddings_source_id', 'document_embeddings (source_id)'),
+    # Counting and filtering the enabled embeddings of a notebook
+    ('ix_document_embeddings_notebook_id_enabled', 'document_embeddings (notebook_id) WHERE enabled'),
+    # ON DELETE CASCADE from notebooks
+    ('ix_ingestion_jobs_notebook_id', 'ingestion_jobs (notebook_id)'),
+    # ON DELETE SET NULL from sources
+    ('ix_ingestion_job_items_source_id', 'ingestion_job_items (source_id) WHERE source_id IS NOT NULL'),
+]
+
+
+def upgrade() -> None:
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction block
+    with op.get_context().autocommit_block():
+        for name, definition in INDEXES:
+            op.execute(f'CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} ON {definition}')
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name, _ in INDEXES:
+            op.execute(f'DROP INDEX CONCURRENTLY IF EXISTS {name}')
@@ -0,0 +1,32 @@
+"""add embedding counters to notebooks
+
+Revision ID: 010
+Revises: 009
+Create Date: 2026-10-18
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '010'
+down_revision = '009'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('notebooks', sa.Column('embedding_count', sa.Integer(), nullable=False, server_default='0'))
+    op.add_column('notebooks', sa.Column('enabled_count', sa.Integer(), nullable=False, server_default='0'))
+    op.execute(
+        'UPDATE notebooks SET embedding_count = counts.embedding_count, enabled_count = counts.enabled_count '
+        'FROM (SELECT notebook_id, count(*) AS embedding_count, count(*) FILTER (WHERE enabled) AS enabled_count '
+        'FROM document_embeddings GROUP BY notebook_id) AS counts '
+        'WHERE notebooks.id = counts.notebook_id'
+    )
+
+
+def downgrade() -> None:
+    op.drop_column('notebooks', 'enabled_count')
+    op.drop_column('notebooks', 'embedding_count')
@@ -0,0 +1,62 @@
+"""add full-text search column on document embeddings
+
+Revision ID: 011
+Revises: 010
+Create Date: 2026-10-18
+
+content_tsv is added as a plain nullable column, which does not rewrite
+document_embeddings, and a trigger fills it on insert and on updates of
+content. Existing rows are then backfilled in primary-key ranges, each
+committed on its own, and the GIN index is built concurrently, so no long
+lock is held on the table.
+"""
+from alembic import op
+from sqlalchemy import text
+from app.core import settings
+
+
+# revision identifiers, used by Alembic.
+revision = '011'
+down_revision = '010'
+branch_labels = None
+depends_on = None
+
+BACKFILL_BATCH_SIZE = 10000
+
+
+def upgrade() -> None:
+    op.execute('ALTER TABLE document_embeddings ADD COLUMN content_tsv tsvector')
+    op.execute(
+        'CREATE FUNCTION document_embeddings_content_tsv() RETURNS trigger AS $$ BEGIN '
+        f"NEW.content_tsv := to_tsvector('{settings.SEARCH_TEXT_CONFIG}'::regconfig, NEW.content); "
+        'RETURN NEW; END $$ LANGUAGE plpgsql'
+    )
+    op.execute(
+        'CREATE TRIGGER document_embeddings_content_tsv '
+        'BEFORE INSERT OR UPDATE OF content ON document_embeddings '
+        'FOR EACH ROW EXECUTE FUNCTION document_embeddings_content_tsv()'
+    )
+
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction block
+    with op.get_context().autocommit_block():
+        connection = op.get_bind()
+        last_id = connection.execute(text('SELECT coalesce(max(id), 0) FROM document_embeddings')).scalar()
+        for start in range(0, last_id, BACKFILL_BATCH_SIZE):
+            connection.execute(text(
+                'UPDATE document_embeddings '
+                'SET content_tsv = to_tsvector(CAST(:config AS regconfig), content) '
+                'WHERE id > :start AND id <= :end AND content_tsv IS NULL'
+            ), {'config': settings.SEARCH_TEXT_CONFIG, 'start': start, 'end': start + BACKFILL_BATCH_SIZE})
+
+        op.execute(
+            'CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_document_embeddings_content_tsv '
+            'ON document_embeddings USING gin (content_tsv)'
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.execute('DROP INDEX CONCURRENTLY IF EXISTS ix_document_embeddings_content_tsv')
+    op.execute('DROP TRIGGER IF EXISTS document_embeddings_content_tsv ON document_embeddings')
+    op.execute('DROP FUNCTION IF EXISTS document_embeddings_content_tsv()')
+    op.drop_column('document_embeddings', 'content_tsv')
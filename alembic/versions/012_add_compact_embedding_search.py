@@ -0,0 +1,67 @@
+"""add binary-quantised embeddings and the compact ANN index
+
+Revision ID: 012
+Revises: 011
+Create Date: 2026-10-18
+
+embedding_bits is added as a plain nullable column and backfilled in
+primary-key ranges, each committed on its own, so no long lock is held on
+document_embeddings. Rows inserted by the previous release while this runs
+stay NULL until the UPDATE below is run again (the vector storage report
+counts them). The ANN index built afterwards matches VECTOR_STORAGE:
+halfvec indexes embedding::halfvec(768), binary indexes embedding_bits.
+"""
+from alembic import op
+from sqlalchemy import text
+from app.core import settings
+
+
+# revision identifiers, used by Alembic.
+revision = '012'
+down_revision = '011'
+branch_labels = None
+depends_on = None
+
+BACKFILL_BATCH_SIZE = 10000
+
+INDEXES = {
+    'halfvec': ('ix_document_embeddings_embedding_half_ann', '(embedding::halfvec(768)) halfvec_cosine_ops'),
+    'binary': ('ix_document_embeddings_embedding_bits_ann', 'embedding_bits bit_hamming_ops'),
+}
+
+
+def upgrade() -> None:
+    op.execute('ALTER TABLE document_embeddings ADD COLUMN embedding_bits bit(768)')
+
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction block
+    with op.get_context().autocommit_block():
+        connection = op.get_bind()
+        last_id = connection.execute(text('SELECT coalesce(max(id), 0) FROM document_embeddings')).scalar()
+        for start in range(0, last_id, BACKFILL_BATCH_SIZE):
+            connection.execute(text(
+                'UPDATE document_embeddings SET embedding_bits = binary_quantize(embedding)::bit(768) '
+                'WHERE id > :start AND id <= :end AND embedding_bits IS NULL'
+            ), {'start': start, 'end': start + BACKFILL_BATCH_SIZE})
+
+        if settings.VECTOR_STORAGE in INDEXES:
+            name, column = INDEXES[settings.VECTOR_STORAGE]
+            if settings.VECTOR_INDEX_TYPE == "ivfflat":
+                op.execute(
+                    f'CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} ON document_embeddings '
+                    f'USING ivfflat ({column}) '
+                    f'WITH (lists = {int(settings.VECTOR_IVFFLAT_LISTS)})'
+                )
+            else:
+                op.execute(
+                    f'CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} ON document_embeddings '
+                    f'USING hnsw ({column}) '
+                    f'WITH (m = {int(settings.VECTOR_HNSW_M)}, '
+                    f'ef_construction = {int(settings.VECTOR_HNSW_EF_CONSTRUCTION)})'
+                )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name, _ in INDEXES.values():
+            op.execute(f'DROP INDEX CONCURRENTLY IF EXISTS {name}')
+    op.drop_column('document_embeddings', 'embedding_bits')
@@ -0,0 +1,103 @@
+"""store embeddings of any dimension with per-dimension ANN indexes
+
+Revision ID: 013
+Revises: 012
+Create Date: 2026-10-18
+
+Each notebook records the dimension of its embeddings. document_embeddings
+drops the fixed vector(768)/bit(768) sizes and every ANN index becomes
+partial on vector_dims(embedding), so notebooks can be moved between
+dimensions one at a time (scripts/reembed_notebook.py). The old indexes are
+dropped before the new ones are built, so searches fall back to sequential
+scans until this migration finishes; run it in a maintenance window on
+large tables.
+"""
+from alembic import op
+import sqlalchemy as sa
+from app.core import settings
+
+
+# revision identifiers, used by Alembic.
+revision = '013'
+down_revision = '012'
+branch_labels = None
+depends_on = None
+
+OLD_INDEXES = (
+    'ix_document_embeddings_embedding_ann',
+    'ix_document_embeddings_embedding_half_ann',
+    'ix_document_embeddings_embedding_bits_ann',
+)
+
+STORAGE_INDEXES = {
+    'full': ('ix_document_embeddings_embedding_ann', '(embedding::vector({dimensions})) vector_cosine_ops'),
+    'halfvec': ('ix_document_embeddings_embedding_half_ann', '(embedding::halfvec({dimensions})) halfvec_cosine_ops'),
+    'binary': ('ix_document_embeddings_embedding_bits_ann', '(embedding_bits::bit({dimensions})) bit_hamming_ops'),
+}
+
+
+def _create_index(dimensions: int) -> None:
+    prefix, column = STORAGE_INDEXES[settings.VECTOR_STORAGE]
+    if settings.VECTOR_INDEX_TYPE == "ivfflat":
+        options = f'lists = {int(settings.VECTOR_IVFFLAT_LISTS)}'
+    else:
+        options = (f'm = {int(settings.VECTOR_HNSW_M)}, '
+                   f'ef_construction = {int(settings.VECTOR_HNSW_EF_CONSTRUCTION)}')
+    op.execute(
+        f'CREATE INDEX CONCURRENTLY IF NOT EXISTS {prefix}_{dimensions} ON document_embeddings '
+        f'USING {settings.VECTOR_INDEX_TYPE} ({column.format(dimensions=dimensions)}) '
+        f'WITH ({options}) WHERE vector_dims(embedding) = {dimensions}'
+    )
+
+
+def upgrade() -> None:
+    op.add_column('notebooks', sa.Column('embedding_dimensions', sa.Integer(), nullable=False, server_default='768'))
+    # Cache keys now carry the output dimension: "<model>:<dimensions>"
+    op.execute(
+        "UPDATE embedding_cache SET model = model || ':' || vector_dims(embedding) "
+        "WHERE position(':' in model) = 0"
+    )
+
+    with op.get_context().autocommit_block():
+        for name in OLD_INDEXES:
+            op.execute(f'DROP INDEX CONCURRENTLY IF EXISTS {name}')
+
+    op.execute('ALTER TABLE document_embeddings ALTER COLUMN embedding TYPE vector')
+    op.execute('ALTER TABLE document_embeddings ALTER COLUMN embedding_bits TYPE bit varying')
+
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction block
+    with op.get_context().autocommit_block():
+        dimensions = {int(settings.EMBEDDING_DIMENSIONS)} | {
+            int(value) for value in op.get_bind().execute(
+                sa.text('SELECT DISTINCT embedding_dimensions FROM notebooks')
+            ).scalars()
+        }
+        for value in sorted(dimensions):
+            _create_index(value)
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        names = op.get_bind().execute(sa.text(
+            "SELECT indexname FROM pg_indexes WHERE tablename = 'document_embeddings' "
+            "AND indexname ~ '^ix_document_embeddings_embedding_(half_|bits_)?ann_[0-9]+$'"
+        )).scalars().all()
+        for name in names:
+            op.execute(f'DROP INDEX CONCURRENTLY IF EXISTS {name}')
+
+    # Fails if any notebook was moved off 768 dimensions; re-embed it back first
+    op.execute('ALTER TABLE document_embeddings ALTER COLUMN embedding TYPE vector(768)')
+    op.execute('ALTER TABLE document_embeddings ALTER COLUMN embedding_bits TYPE bit(768)')
+    op.execute(
+        "UPDATE embedding_cache SET model = split_part(model, ':', 1) WHERE model LIKE '%\\:768'"
+    )
+    op.execute("DELETE FROM embedding_cache WHERE position(':' in model) > 0")
+    op.drop_column('notebooks', 'embedding_dimensions')
+
+    with op.get_context().autocommit_block():
+        op.execute(
+            'CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_document_embeddings_embedding_ann '
+            'ON document_embeddings USING hnsw (embedding vector_cosine_ops) '
+            f'WITH (m = {int(settings.VECTOR_HNSW_M)}, '
+            f'ef_construction = {int(settings.VECTOR_HNSW_EF_CONSTRUCTION)})'
+        )
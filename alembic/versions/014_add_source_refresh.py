@@ -0,0 +1,63 @@
+"""record how sources were fetched and hash chunks for refreshes
+
+Revision ID: 014
+Revises: 013
+Create Date: 2026-10-18
+
+sources.payload keeps what is needed to fetch a source again (the url of a
+link, the drive id of a book), filled in from the ingestion job items that
+created them; links older than the job queue fall back to their view_url.
+content_hash, etag and last_modified describe the last fetched version.
+document_embeddings.content_hash is backfilled in primary-key ranges like
+migration 012, computing the same hex SHA-256 as the application.
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy import text
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = '014'
+down_revision = '013'
+branch_labels = None
+depends_on = None
+
+BACKFILL_BATCH_SIZE = 10000
+
+
+def upgrade() -> None:
+    op.add_column('sources', sa.Column('payload', postgresql.JSONB(), nullable=True))
+    op.add_column('sources', sa.Column('content_hash', sa.String(), nullable=True))
+    op.add_column('sources', sa.Column('etag', sa.String(), nullable=True))
+    op.add_column('sources', sa.Column('last_modified', sa.String(), nullable=True))
+    op.add_column('sources', sa.Column('refreshed_at', sa.DateTime(timezone=True), nullable=True))
+    op.add_column('document_embeddings', sa.Column('content_hash', sa.String(), nullable=True))
+
+    op.execute(
+        "UPDATE sources SET payload = items.payload - 'path' "
+        "FROM ingestion_job_items items "
+        "WHERE items.source_id = sources.id AND sources.type IN ('link', 'estante')"
+    )
+    op.execute(
+        "UPDATE sources SET payload = jsonb_build_object('url', view_url, 'view_url', view_url) "
+        "WHERE type = 'link' AND payload IS NULL AND view_url IS NOT NULL"
+    )
+
+    with op.get_context().autocommit_block():
+        connection = op.get_bind()
+        last_id = connection.execute(text('SELECT coalesce(max(id), 0) FROM document_embeddings')).scalar()
+        for start in range(0, last_id, BACKFILL_BATCH_SIZE):
+            connection.execute(text(
+                "UPDATE document_embeddings SET content_hash = encode(sha256(convert_to(content, 'UTF8')), 'hex') "
+                'WHERE id > :start AND id <= :end AND content_hash IS NULL'
+            ), {'start': start, 'end': start + BACKFILL_BATCH_SIZE})
+
+
+def downgrade() -> None:
+    op.drop_column('document_embeddings', 'content_hash')
+    op.drop_column('sources', 'refreshed_at')
+    op.drop_column('sources', 'last_modified')
+    op.drop_column('sources', 'etag')
+    op.drop_column('sources', 'content_hash')
+    op.drop_column('sources', 'payload')
@@ -0,0 +1,40 @@
+"""schedule link refreshes per notebook
+
+Revision ID: 015
+Revises: 014
+Create Date: 2026-10-18
+
+notebooks.link_refresh_hours overrides LINK_REFRESH_INTERVAL_HOURS (0 turns
+scheduled refreshes off for the notebook). sources.checked_at is when the
+scheduler last claimed a link. The partial index on (notebook_id, checked_at)
+finds the due links of each notebook that refreshes, whose interval differs
+per notebook, without scanning every source.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '015'
+down_revision = '014'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('notebooks', sa.Column('link_refresh_hours', sa.Integer(), nullable=True))
+    op.add_column('sources', sa.Column('checked_at', sa.DateTime(timezone=True), nullable=True))
+    op.add_column('sources', sa.Column('content_bytes', sa.BigInteger(), nullable=True))
+    with op.get_context().autocommit_block():
+        op.execute(
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_sources_link_due "
+            "ON sources (notebook_id, (coalesce(checked_at, created_at))) WHERE type = 'link'"
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.execute('DROP INDEX CONCURRENTLY IF EXISTS ix_sources_link_due')
+    op.drop_column('sources', 'content_bytes')
+    op.drop_column('sources', 'checked_at')
+    op.drop_column('notebooks', 'link_refresh_hours')
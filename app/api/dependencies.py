@@ -1,8 +1,12 @@
-from fastapi import Header, HTTPException, Depends
+from fastapi import Header, HTTPException, Depends, Query
 from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Optional
 from app.db.base import get_db
 from app.services import DatabaseService
+from app.services.api_key_cache import api_key_cache
 from app.core import settings
+from app.core.security import hash_api_key
+from app.utils.pagination import PageParams, decode_cursor
 
 
 async def verify_api_key(
@@ -10,7 +14,13 @@ async def verify_api_key(
     db: AsyncSession = Depends(get_db)
 ) -> str:
     """Verify API key for authentication."""
-    if not await DatabaseService.validate_api_key(db, x_api_key):
+    key_hash = hash_api_key(x_api_key)
+    valid = api_key_cache.get(key_hash)
+    if valid is None:
+        valid = await DatabaseService.validate_api_key(db, x_api_key)
+        api_key_cache.put(key_hash, valid)
+    
+    if not valid:
         raise HTTPException(status_code=401, detail="Invalid or inactive API key")
     
     return x_api_key
@@ -24,3 +34,16 @@ async def verify_master_key(
         raise HTTPException(status_code=403, detail="Invalid master key")
     
     return x_master_key
+
+
+async def get_page_params(
+    cursor: Optional[str] = None,
+    limit: int = Query(settings.PAGE_SIZE_DEFAULT, ge=1, le=settings.PAGE_SIZE_MAX)
+) -> PageParams:
+    """Keyset pagination parameters shared by the list endpoints."""
+    try:
+        after = decode_cursor(cursor) if cursor else None
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    
+    return PageParams(after=after, limit=limit)
@@ -0,0 +1,49 @@
+from fastapi import HTTPException
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from app.core import settings
+
+UPLOAD_PATH_SUFFIX = "/upload"
+
+
+class UploadSizeLimitMiddleware:
+    """
+    Caps the request body of uploads at INGESTION_MAX_UPLOAD_REQUEST_MB.
+
+    Starlette spools the whole multipart body before the endpoint runs, so
+    the per-file limit alone is checked only after an oversized upload has
+    been received. A declared Content-Length above the cap is rejected with
+    413 before anything is read; otherwise the received bytes are counted and
+    reading stops with 413 once they pass the cap.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http" or scope["method"] != "POST" or not scope["path"].endswith(UPLOAD_PATH_SUFFIX):
+            await self.app(scope, receive, send)
+            return
+
+        limit = settings.INGESTION_MAX_UPLOAD_REQUEST_MB * 1024 * 1024
+        detail = f"Uploads are limited to {settings.INGESTION_MAX_UPLOAD_REQUEST_MB} MB per request"
+        headers = dict(scope["headers"])
+        content_length = headers.get(b"content-length")
+        if content_length is not None and content_length.isdigit() and int(content_length) > limit:
+            response = JSONResponse({"detail": detail}, status_code=413, headers={"Connection": "close"})
+            await response(scope, receive, send)
+            return
+
+        received = 0
+
+        async def limited_receive() -> Message:
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > limit:
+                    # FastAPI re-raises HTTPExceptions from body parsing, so this becomes a 413 response
+                    raise HTTPException(status_code=413, detail=detail)
+            return message
+
+        await self.app(scope, limited_receive, send)
@@ -1,8 +1,11 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.ext.asyncio import AsyncSession
 from app.db.base import get_db
 from app.schemas.api_key import ApiKeyCreate
 from app.services import DatabaseService
+from app.api.dependencies import get_page_params
+from app.utils.pagination import PageParams
+from app.services.cache_invalidation import invalidation_bus
 import uuid as uuid_pkg
 
 router = APIRouter()
@@ -23,12 +26,29 @@ async def create_api_key(
 
 
 @router.get("")
-async def list_api_keys(db: AsyncSession = Depends(get_db)):
-    return await DatabaseService.get_all_api_keys(db)
+async def list_api_keys(
+    page: PageParams = Depends(get_page_params),
+    db: AsyncSession = Depends(get_db)
+):
+    return await DatabaseService.get_all_api_keys(db, page)
+
+
+@router.post("/{key_id}/revoke")
+async def revoke_api_key(key_id: str, db: AsyncSession = Depends(get_db)):
+    public_id = uuid_pkg.UUID(key_id)
+    key_hash = await DatabaseService.revoke_api_key(db, public_id)
+    if not key_hash:
+        raise HTTPException(status_code=404, detail="API key not found")
+    await invalidation_bus.publish(db, "api_key", key_hash)
+    await db.commit()
+    return {"message": "API key revoked"}
 
 
 @router.delete("/{key_id}")
 async def delete_api_key(key_id: str, db: AsyncSession = Depends(get_db)):
     public_id = uuid_pkg.UUID(key_id)
-    await DatabaseService.delete_api_key(db, public_id)
+    key_hash = await DatabaseService.delete_api_key(db, public_id)
+    if key_hash:
+        await invalidation_bus.publish(db, "api_key", key_hash)
+        await db.commit()
     return {"message": "API key deleted"}
@@ -1,16 +1,34 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Response
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
-from app.db.base import get_db
+from app.db.base import get_db, get_read_db, async_session_maker
 from app.schemas.conversation import ConversationCreate
 from app.schemas.chat_message import ChatRequest
 from app.services import DatabaseService, vector_store, llm_service
-from app.api.dependencies import verify_api_key
+from app.services.answer_cache import answer_cache, CachedAnswer
+from app.services.chat_history import chat_history
+from app.services.reranker import reranker
+from app.core import settings
+from app.api.dependencies import verify_api_key, get_page_params
+from app.utils.pagination import PageParams
+from app.utils.prompt import format_history
+from typing import AsyncIterator, List, Optional, Tuple
+import json
+import logging
 import uuid as uuid_pkg
 
+logger = logging.getLogger(__name__)
+
 router = APIRouter()
 
 NUM_RESULTS_RAG = 10
 
+EMPTY_NOTEBOOK_MESSAGE = "Por favor, faça upload de documentos antes de fazer perguntas."
+
+ANSWER_CACHE_HEADER = "X-Answer-Cache"
+
+TOKENS_SAVED_HEADER = "X-Context-Tokens-Saved"
+
 @router.post("/{notebook_id}/conversations")
 async def create_conversation(
     notebook_id: str,
@@ -29,6 +47,7 @@ async def create_conversation(
 @router.get("/{notebook_id}/conversations")
 async def get_conversations(
     notebook_id: str,
+    page: PageParams = Depends(get_page_params),
     db: AsyncSession = Depends(get_db),
     api_key: str = Depends(verify_api_key)
 ):
@@ -37,7 +56,7 @@ async def get_conversations(
     if not notebook:
         raise HTTPException(status_code=404, detail="Notebook not found")
     
-    return await DatabaseService.get_conversations(db, notebook.id)
+    return await DatabaseService.get_conversations(db, notebook.id, page)
 
 
 @router.delete("/conversations/{conversation_id}")
@@ -51,11 +70,95 @@ async def delete_conversation(
     return {"message": "Conversation deleted"}
 
 
+async def _retrieve_context(db: AsyncSession, notebook_id: int, message: str,
+                            query_embedding: Optional[List[float]] = None,
+                            request: Optional[ChatRequest] = None) -> Optional[Tuple[str, List[str], int]]:
+    """
+    Retrieve the context, source names and prompt tokens saved by reranking
+    for a question, or None if the notebook is empty.
+    """
+    count = await vector_store.get_collection_count(db, notebook_id)
+    if count == 0:
+        return None
+    
+    results = await vector_store.query(
+        db,
+        notebook_id,
+        message,
+        n_results=NUM_RESULTS_RAG * settings.RERANK_OVERFETCH if settings.RERANK_ENABLED else NUM_RESULTS_RAG,
+        collection_count=count,
+        query_embedding=query_embedding,
+        mode=request.search_mode if request else None,
+        lexical_weight=request.lexical_weight if request else None,
+        include_embeddings=settings.RERANK_ENABLED
+    )
+    
+    ranked = await reranker.select(message, results, NUM_RESULTS_RAG, settings.CHAT_CONTEXT_TOKEN_BUDGET)
+    logger.info(
+        "Context for notebook %s: %d chunks, %d tokens (%d saved)",
+        notebook_id, len(ranked.documents), ranked.tokens_used, ranked.tokens_saved
+    )
+    return "\n\n".join(ranked.documents), list(set(ranked.sources)), ranked.tokens_saved
+
+
+async def _prepare_question(db: AsyncSession, conversation_id: int, message: str) -> Tuple[str, str]:
+    """
+    Return the conversation history (within CHAT_HISTORY_TOKEN_BUDGET) and a
+    standalone version of message for retrieval. Call before storing message.
+    """
+    history = await chat_history.get(db, conversation_id)
+    if not history:
+        return "", message
+    
+    history_text = format_history(history, settings.CHAT_HISTORY_TOKEN_BUDGET)
+    question = message
+    if settings.CHAT_QUERY_REWRITE_ENABLED:
+        try:
+            question = await llm_service.condense_question(history_text, message)
+        except Exception:
+            logger.warning("Question rewrite failed, retrieving with the original message", exc_info=True)
+    return history_text, question
+
+
+async def _store_message(db: AsyncSession, conversation_id: int, role: str, content: str,
+                         sources: Optional[List[str]] = None):
+    message = await DatabaseService.add_chat_message(db, conversation_id, role, content, sources)
+    chat_history.append(conversation_id, role, content)
+    return message
+
+
+def _cacheable(history_text: str, request: ChatRequest) -> bool:
+    """
+    Whether the answer cache applies: cached answers are keyed by the question
+    alone, so follow-ups (answered with the history) and search overrides skip it.
+    """
+    return not history_text and request.search_mode is None and request.lexical_weight is None
+
+
+def _cache_header(cacheable: bool, cached: Optional[CachedAnswer]) -> str:
+    if not cacheable:
+        return "BYPASS"
+    return "HIT" if cached else "MISS"
+
+
+async def _lookup_answer(db: AsyncSession, notebook_id: int,
+                         message: str) -> Tuple[Optional[CachedAnswer], Optional[List[float]]]:
+    """Look the question up in the answer cache: exact text first, then query-embedding similarity."""
+    cached = answer_cache.get_exact(notebook_id, message)
+    if cached or not settings.ANSWER_CACHE_ENABLED:
+        return cached, None
+    
+    query_embedding = await vector_store.embed_query(message, await vector_store.get_dimensions(db, notebook_id))
+    return answer_cache.get_similar(notebook_id, query_embedding), query_embedding
+
+
 @router.post("/conversations/{conversation_id}/chat")
 async def chat(
     conversation_id: str,
     request: ChatRequest,
+    http_response: Response,
     db: AsyncSession = Depends(get_db),
+    read_db: AsyncSession = Depends(get_read_db),
     api_key: str = Depends(verify_api_key)
 ):
     public_id = uuid_pkg.UUID(conversation_id)
@@ -63,34 +166,131 @@ async def chat(
     if not conversation:
         raise HTTPException(status_code=404, detail="Conversation not found")
     
-    await DatabaseService.add_chat_message(db, conversation.id, "user", request.message)
+    history_text, question = await _prepare_question(db, conversation.id, request.message)
+    await _store_message(db, conversation.id, "user", request.message)
     
-    count = await vector_store.get_collection_count(db, conversation.notebook_id)
-    if count == 0:
-        response_text = "Por favor, faça upload de documentos antes de fazer perguntas."
-        await DatabaseService.add_chat_message(db, conversation.id, "assistant", response_text, [])
+    generation = answer_cache.generation(conversation.notebook_id)
+    cacheable = _cacheable(history_text, request)
+    cached, query_embedding = None, None
+    if cacheable:
+        cached, query_embedding = await _lookup_answer(db, conversation.notebook_id, question)
+    http_response.headers[ANSWER_CACHE_HEADER] = _cache_header(cacheable, cached)
+    if cached:
+        await _store_message(db, conversation.id, "assistant", cached.response, cached.sources)
+        return {"response": cached.response, "sources": cached.sources}
+    
+    retrieved = await _retrieve_context(read_db, conversation.notebook_id, question, query_embedding, request)
+    if retrieved is None:
+        response_text = EMPTY_NOTEBOOK_MESSAGE
+        await _store_message(db, conversation.id, "assistant", response_text, [])
         return {"response": response_text, "sources": []}
     
-    results = await vector_store.query(
-        db,
-        conversation.notebook_id,
-        request.message,
-        n_results=NUM_RESULTS_RAG
-    )
+    context, sources, tokens_saved = retrieved
+    http_response.headers[TOKENS_SAVED_HEADER] = str(tokens_saved)
+    response_text = await llm_service.generate_chat_response(context, request.message, history_text)
+    await _store_message(db, conversation.id, "assistant", response_text, sources)
+    if cacheable:
+        answer_cache.put(conversation.notebook_id, question, query_embedding, response_text, sources, generation)
     
-    context = "\n\n".join(results['documents'][0]) if results['documents'][0] else ""
-    sources = list(set([meta['filename'] for meta in results['metadatas'][0]])) if results['metadatas'] else []
+    return {"response": response_text, "sources": sources}
+
+
+def _sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+async def _stream_answer(conversation_id: int, notebook_id: int, message: str, question: str, history_text: str,
+                         cached: Optional[CachedAnswer], query_embedding: Optional[List[float]],
+                         retrieved: Optional[Tuple[str, List[str], int]],
+                         generation: Optional[int]) -> AsyncIterator[str]:
+    """
+    Emit sources, then token deltas, then a final event once the answer is
+    stored. The answer is cached unless generation is None.
+    """
+    if cached:
+        sources = cached.sources
+    else:
+        sources = retrieved[1] if retrieved else []
+    yield _sse("sources", {"sources": sources})
     
-    response_text = llm_service.generate_chat_response(context, request.message)
-    await DatabaseService.add_chat_message(db, conversation.id, "assistant", response_text, sources)
+    parts = []
+    if cached or retrieved is None:
+        text = cached.response if cached else EMPTY_NOTEBOOK_MESSAGE
+        parts.append(text)
+        yield _sse("delta", {"text": text})
+    else:
+        try:
+            # A client disconnect cancels this generator, which cancels the upstream generation
+            async for text in llm_service.stream_chat_response(retrieved[0], message, history_text):
+                parts.append(text)
+                yield _sse("delta", {"text": text})
+        except Exception as e:
+            logger.exception("Streaming chat response failed")
+            yield _sse("error", {"detail": str(e)})
+            return
     
-    return {"response": response_text, "sources": sources}
+    response_text = "".join(parts)
+    async with async_session_maker() as db:
+        assistant_message = await _store_message(db, conversation_id, "assistant", response_text, sources)
+    if not cached and retrieved is not None and generation is not None:
+        answer_cache.put(notebook_id, question, query_embedding, response_text, sources, generation)
+    yield _sse("done", {
+        "response": response_text,
+        "sources": sources,
+        "message_id": str(assistant_message.public_id)
+    })
+
+
+@router.post("/conversations/{conversation_id}/chat/stream")
+async def chat_stream(
+    conversation_id: str,
+    request: ChatRequest,
+    db: AsyncSession = Depends(get_db),
+    read_db: AsyncSession = Depends(get_read_db),
+    api_key: str = Depends(verify_api_key)
+):
+    public_id = uuid_pkg.UUID(conversation_id)
+    conversation = await DatabaseService.get_conversation(db, public_id)
+    if not conversation:
+        raise HTTPException(status_code=404, detail="Conversation not found")
+    
+    history_text, question = await _prepare_question(db, conversation.id, request.message)
+    await _store_message(db, conversation.id, "user", request.message)
+    cacheable = _cacheable(history_text, request)
+    generation = answer_cache.generation(conversation.notebook_id) if cacheable else None
+    cached, query_embedding = None, None
+    if cacheable:
+        cached, query_embedding = await _lookup_answer(db, conversation.notebook_id, question)
+    retrieved = None
+    if not cached:
+        retrieved = await _retrieve_context(read_db, conversation.notebook_id, question, query_embedding, request)
+    # Release the connections; the answer is stored with a short-lived session once streaming completes
+    await db.close()
+    await read_db.close()
+    
+    headers = {
+        "Cache-Control": "no-cache",
+        "X-Accel-Buffering": "no",
+        ANSWER_CACHE_HEADER: _cache_header(cacheable, cached)
+    }
+    if retrieved is not None:
+        headers[TOKENS_SAVED_HEADER] = str(retrieved[2])
+    
+    return StreamingResponse(
+        _stream_answer(
+            conversation.id, conversation.notebook_id, request.message, question, history_text,
+            cached, query_embedding, retrieved, generation
+        ),
+        media_type="text/event-stream",
+        headers=headers
+    )
 
 
 @router.get("/conversations/{conversation_id}/messages")
 async def get_messages(
     conversation_id: str,
-    db: AsyncSession = Depends(get_db),
+    page: PageParams = Depends(get_page_params),
+    db: AsyncSession = Depends(get_read_db),
     api_key: str = Depends(verify_api_key)
 ):
     public_id = uuid_pkg.UUID(conversation_id)
@@ -98,4 +298,4 @@ async def get_messages(
     if not conversation:
         raise HTTPException(status_code=404, detail="Conversation not found")
     
-    return await DatabaseService.get_chat_history(db, conversation.id)
+    return await DatabaseService.get_chat_history(db, conversation.id, page)
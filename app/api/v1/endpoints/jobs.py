@@ -0,0 +1,23 @@
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.db.base import get_db
+from app.schemas.ingestion_job import IngestionJobResponse
+from app.services import ingestion_service
+from app.api.dependencies import verify_api_key
+import uuid as uuid_pkg
+
+router = APIRouter()
+
+
+@router.get("/{job_id}")
+async def get_job(
+    job_id: str,
+    db: AsyncSession = Depends(get_db),
+    api_key: str = Depends(verify_api_key)
+) -> IngestionJobResponse:
+    public_id = uuid_pkg.UUID(job_id)
+    job = await ingestion_service.get_job(db, public_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    
+    return IngestionJobResponse.model_validate(job)
@@ -0,0 +1,22 @@
+from fastapi import APIRouter, Depends
+from app.services.embedding_cache import embedding_cache
+from app.services.answer_cache import answer_cache
+from app.services.reranker import reranker
+from app.services.estante import estante_service
+from app.services.link_refresh import link_refresh_service
+from app.utils.text_extraction import text_extractor
+from app.api.dependencies import verify_api_key
+
+router = APIRouter()
+
+
+@router.get("")
+async def get_metrics(api_key: str = Depends(verify_api_key)) -> dict:
+    return {
+        "embedding_cache": embedding_cache.stats(),
+        "answer_cache": answer_cache.stats(),
+        "reranker": reranker.stats(),
+        "estante_cache": estante_service.stats(),
+        "extraction": text_extractor.stats(),
+        "link_refresh": link_refresh_service.stats(),
+    }
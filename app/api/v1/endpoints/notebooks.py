@@ -1,18 +1,28 @@
 from fastapi import APIRouter, Depends, UploadFile, File, HTTPException
 from sqlalchemy.ext.asyncio import AsyncSession
-from app.db.base import get_db
+from app.core import settings
+from app.core.executor import run_in_thread
+from app.db.base import engine, get_db, get_read_db
+from app.db.vector_indexes import ensure_ann_index
 from app.schemas.notebook import NotebookCreate, NotebookUpdate
 from app.schemas.source import LinkRequest, EstanteLivrosRequest
-from app.services import DatabaseService, vector_store, llm_service
-from app.utils.text_extraction import extract_text, chunk_text
-from app.utils.web_scraper import scrape_url
-from app.api.dependencies import verify_api_key
-from app.services.estante import estante_service
+from app.schemas.ingestion_job import IngestionJobAccepted
+from app.services import DatabaseService, vector_store, llm_service, ingestion_service
+from app.services.ingestion import max_file_bytes
+from app.services.cache_invalidation import invalidation_bus
+from app.api.dependencies import verify_api_key, get_page_params
+from app.utils.pagination import PageParams
+from pathlib import Path
 from typing import List
+import logging
+import shutil
 import uuid as uuid_pkg
 
+logger = logging.getLogger(__name__)
 router = APIRouter()
 
+UPLOAD_READ_SIZE = 1024 * 1024
+
 
 @router.post("")
 async def create_notebook(
@@ -21,15 +31,21 @@ async def create_notebook(
     api_key: str = Depends(verify_api_key)
 ):
     nb = await DatabaseService.create_notebook(db, notebook)
+    # New notebooks use EMBEDDING_DIMENSIONS; a no-op once its index is built (normally at startup)
+    try:
+        await ensure_ann_index(engine, settings.EMBEDDING_DIMENSIONS)
+    except Exception:
+        logger.exception("Failed to build the ANN index for %d dimensions", settings.EMBEDDING_DIMENSIONS)
     return nb
 
 
 @router.get("")
 async def list_notebooks(
+    page: PageParams = Depends(get_page_params),
     db: AsyncSession = Depends(get_db),
     api_key: str = Depends(verify_api_key)
 ):
-    return await DatabaseService.get_all_notebooks(db)
+    return await DatabaseService.get_all_notebooks(db, page)
 
 
 @router.put("/{notebook_id}")
@@ -40,6 +56,8 @@ async def update_notebook(
     api_key: str = Depends(verify_api_key)
 ):
     public_id = uuid_pkg.UUID(notebook_id)
+    if "link_refresh_hours" in notebook.model_fields_set:
+        await DatabaseService.update_notebook_link_refresh(db, public_id, notebook.link_refresh_hours)
     if notebook.name:
         return await DatabaseService.update_notebook(db, public_id, notebook.name)
     if notebook.summary:
@@ -64,7 +82,7 @@ async def delete_notebook(
     return {"message": "Notebook deleted"}
 
 
-@router.post("/{notebook_id}/upload")
+@router.post("/{notebook_id}/upload", status_code=202)
 async def upload_files(
     notebook_id: str,
     files: List[UploadFile] = File(...),
@@ -76,20 +94,38 @@ async def upload_files(
     if not notebook:
         raise HTTPException(status_code=404, detail="Notebook not found")
     
-    for file in files:
-        content = await file.read()
-        text = extract_text(content, file.filename)
-        if not text:
-            continue
-        
-        chunks = chunk_text(text)
-        source = await DatabaseService.add_source(db, notebook.id, file.filename, "file")
-        await vector_store.add_documents(db, notebook.id, source.id, chunks, file.filename)
+    job_public_id = uuid_pkg.uuid4()
+    spool_dir = ingestion_service.spool_dir(job_public_id)
+    spool_dir.mkdir(parents=True, exist_ok=True)
+    
+    limit = max_file_bytes()
+    items = []
+    for i, file in enumerate(files):
+        path = spool_dir / f"{i}{Path(file.filename).suffix}"
+        written = 0
+        with await run_in_thread("file", open, path, "wb") as spool_file:
+            while chunk := await file.read(UPLOAD_READ_SIZE):
+                written += len(chunk)
+                if written > limit:
+                    break
+                await run_in_thread("file", spool_file.write, chunk)
+        if written > limit:
+            shutil.rmtree(spool_dir, ignore_errors=True)
+            raise HTTPException(
+                status_code=413,
+                detail=f"{file.filename} exceeds the {settings.INGESTION_MAX_FILE_SIZE_MB} MB upload limit"
+            )
+        items.append({"name": file.filename, "source_type": "file", "payload": {"path": str(path)}})
     
-    return {"message": f"{len(files)} arquivo(s) processado(s) com sucesso"}
+    job = await ingestion_service.enqueue_job(db, notebook.id, "upload", items, public_id=job_public_id)
+    return IngestionJobAccepted(
+        job_id=job.public_id,
+        status=job.status,
+        message=f"{len(files)} arquivo(s) enviado(s) para processamento"
+    )
 
 
-@router.post("/{notebook_id}/add-link")
+@router.post("/{notebook_id}/add-link", status_code=202)
 async def add_link(
     notebook_id: str,
     link: LinkRequest,
@@ -101,18 +137,21 @@ async def add_link(
     if not notebook:
         raise HTTPException(status_code=404, detail="Notebook not found")
     
-    text = scrape_url(link.url)
-    if not text:
-        raise HTTPException(status_code=400, detail="No content extracted from URL")
-    
-    chunks = chunk_text(text)
-    source = await DatabaseService.add_source(db, notebook.id, link.url, "link", link.url)
-    await vector_store.add_documents(db, notebook.id, source.id, chunks, link.url)
-    
-    return {"message": "Link adicionado com sucesso"}
-
-
-@router.post("/{notebook_id}/add-estante-livros")
+    existing = await DatabaseService.get_sources_by_payload(db, notebook.id, "link", "url", [link.url])
+    if link.url in existing:
+        # Already in the notebook: update that source instead of adding a second copy
+        items = [ingestion_service.refresh_item(existing[link.url])]
+    else:
+        items = [{"name": link.url, "source_type": "link", "payload": {"url": link.url, "view_url": link.url}}]
+    job = await ingestion_service.enqueue_job(db, notebook.id, "link", items)
+    return IngestionJobAccepted(
+        job_id=job.public_id,
+        status=job.status,
+        message="Link já adicionado, enviado para atualização" if existing else "Link enviado para processamento"
+    )
+
+
+@router.post("/{notebook_id}/add-estante-livros", status_code=202)
 async def add_estante_livros(
     notebook_id: str,
     request: EstanteLivrosRequest,
@@ -124,24 +163,23 @@ async def add_estante_livros(
     if not notebook:
         raise HTTPException(status_code=404, detail="Notebook not found")
     
-    processed_count = 0
-    
-    for livro in request.livros:
-        try:
-            content = estante_service.download_book(livro.driveId)
-            text = extract_text(content, f"{livro.nome}.pdf")
-            if not text:
-                continue
-            
-            chunks = chunk_text(text)
-            source = await DatabaseService.add_source(db, notebook.id, livro.nome, "estante", livro.webViewLink)
-            await vector_store.add_documents(db, notebook.id, source.id, chunks, livro.nome)
-            processed_count += 1
-        except Exception as e:
-            print(f"Erro ao processar livro {livro.nome}: {str(e)}")
-            continue
-    
-    return {"message": f"{processed_count} livro(s) adicionado(s) com sucesso"}
+    existing = await DatabaseService.get_sources_by_payload(
+        db, notebook.id, "estante", "drive_id", [livro.driveId for livro in request.livros]
+    )
+    items = [
+        ingestion_service.refresh_item(existing[livro.driveId]) if livro.driveId in existing else {
+            "name": livro.nome,
+            "source_type": "estante",
+            "payload": {"drive_id": livro.driveId, "view_url": livro.webViewLink}
+        }
+        for livro in request.livros
+    ]
+    job = await ingestion_service.enqueue_job(db, notebook.id, "estante", items)
+    return IngestionJobAccepted(
+        job_id=job.public_id,
+        status=job.status,
+        message=f"{len(items)} livro(s) enviado(s) para processamento"
+    )
 
 
 @router.get("/{notebook_id}/summary")
@@ -170,7 +208,11 @@ async def delete_source(
         raise HTTPException(status_code=404, detail="Notebook not found")
     
     source_public_id = uuid_pkg.UUID(source_id)
-    await DatabaseService.delete_source(db, source_public_id)
+    source = await DatabaseService.get_source(db, source_public_id)
+    if source and source.notebook_id == notebook.id:
+        await vector_store.delete_source_embeddings(db, notebook.id, source.id)
+        await invalidation_bus.publish(db, "answer", str(notebook.id))
+        await DatabaseService.delete_source(db, source_public_id)
     
     return {"message": "Source and embeddings deleted"}
 
@@ -179,6 +221,7 @@ async def delete_source(
 async def generate_summary(
     notebook_id: str,
     db: AsyncSession = Depends(get_db),
+    read_db: AsyncSession = Depends(get_read_db),
     api_key: str = Depends(verify_api_key)
 ):
     public_id = uuid_pkg.UUID(notebook_id)
@@ -186,17 +229,20 @@ async def generate_summary(
     if not notebook:
         raise HTTPException(status_code=404, detail="Notebook not found")
     
-    count = await vector_store.get_collection_count(db, notebook.id)
+    count = await vector_store.get_collection_count(read_db, notebook.id)
     if count == 0:
         summary_text = "Nenhuma fonte adicionada ainda. Adicione documentos ou links para gerar um resumo."
         await DatabaseService.update_notebook_summary(db, public_id, summary_text)
         return {"summary": summary_text}
     
-    results = await vector_store.query(db, notebook.id, "resumo geral conteúdo principal", min(10, count))
+    results = await vector_store.query(
+        read_db, notebook.id, "resumo geral conteúdo principal", min(10, count), collection_count=count,
+        dimensions=notebook.embedding_dimensions
+    )
     context = "\n\n".join(results['documents'][0]) if results['documents'][0] else ""
     sources = list(set([meta['filename'] for meta in results['metadatas'][0]])) if results['metadatas'] else []
     
-    summary_text = llm_service.generate_summary(context, sources)
+    summary_text = await llm_service.generate_summary(context, sources)
     await DatabaseService.update_notebook_summary(db, public_id, summary_text)
     
     return {"summary": summary_text, "sources": sources}
@@ -1,8 +1,11 @@
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.ext.asyncio import AsyncSession
-from app.db.base import get_db
-from app.services import DatabaseService
-from app.api.dependencies import verify_api_key
+from app.db.base import get_db, get_read_db
+from app.schemas.source import SourceUpdate
+from app.schemas.ingestion_job import IngestionJobAccepted
+from app.services import DatabaseService, vector_store, ingestion_service
+from app.api.dependencies import verify_api_key, get_page_params
+from app.utils.pagination import PageParams
 import uuid as uuid_pkg
 
 router = APIRouter()
@@ -11,6 +14,23 @@ router = APIRouter()
 @router.get("/{notebook_id}/sources")
 async def get_sources(
     notebook_id: str,
+    page: PageParams = Depends(get_page_params),
+    db: AsyncSession = Depends(get_read_db),
+    api_key: str = Depends(verify_api_key)
+):
+    public_id = uuid_pkg.UUID(notebook_id)
+    notebook = await DatabaseService.get_notebook(db, public_id)
+    if not notebook:
+        raise HTTPException(status_code=404, detail="Notebook not found")
+    
+    return await DatabaseService.get_sources(db, notebook.id, page)
+
+
+@router.patch("/{notebook_id}/sources/{source_id}")
+async def update_source(
+    notebook_id: str,
+    source_id: str,
+    source_update: SourceUpdate,
     db: AsyncSession = Depends(get_db),
     api_key: str = Depends(verify_api_key)
 ):
@@ -19,4 +39,35 @@ async def get_sources(
     if not notebook:
         raise HTTPException(status_code=404, detail="Notebook not found")
     
-    return await DatabaseService.get_sources(db, notebook.id)
+    source = await DatabaseService.get_source(db, uuid_pkg.UUID(source_id))
+    if not source or source.notebook_id != notebook.id:
+        raise HTTPException(status_code=404, detail="Source not found")
+    
+    await vector_store.set_source_enabled(db, notebook.id, source.id, source_update.enabled)
+    return {"message": "Source enabled" if source_update.enabled else "Source disabled"}
+
+
+@router.post("/{notebook_id}/sources/{source_id}/refresh", status_code=202)
+async def refresh_source(
+    notebook_id: str,
+    source_id: str,
+    db: AsyncSession = Depends(get_db),
+    api_key: str = Depends(verify_api_key)
+):
+    public_id = uuid_pkg.UUID(notebook_id)
+    notebook = await DatabaseService.get_notebook(db, public_id)
+    if not notebook:
+        raise HTTPException(status_code=404, detail="Notebook not found")
+    
+    source = await DatabaseService.get_source(db, uuid_pkg.UUID(source_id))
+    if not source or source.notebook_id != notebook.id:
+        raise HTTPException(status_code=404, detail="Source not found")
+    if not source.payload:
+        raise HTTPException(status_code=409, detail="Only links and Estante books can be refreshed")
+    
+    job = await ingestion_service.enqueue_job(db, notebook.id, "refresh", [ingestion_service.refresh_item(source)])
+    return IngestionJobAccepted(
+        job_id=job.public_id,
+        status=job.status,
+        message="Fonte enviada para atualização"
+    )
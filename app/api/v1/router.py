@@ -1,5 +1,5 @@
 from fastapi import APIRouter
-from app.api.v1.endpoints import api_keys, notebooks, conversations, estante, sources
+from app.api.v1.endpoints import api_keys, notebooks, conversations, estante, sources, jobs, metrics
 
 api_router = APIRouter()
 
@@ -8,3 +8,5 @@ api_router.include_router(notebooks.router, prefix="/notebooks", tags=["notebook
 api_router.include_router(conversations.router, prefix="/notebooks", tags=["conversations"])
 api_router.include_router(sources.router, prefix="/notebooks", tags=["sources"])
 api_router.include_router(estante.router, prefix="/estante", tags=["estante"])
+api_router.include_router(jobs.router, prefix="/jobs", tags=["jobs"])
+api_router.include_router(metrics.router, prefix="/metrics", tags=["metrics"])
@@ -1,5 +1,5 @@
 from pydantic_settings import BaseSettings
-from typing import List
+from typing import List, Optional
 
 
 class Settings(BaseSettings):
@@ -17,11 +17,149 @@ class Settings(BaseSettings):
     ESTANTE_BASE_URL: str
     
     CORS_ORIGINS: List[str] = ["*"]
+    LOG_LEVEL: str = "INFO"
+    
+    # Database Engine Configuration
+    DATABASE_READ_URL: Optional[str] = None
+    DB_ECHO: bool = False
+    DB_POOL_SIZE: int = 10
+    DB_MAX_OVERFLOW: int = 20
+    DB_POOL_TIMEOUT: int = 30
+    DB_POOL_RECYCLE: int = 1800
+    DB_POOL_PRE_PING: bool = True
+    DB_STATEMENT_TIMEOUT_MS: int = 30000
+    DB_PREPARED_STATEMENT_CACHE_SIZE: int = 100
+    
+    # Pagination Configuration
+    PAGE_SIZE_DEFAULT: int = 50
+    PAGE_SIZE_MAX: int = 200
     
     CHUNK_SIZE: int = 500
     CHUNK_OVERLAP: int = 50
+    CHUNKING_STRATEGY: str = "markdown"  # "markdown" (local) or "semantic"
+    CHUNK_SEMANTIC_BUFFER_SIZE: int = 1
+    CHUNK_SEMANTIC_BREAKPOINT_PERCENTILE: float = 95.0
+    CHUNK_SEMANTIC_REUSE_EMBEDDINGS: bool = True
     RAG_N_RESULTS: int = 10
     
+    # Vector search (pgvector ANN index)
+    VECTOR_INDEX_TYPE: str = "hnsw"  # "hnsw" or "ivfflat"
+    VECTOR_HNSW_M: int = 16
+    VECTOR_HNSW_EF_CONSTRUCTION: int = 64
+    VECTOR_IVFFLAT_LISTS: int = 1000
+    VECTOR_EF_SEARCH: int = 100
+    VECTOR_PROBES: int = 10
+    VECTOR_ITERATIVE_SCAN: str = "relaxed_order"  # "off", "relaxed_order" or "strict_order"
+    VECTOR_MAX_SCAN_TUPLES: int = 20000
+    VECTOR_EXACT_SEARCH_THRESHOLD: int = 5000
+    VECTOR_STORAGE: str = "full"  # "full", "halfvec" or "binary"
+    VECTOR_RESCORE_CANDIDATES: int = 100
+    
+    # Hybrid (lexical + vector) retrieval
+    SEARCH_MODE: str = "hybrid"  # "vector", "hybrid" or "lexical"
+    SEARCH_TEXT_CONFIG: str = "portuguese"
+    SEARCH_LEXICAL_WEIGHT: float = 0.5
+    SEARCH_CANDIDATES: int = 40
+    SEARCH_RRF_K: int = 60
+    
+    # Post-retrieval reranking
+    RERANK_ENABLED: bool = True
+    RERANK_OVERFETCH: int = 3
+    RERANK_DEDUP_THRESHOLD: float = 0.95
+    RERANK_MMR_LAMBDA: float = 0.7
+    RERANK_CROSS_ENCODER_MODEL: str = ""  # e.g. "cross-encoder/mmarco-mMiniLMv2-L12-H384-v1"
+    
+    # Shared HTTP client
+    HTTP2_ENABLED: bool = True
+    HTTP_MAX_CONNECTIONS: int = 100
+    HTTP_MAX_KEEPALIVE_CONNECTIONS: int = 20
+    HTTP_KEEPALIVE_EXPIRY: float = 30.0
+    
+    # Web page scraping (add-link and link refreshes)
+    SCRAPER_PARSER: str = "auto"  # "auto" (lxml if installed), "lxml" or "html.parser"
+    SCRAPER_TIMEOUT_SECONDS: float = 10.0
+    SCRAPER_MAX_PAGE_MB: int = 10
+    
+    # Estante catalogue cache
+    ESTANTE_TIMEOUT_SECONDS: float = 10.0
+    ESTANTE_DOWNLOAD_TIMEOUT_SECONDS: float = 120.0
+    ESTANTE_CACHE_TTL_SECONDS: int = 3600
+    ESTANTE_CACHE_STALE_SECONDS: int = 86400
+    ESTANTE_CACHE_MAX_ENTRIES: int = 1000
+    
+    # Async execution layer for blocking calls
+    BLOCKING_THREAD_POOL_SIZE: int = 16
+    EXTRACTION_EXECUTOR: str = "process"  # "process" or "thread"
+    EXTRACTION_PROCESS_POOL_SIZE: int = 2
+    EXTRACTION_WARMUP: bool = True
+    LLM_CONCURRENCY: int = 16
+    EMBEDDING_CONCURRENCY: int = 8
+    EXTRACTION_CONCURRENCY: int = 2
+    CHUNKING_CONCURRENCY: int = 4
+    HTTP_CONCURRENCY: int = 8
+    RERANK_CONCURRENCY: int = 2
+    FILE_IO_CONCURRENCY: int = 8
+    SCRAPING_CONCURRENCY: int = 4
+    
+    # Batched embeddings
+    EMBEDDING_DIMENSIONS: int = 768
+    EMBEDDING_BATCH_SIZE: int = 100
+    EMBEDDING_BATCH_CONCURRENCY: int = 4
+    EMBEDDING_MAX_RETRIES: int = 5
+    EMBEDDING_RETRY_BASE_DELAY: float = 1.0
+    
+    # Background ingestion jobs
+    INGESTION_WORKER_ENABLED: bool = True
+    INGESTION_WORKER_CONCURRENCY: int = 1
+    INGESTION_POLL_INTERVAL: float = 2.0
+    INGESTION_JOB_LEASE_SECONDS: int = 300
+    INGESTION_JOB_MAX_ATTEMPTS: int = 3
+    INGESTION_SPOOL_DIR: str = "/tmp/docs-conversation-spool"
+    INGESTION_MAX_FILE_SIZE_MB: int = 100
+    INGESTION_MAX_UPLOAD_REQUEST_MB: int = 500
+    INGESTION_EXTRACT_PARALLELISM: int = 2
+    INGESTION_CHUNK_PARALLELISM: int = 2
+    INGESTION_EMBED_PARALLELISM: int = 4
+    INGESTION_QUEUE_SIZE: int = 4
+    INGESTION_WRITE_BATCH_SIZE: int = 8
+    
+    # Scheduled link refresh
+    LINK_REFRESH_ENABLED: bool = False
+    LINK_REFRESH_INTERVAL_HOURS: int = 0
+    LINK_REFRESH_POLL_INTERVAL: float = 300.0
+    LINK_REFRESH_BATCH_SIZE: int = 100
+    LINK_REFRESH_CONCURRENCY: int = 16
+    LINK_REFRESH_PER_HOST_CONCURRENCY: int = 2
+    LINK_REFRESH_HOST_DELAY_SECONDS: float = 1.0
+    LINK_REFRESH_TIMEOUT_SECONDS: float = 20.0
+    LINK_REFRESH_RETRY_MINUTES: int = 30
+    
+    # Embedding cache
+    EMBEDDING_CACHE_ENABLED: bool = True
+    EMBEDDING_CACHE_MEMORY_SIZE: int = 20000
+    
+    # Answer cache
+    ANSWER_CACHE_ENABLED: bool = True
+    ANSWER_CACHE_TTL_SECONDS: int = 3600
+    ANSWER_CACHE_SIMILARITY_THRESHOLD: float = 0.95
+    ANSWER_CACHE_MAX_ENTRIES_PER_NOTEBOOK: int = 256
+    ANSWER_CACHE_MAX_NOTEBOOKS: int = 1000
+    
+    # API Key Cache Configuration
+    API_KEY_CACHE_TTL_SECONDS: int = 60
+    API_KEY_CACHE_NEGATIVE_TTL_SECONDS: int = 10
+    API_KEY_CACHE_MAX_SIZE: int = 10000
+    CACHE_INVALIDATION_NOTIFY_ENABLED: bool = False
+    CACHE_INVALIDATION_CHANNEL: str = "cache_invalidation"
+    
+    # Chat Context Configuration
+    CHAT_HISTORY_MESSAGES: int = 10
+    CHAT_HISTORY_TOKEN_BUDGET: int = 1500
+    CHAT_CONTEXT_TOKEN_BUDGET: int = 6000
+    CHAT_QUERY_REWRITE_ENABLED: bool = True
+    CHAT_HISTORY_CACHE_SIZE: int = 1000
+    CHARS_PER_TOKEN: float = 4.0
+    
     class Config:
         env_file = ".env"
 
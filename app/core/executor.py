@@ -0,0 +1,84 @@
+import asyncio
+import functools
+import multiprocessing
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from contextlib import asynccontextmanager
+from typing import Callable, Optional
+from app.core.config import settings
+
+
+# Per-call-type concurrency limits, so CPU-bound extraction cannot starve
+# I/O-bound LLM and embedding calls (and vice versa).
+CALL_LIMITS = {
+    "llm": settings.LLM_CONCURRENCY,
+    "embedding": settings.EMBEDDING_CONCURRENCY,
+    "extraction": settings.EXTRACTION_CONCURRENCY,
+    "chunking": settings.CHUNKING_CONCURRENCY,
+    "http": settings.HTTP_CONCURRENCY,
+    "rerank": settings.RERANK_CONCURRENCY,
+    "file": settings.FILE_IO_CONCURRENCY,
+    "scraping": settings.SCRAPING_CONCURRENCY,
+}
+
+_semaphores = {kind: asyncio.Semaphore(limit) for kind, limit in CALL_LIMITS.items()}
+_thread_pool: Optional[ThreadPoolExecutor] = None
+_process_pool: Optional[ProcessPoolExecutor] = None
+
+
+def _get_thread_pool() -> ThreadPoolExecutor:
+    global _thread_pool
+    if _thread_pool is None:
+        _thread_pool = ThreadPoolExecutor(
+            max_workers=settings.BLOCKING_THREAD_POOL_SIZE,
+            thread_name_prefix="blocking"
+        )
+    return _thread_pool
+
+
+def _get_process_pool() -> ProcessPoolExecutor:
+    global _process_pool
+    if _process_pool is None:
+        # Imported here so loading the executor does not load MarkItDown
+        from app.utils.text_extraction import warm_text_extractor
+        # spawn avoids forking a process that holds event loop and connection pool state
+        _process_pool = ProcessPoolExecutor(
+            max_workers=settings.EXTRACTION_PROCESS_POOL_SIZE,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=warm_text_extractor if settings.EXTRACTION_WARMUP else None
+        )
+    return _process_pool
+
+
+@asynccontextmanager
+async def limit(kind: str):
+    """Hold a concurrency slot for the given call type."""
+    async with _semaphores[kind]:
+        yield
+
+
+async def run_in_thread(kind: str, func: Callable, *args, **kwargs):
+    """Run a blocking function in the shared thread pool under the call type's limit."""
+    async with limit(kind):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(_get_thread_pool(), functools.partial(func, *args, **kwargs))
+
+
+async def run_in_process(kind: str, func: Callable, *args, **kwargs):
+    """Run a CPU-bound, picklable function in the process pool under the call type's limit."""
+    if settings.EXTRACTION_EXECUTOR != "process":
+        return await run_in_thread(kind, func, *args, **kwargs)
+
+    async with limit(kind):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(_get_process_pool(), functools.partial(func, *args, **kwargs))
+
+
+def shutdown():
+    """Shut down the executor pools."""
+    global _thread_pool, _process_pool
+    if _thread_pool is not None:
+        _thread_pool.shutdown(wait=False, cancel_futures=True)
+        _thread_pool = None
+    if _process_pool is not None:
+        _process_pool.shutdown(wait=False, cancel_futures=True)
+        _process_pool = None
@@ -0,0 +1,6 @@
+import hashlib
+
+
+def hash_api_key(api_key: str) -> str:
+    """API keys are stored and looked up by their SHA-256 hex digest."""
+    return hashlib.sha256(api_key.encode("utf-8")).hexdigest()
@@ -1,3 +1,9 @@
-from .base import Base, get_db, engine, async_session_maker
+from .base import (
+    Base, get_db, get_read_db, engine, request_engine, read_engine,
+    async_session_maker, request_session_maker, read_session_maker
+)
 
-__all__ = ["Base", "get_db", "engine", "async_session_maker"]
+__all__ = [
+    "Base", "get_db", "get_read_db", "engine", "request_engine", "read_engine",
+    "async_session_maker", "request_session_maker", "read_session_maker"
+]
@@ -2,11 +2,48 @@ from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
 from sqlalchemy.orm import declarative_base, sessionmaker
 from app.core import settings
 
-engine = create_async_engine(settings.DATABASE_URL, echo=True)
+
+def _create_engine(url: str, statement_timeout_ms: int = 0):
+    server_settings = {}
+    if statement_timeout_ms:
+        server_settings["statement_timeout"] = str(statement_timeout_ms)
+    return create_async_engine(
+        url,
+        echo=settings.DB_ECHO,
+        pool_size=settings.DB_POOL_SIZE,
+        max_overflow=settings.DB_MAX_OVERFLOW,
+        pool_timeout=settings.DB_POOL_TIMEOUT,
+        pool_recycle=settings.DB_POOL_RECYCLE,
+        pool_pre_ping=settings.DB_POOL_PRE_PING,
+        connect_args={
+            # Set to 0 behind PgBouncer in transaction pooling mode
+            "prepared_statement_cache_size": settings.DB_PREPARED_STATEMENT_CACHE_SIZE,
+            "server_settings": server_settings,
+        }
+    )
+
+
+# Workers and scripts: no statement timeout
+engine = _create_engine(settings.DATABASE_URL)
 async_session_maker = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
 
+# API requests: statements cancelled after DB_STATEMENT_TIMEOUT_MS, set once per connection
+request_engine = _create_engine(settings.DATABASE_URL, settings.DB_STATEMENT_TIMEOUT_MS)
+request_session_maker = sessionmaker(request_engine, class_=AsyncSession, expire_on_commit=False)
+
+# Read-only queries go to the replica when DATABASE_READ_URL is set, otherwise to the primary
+read_engine = (
+    _create_engine(settings.DATABASE_READ_URL, settings.DB_STATEMENT_TIMEOUT_MS)
+    if settings.DATABASE_READ_URL else request_engine
+)
+read_session_maker = sessionmaker(read_engine, class_=AsyncSession, expire_on_commit=False)
+
 Base = declarative_base()
 
 async def get_db():
-    async with async_session_maker() as session:
+    async with request_session_maker() as session:
+        yield session
+
+async def get_read_db():
+    async with read_session_maker() as session:
         yield session
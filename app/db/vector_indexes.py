@@ -0,0 +1,47 @@
+from typing import Optional, Set, Tuple
+from sqlalchemy import text
+from app.core import settings
+
+# Column expression and operator class searched by each VECTOR_STORAGE, per dimension
+STORAGE_INDEXES = {
+    "full": ("ix_document_embeddings_embedding_ann", "(embedding::vector({dimensions})) vector_cosine_ops"),
+    "halfvec": ("ix_document_embeddings_embedding_half_ann", "(embedding::halfvec({dimensions})) halfvec_cosine_ops"),
+    "binary": ("ix_document_embeddings_embedding_bits_ann", "(embedding_bits::bit({dimensions})) bit_hamming_ops"),
+}
+
+# Indexes this process has built or found, so ensure_ann_index runs once per index
+_ready: Set[str] = set()
+
+
+def ann_index(dimensions: int, storage: Optional[str] = None) -> Tuple[str, str]:
+    """
+    Name and CREATE INDEX CONCURRENTLY statement of the ANN index serving one
+    embedding dimension. Notebooks may use different dimensions, so every
+    index is partial on vector_dims(embedding) and casts to a fixed size.
+    """
+    dimensions = int(dimensions)
+    prefix, column = STORAGE_INDEXES[storage or settings.VECTOR_STORAGE]
+    name = f"{prefix}_{dimensions}"
+    if settings.VECTOR_INDEX_TYPE == "ivfflat":
+        method = f"ivfflat ({column.format(dimensions=dimensions)})"
+        options = f"lists = {int(settings.VECTOR_IVFFLAT_LISTS)}"
+    else:
+        method = f"hnsw ({column.format(dimensions=dimensions)})"
+        options = f"m = {int(settings.VECTOR_HNSW_M)}, ef_construction = {int(settings.VECTOR_HNSW_EF_CONSTRUCTION)}"
+    return name, (
+        f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} ON document_embeddings "
+        f"USING {method} WITH ({options}) WHERE vector_dims(embedding) = {dimensions}"
+    )
+
+
+async def ensure_ann_index(engine, dimensions: int, storage: Optional[str] = None) -> str:
+    """Build the ANN index for a dimension if it does not exist yet. Returns its name."""
+    name, statement = ann_index(dimensions, storage)
+    if name in _ready:
+        return name
+    async with engine.connect() as connection:
+        # CREATE INDEX CONCURRENTLY cannot run inside a transaction block
+        connection = await connection.execution_options(isolation_level="AUTOCOMMIT")
+        await connection.execute(text(statement))
+    _ready.add(name)
+    return name
@@ -1,14 +1,63 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
+import asyncio
+import logging
 from app.core import settings
+from app.core import executor
+from app.core.http_client import close_http_client
+from app.db.base import engine, request_engine, read_engine
+from app.db.vector_indexes import ensure_ann_index
 from app.api import api_router
+from app.api.middleware import UploadSizeLimitMiddleware
+from app.services.embedding_cache import embedding_cache
+from app.services.cache_invalidation import invalidation_bus
+from app.workers.ingestion import IngestionWorker
+from app.workers.link_refresh import LinkRefreshWorker
+
+logging.basicConfig(level=settings.LOG_LEVEL, format="%(levelname)s [%(name)s] %(message)s")
+logger = logging.getLogger(__name__)
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Application lifespan."""
+    if settings.EMBEDDING_CACHE_ENABLED:
+        try:
+            purged = await embedding_cache.purge_stale_models()
+            if purged:
+                logger.info("Purged %d cached embeddings from previous embedding models", purged)
+        except Exception:
+            logger.exception("Failed to purge stale embedding cache entries")
+    
+    try:
+        index = await ensure_ann_index(engine, settings.EMBEDDING_DIMENSIONS)
+        logger.info("ANN index %s ready", index)
+    except Exception:
+        logger.exception("Failed to build the ANN index for %d dimensions", settings.EMBEDDING_DIMENSIONS)
+    
+    workers = []
+    if settings.INGESTION_WORKER_ENABLED:
+        workers = [IngestionWorker() for _ in range(settings.INGESTION_WORKER_CONCURRENCY)]
+    if settings.LINK_REFRESH_ENABLED:
+        workers.append(LinkRefreshWorker())
+    worker_tasks = [asyncio.create_task(worker.run()) for worker in workers]
+    if settings.CACHE_INVALIDATION_NOTIFY_ENABLED:
+        worker_tasks.append(asyncio.create_task(invalidation_bus.listen()))
+    
     yield
+    
+    for worker in workers:
+        worker.stop()
+    for task in worker_tasks:
+        task.cancel()
+    await asyncio.gather(*worker_tasks, return_exceptions=True)
+    executor.shutdown()
+    await close_http_client()
+    if read_engine is not request_engine:
+        await read_engine.dispose()
+    await request_engine.dispose()
+    await engine.dispose()
 
 
 app = FastAPI(
@@ -18,6 +67,7 @@ app = FastAPI(
     lifespan=lifespan
 )
 
+app.add_middleware(UploadSizeLimitMiddleware)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=settings.CORS_ORIGINS,
@@ -4,5 +4,8 @@ from app.models.conversation import Conversation
 from app.models.chat_message import ChatMessage
 from app.models.api_key import ApiKey
 from app.models.document_embedding import DocumentEmbedding
+from app.models.ingestion_job import IngestionJob, IngestionJobItem
+from app.models.embedding_cache import EmbeddingCacheEntry
 
-__all__ = ["Notebook", "Source", "Conversation", "ChatMessage", "ApiKey", "DocumentEmbedding"]
+__all__ = ["Notebook", "Source", "Conversation", "ChatMessage", "ApiKey", "DocumentEmbedding",
+           "IngestionJob", "IngestionJobItem", "EmbeddingCacheEntry"]
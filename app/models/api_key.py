@@ -9,7 +9,7 @@ class ApiKey(Base):
 
     id = Column(BigInteger, primary_key=True, autoincrement=True)
     public_id = Column(UUID(as_uuid=True), default=uuid.uuid4, unique=True, index=True, nullable=False)
-    key = Column(String, unique=True, nullable=False)
+    key_hash = Column(String(64), unique=True, index=True, nullable=False)  # SHA-256 of the key
     name = Column(String, nullable=False)
     is_active = Column(Boolean, default=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
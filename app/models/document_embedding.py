@@ -1,9 +1,10 @@
-from sqlalchemy import Column, BigInteger, String, Text, DateTime, ForeignKey, Integer, Boolean
-from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy import Column, BigInteger, String, Text, DateTime, ForeignKey, Integer, Boolean, FetchedValue
+from sqlalchemy.dialects.postgresql import UUID, TSVECTOR
+from sqlalchemy.orm import deferred
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from app.db.base import Base
-from pgvector.sqlalchemy import Vector
+from pgvector.sqlalchemy import BIT, Vector
 import uuid
 
 
@@ -15,7 +16,14 @@ class DocumentEmbedding(Base):
     notebook_id = Column(BigInteger, ForeignKey("notebooks.id", ondelete="CASCADE"), nullable=False)
     source_id = Column(BigInteger, ForeignKey("sources.id", ondelete="CASCADE"), nullable=False)
     content = Column(Text, nullable=False)
-    embedding = Column(Vector(768), nullable=False)  # Google embeddings are 768 dimensions
+    # SHA-256 of content, matched against the new chunks when the source is refreshed
+    content_hash = Column(String)
+    # Full-text index of content for lexical/hybrid search, set from content by a trigger (migration 011)
+    content_tsv = deferred(Column(TSVECTOR, server_default=FetchedValue(), server_onupdate=FetchedValue()))
+    # Any dimension; Notebook.embedding_dimensions says which, and ANN indexes are per dimension
+    embedding = Column(Vector(), nullable=False)
+    # Sign bits of embedding, searched by Hamming distance when VECTOR_STORAGE is "binary"
+    embedding_bits = deferred(Column(BIT(varying=True)))
     filename = Column(String, nullable=False)
     chunk_index = Column(Integer, nullable=False)
     enabled = Column(Boolean, default=True, nullable=False)
@@ -0,0 +1,14 @@
+from sqlalchemy import Column, String, DateTime
+from sqlalchemy.sql import func
+from app.db.base import Base
+from pgvector.sqlalchemy import Vector
+
+
+class EmbeddingCacheEntry(Base):
+    __tablename__ = "embedding_cache"
+
+    model = Column(String, primary_key=True)
+    task_type = Column(String, primary_key=True)
+    content_hash = Column(String(64), primary_key=True)  # SHA-256 of the normalised text
+    embedding = Column(Vector(), nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
@@ -0,0 +1,50 @@
+from sqlalchemy import Column, BigInteger, String, Text, DateTime, ForeignKey, Integer
+from sqlalchemy.dialects.postgresql import JSONB, UUID
+from sqlalchemy.orm import relationship
+from sqlalchemy.sql import func
+from app.db.base import Base
+import uuid
+
+
+class IngestionJob(Base):
+    __tablename__ = "ingestion_jobs"
+
+    id = Column(BigInteger, primary_key=True, autoincrement=True)
+    public_id = Column(UUID(as_uuid=True), default=uuid.uuid4, unique=True, index=True, nullable=False)
+    notebook_id = Column(BigInteger, ForeignKey("notebooks.id", ondelete="CASCADE"), nullable=False)
+    kind = Column(String, nullable=False)  # upload, link, estante, refresh
+    status = Column(String, nullable=False, default="pending")  # pending, running, completed, failed
+    attempts = Column(Integer, nullable=False, default=0)
+    error = Column(Text)
+    locked_by = Column(String)
+    locked_at = Column(DateTime(timezone=True))
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+    finished_at = Column(DateTime(timezone=True))
+
+    items = relationship(
+        "IngestionJobItem",
+        back_populates="job",
+        cascade="all, delete-orphan",
+        order_by="IngestionJobItem.position"
+    )
+
+
+class IngestionJobItem(Base):
+    __tablename__ = "ingestion_job_items"
+
+    id = Column(BigInteger, primary_key=True, autoincrement=True)
+    job_id = Column(BigInteger, ForeignKey("ingestion_jobs.id", ondelete="CASCADE"), nullable=False, index=True)
+    position = Column(Integer, nullable=False)
+    name = Column(String, nullable=False)
+    source_type = Column(String, nullable=False)  # file, link, estante
+    payload = Column(JSONB, nullable=False)
+    status = Column(String, nullable=False, default="pending")  # pending, running, completed, failed
+    source_id = Column(BigInteger, ForeignKey("sources.id", ondelete="SET NULL"))
+    extracted_chars = Column(Integer, nullable=False, default=0)
+    chunked_count = Column(Integer, nullable=False, default=0)
+    embedded_count = Column(Integer, nullable=False, default=0)
+    error = Column(Text)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+    job = relationship("IngestionJob", back_populates="items")
@@ -1,8 +1,9 @@
-from sqlalchemy import Column, String, Text, DateTime, BigInteger
+from sqlalchemy import Column, String, Text, DateTime, BigInteger, Integer
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from app.db.base import Base
+from app.core import settings
 import uuid
 
 class Notebook(Base):
@@ -12,6 +13,15 @@ class Notebook(Base):
     public_id = Column(UUID(as_uuid=True), default=uuid.uuid4, unique=True, index=True, nullable=False)
     name = Column(String, nullable=False)
     summary = Column(Text)
+    # Denormalised document_embeddings counts, maintained by VectorStoreService
+    embedding_count = Column(Integer, nullable=False, server_default="0")
+    enabled_count = Column(Integer, nullable=False, server_default="0")
+    # Output dimensionality of this notebook's embeddings (and of the queries searching them)
+    embedding_dimensions = Column(
+        Integer, nullable=False, default=lambda: settings.EMBEDDING_DIMENSIONS, server_default="768"
+    )
+    # Hours between scheduled refreshes of the notebook's links (None: LINK_REFRESH_INTERVAL_HOURS, 0: never)
+    link_refresh_hours = Column(Integer)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
 
     sources = relationship("Source", back_populates="notebook", cascade="all, delete-orphan")
@@ -1,5 +1,5 @@
 from sqlalchemy import Column, BigInteger, String, Text, DateTime, ForeignKey
-from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.dialects.postgresql import JSONB, UUID
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from app.db.base import Base
@@ -14,6 +14,17 @@ class Source(Base):
     name = Column(String, nullable=False)
     type = Column(String, nullable=False)
     view_url = Column(Text)
+    # How to fetch the source again (url of a link, drive_id of a book); None for uploads
+    payload = Column(JSONB)
+    # SHA-256 of the last fetched document, and the validators for conditional requests
+    content_hash = Column(String)
+    etag = Column(String)
+    last_modified = Column(String)
+    # Size of the last fetched document
+    content_bytes = Column(BigInteger)
+    refreshed_at = Column(DateTime(timezone=True))
+    # Last time the link refresh scheduler claimed this source
+    checked_at = Column(DateTime(timezone=True))
     created_at = Column(DateTime(timezone=True), server_default=func.now())
 
     notebook = relationship("Notebook", back_populates="sources")
@@ -1,8 +1,10 @@
 from app.schemas.notebook import NotebookCreate, NotebookResponse, NotebookUpdate
-from app.schemas.source import SourceCreate, SourceResponse
+from app.schemas.source import SourceCreate, SourceResponse, SourceUpdate
 from app.schemas.conversation import ConversationCreate, ConversationResponse
 from app.schemas.chat_message import ChatMessageCreate, ChatMessageResponse
 from app.schemas.api_key import ApiKeyCreate, ApiKeyResponse, ApiKeyCreateResponse
+from app.schemas.ingestion_job import IngestionJobResponse, IngestionJobItemResponse, IngestionJobAccepted
+from app.schemas.pagination import Page
 
 # Additional schemas
 from pydantic import BaseModel
@@ -24,9 +26,11 @@ class EstanteLivrosRequest(BaseModel):
 
 __all__ = [
     "NotebookCreate", "NotebookResponse", "NotebookUpdate",
-    "SourceCreate", "SourceResponse",
+    "SourceCreate", "SourceResponse", "SourceUpdate",
     "ConversationCreate", "ConversationResponse",
     "ChatMessageCreate", "ChatMessageResponse",
     "ApiKeyCreate", "ApiKeyResponse", "ApiKeyCreateResponse",
+    "IngestionJobResponse", "IngestionJobItemResponse", "IngestionJobAccepted",
+    "Page",
     "ChatRequest", "ChatResponse", "LinkRequest", "EstanteLivrosRequest"
 ]
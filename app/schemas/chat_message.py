@@ -1,6 +1,6 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from datetime import datetime
-from typing import List
+from typing import List, Literal, Optional
 import uuid as uuid_pkg
 
 
@@ -12,6 +12,9 @@ class ChatMessageCreate(BaseModel):
 
 class ChatRequest(BaseModel):
     message: str
+    # Retrieval overrides; default to SEARCH_MODE and SEARCH_LEXICAL_WEIGHT
+    search_mode: Optional[Literal["vector", "hybrid", "lexical"]] = None
+    lexical_weight: Optional[float] = Field(default=None, ge=0, le=1)
 
 
 class ChatResponse(BaseModel):
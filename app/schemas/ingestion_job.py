@@ -0,0 +1,38 @@
+from pydantic import BaseModel
+from datetime import datetime
+from typing import List, Optional
+import uuid as uuid_pkg
+
+
+class IngestionJobItemResponse(BaseModel):
+    name: str
+    source_type: str
+    status: str
+    extracted_chars: int
+    chunked_count: int
+    embedded_count: int
+    error: Optional[str] = None
+
+    class Config:
+        from_attributes = True
+
+
+class IngestionJobResponse(BaseModel):
+    public_id: uuid_pkg.UUID
+    kind: str
+    status: str
+    attempts: int
+    error: Optional[str] = None
+    created_at: datetime
+    updated_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    items: List[IngestionJobItemResponse]
+
+    class Config:
+        from_attributes = True
+
+
+class IngestionJobAccepted(BaseModel):
+    job_id: uuid_pkg.UUID
+    status: str
+    message: str
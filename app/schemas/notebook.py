@@ -1,4 +1,4 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from datetime import datetime
 from typing import Optional
 import uuid as uuid_pkg
@@ -9,11 +9,14 @@ class NotebookCreate(BaseModel):
 class NotebookUpdate(BaseModel):
     name: Optional[str] = None
     summary: Optional[str] = None
+    # Hours between scheduled refreshes of the notebook's links; 0 disables, null uses the default
+    link_refresh_hours: Optional[int] = Field(None, ge=0)
 
 class NotebookResponse(BaseModel):
     public_id: uuid_pkg.UUID
     name: str
     summary: Optional[str] = None
+    link_refresh_hours: Optional[int] = None
     created_at: datetime
 
     class Config:
@@ -8,6 +8,9 @@ class SourceCreate(BaseModel):
     type: str
     view_url: Optional[str] = None
 
+class SourceUpdate(BaseModel):
+    enabled: bool
+
 class LinkRequest(BaseModel):
     url: str
 
@@ -26,6 +29,7 @@ class SourceResponse(BaseModel):
     type: str
     view_url: Optional[str] = None
     created_at: datetime
+    refreshed_at: Optional[datetime] = None
 
     class Config:
         from_attributes = True
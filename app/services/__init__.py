@@ -1,5 +1,6 @@
 from .vector_store import vector_store
 from .llm_service import llm_service
 from .database_service import DatabaseService
+from .ingestion import ingestion_service
 
-__all__ = ["vector_store", "llm_service", "DatabaseService"]
+__all__ = ["vector_store", "llm_service", "DatabaseService", "ingestion_service"]
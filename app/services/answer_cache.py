@@ -0,0 +1,148 @@
+from typing import Dict, List, Optional
+from collections import OrderedDict
+from dataclasses import dataclass
+from app.core import settings
+from app.services.cache_invalidation import invalidation_bus
+import numpy as np
+import time
+import unicodedata
+
+
+@dataclass
+class CachedAnswer:
+    question: str
+    embedding: Optional[np.ndarray]
+    response: str
+    sources: List[str]
+    created_at: float
+
+
+def normalize_question(question: str) -> str:
+    """Case-, accent-composition- and whitespace-insensitive form of a question."""
+    normalized = unicodedata.normalize("NFC", " ".join(question.split())).casefold()
+    return normalized.rstrip("?!. ")
+
+
+class AnswerCache:
+    """
+    Per-notebook cache of chat answers.
+
+    Lookups match the normalised question text first, then the query embedding
+    by cosine similarity (ANSWER_CACHE_SIMILARITY_THRESHOLD). Entries expire
+    after ANSWER_CACHE_TTL_SECONDS, each notebook keeps at most
+    ANSWER_CACHE_MAX_ENTRIES_PER_NOTEBOOK answers and at most
+    ANSWER_CACHE_MAX_NOTEBOOKS notebooks are cached (least recently used first
+    out). Any change to a notebook's embeddings must publish an "answer"
+    invalidation on invalidation_bus, which reaches every process.
+
+    Each invalidation also bumps the notebook's generation. Callers read
+    generation() before retrieving context and pass it to put(), which drops
+    the answer if the notebook was invalidated in between.
+    """
+
+    def __init__(self):
+        self._notebooks: "OrderedDict[int, OrderedDict[str, CachedAnswer]]" = OrderedDict()
+        self._generations: Dict[int, int] = {}
+        self.exact_hits = 0
+        self.semantic_hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self.stale_puts = 0
+
+    def _entries(self, notebook_id: int) -> Optional["OrderedDict[str, CachedAnswer]"]:
+        entries = self._notebooks.get(notebook_id)
+        if entries is None:
+            return None
+        self._notebooks.move_to_end(notebook_id)
+
+        expired_before = time.monotonic() - settings.ANSWER_CACHE_TTL_SECONDS
+        for key in [key for key, entry in entries.items() if entry.created_at < expired_before]:
+            del entries[key]
+        return entries
+
+    def get_exact(self, notebook_id: int, question: str) -> Optional[CachedAnswer]:
+        if not settings.ANSWER_CACHE_ENABLED:
+            return None
+        entries = self._entries(notebook_id)
+        entry = entries.get(normalize_question(question)) if entries else None
+        if entry is not None:
+            entries.move_to_end(entry.question)
+            self.exact_hits += 1
+        return entry
+
+    def get_similar(self, notebook_id: int, embedding: List[float]) -> Optional[CachedAnswer]:
+        if not settings.ANSWER_CACHE_ENABLED:
+            return None
+        entries = self._entries(notebook_id)
+        if entries:
+            query = self._normalize(embedding)
+            best, best_score = None, settings.ANSWER_CACHE_SIMILARITY_THRESHOLD
+            for entry in entries.values():
+                if entry.embedding is None or entry.embedding.shape != query.shape:
+                    # Cached before the notebook moved to another embedding dimension
+                    continue
+                score = float(np.dot(query, entry.embedding))
+                if score >= best_score:
+                    best, best_score = entry, score
+            if best is not None:
+                entries.move_to_end(best.question)
+                self.semantic_hits += 1
+                return best
+        self.misses += 1
+        return None
+
+    def generation(self, notebook_id: int) -> int:
+        """Number of invalidations of the notebook seen by this process."""
+        return self._generations.get(notebook_id, 0)
+
+    def put(self, notebook_id: int, question: str, embedding: Optional[List[float]],
+            response: str, sources: List[str], generation: int) -> None:
+        if not settings.ANSWER_CACHE_ENABLED:
+            return
+        if generation != self.generation(notebook_id):
+            # Built from context read before the notebook last changed
+            self.stale_puts += 1
+            return
+        entries = self._notebooks.setdefault(notebook_id, OrderedDict())
+        self._notebooks.move_to_end(notebook_id)
+        key = normalize_question(question)
+        entries[key] = CachedAnswer(
+            question=key,
+            embedding=self._normalize(embedding) if embedding is not None else None,
+            response=response,
+            sources=sources,
+            created_at=time.monotonic()
+        )
+        entries.move_to_end(key)
+        while len(entries) > settings.ANSWER_CACHE_MAX_ENTRIES_PER_NOTEBOOK:
+            entries.popitem(last=False)
+        while len(self._notebooks) > settings.ANSWER_CACHE_MAX_NOTEBOOKS:
+            self._notebooks.popitem(last=False)
+
+    def invalidate(self, notebook_id: int) -> None:
+        """Drop every cached answer of a notebook (sources added, deleted or toggled)."""
+        self._generations[notebook_id] = self.generation(notebook_id) + 1
+        if self._notebooks.pop(notebook_id, None) is not None:
+            self.invalidations += 1
+
+    def stats(self) -> dict:
+        return {
+            "enabled": settings.ANSWER_CACHE_ENABLED,
+            "notebooks": len(self._notebooks),
+            "entries": sum(len(entries) for entries in self._notebooks.values()),
+            "exact_hits": self.exact_hits,
+            "semantic_hits": self.semantic_hits,
+            "misses": self.misses,
+            "invalidations": self.invalidations,
+            "stale_puts": self.stale_puts,
+        }
+
+    @staticmethod
+    def _normalize(embedding: List[float]) -> np.ndarray:
+        vector = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+
+answer_cache = AnswerCache()
+invalidation_bus.register("answer", lambda key: answer_cache.invalidate(int(key)))
@@ -0,0 +1,41 @@
+from typing import Optional, Tuple
+from collections import OrderedDict
+from app.core import settings
+from app.services.cache_invalidation import invalidation_bus
+import time
+
+
+class ApiKeyCache:
+    """
+    In-process TTL cache of API key validation results, keyed by key hash.
+    Invalid keys are cached too, for API_KEY_CACHE_NEGATIVE_TTL_SECONDS.
+    """
+
+    def __init__(self):
+        self._entries: "OrderedDict[str, Tuple[bool, float]]" = OrderedDict()
+
+    def get(self, key_hash: str) -> Optional[bool]:
+        entry = self._entries.get(key_hash)
+        if entry is None:
+            return None
+        valid, expires_at = entry
+        if expires_at < time.monotonic():
+            del self._entries[key_hash]
+            return None
+        return valid
+
+    def put(self, key_hash: str, valid: bool):
+        ttl = settings.API_KEY_CACHE_TTL_SECONDS if valid else settings.API_KEY_CACHE_NEGATIVE_TTL_SECONDS
+        if ttl <= 0:
+            return
+        self._entries[key_hash] = (valid, time.monotonic() + ttl)
+        self._entries.move_to_end(key_hash)
+        while len(self._entries) > settings.API_KEY_CACHE_MAX_SIZE:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, key_hash: str):
+        self._entries.pop(key_hash, None)
+
+
+api_key_cache = ApiKeyCache()
+invalidation_bus.register("api_key", api_key_cache.invalidate)
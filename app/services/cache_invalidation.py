@@ -0,0 +1,82 @@
+from typing import Callable, Dict
+from sqlalchemy import event, text
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from app.core import settings
+import asyncio
+import asyncpg
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Session.info key of the invalidations published in the current transaction
+PENDING_KEY = "cache_invalidations"
+
+
+class CacheInvalidationBus:
+    """
+    Propagates in-process cache invalidations. Handlers are registered per
+    namespace; with CACHE_INVALIDATION_NOTIFY_ENABLED, invalidations are also
+    sent over Postgres NOTIFY so every worker process drops the entry.
+    """
+
+    def __init__(self):
+        self._handlers: Dict[str, Callable[[str], None]] = {}
+        event.listen(Session, "after_commit", self._dispatch_pending)
+        event.listen(Session, "after_rollback", self._drop_pending)
+
+    def register(self, namespace: str, handler: Callable[[str], None]):
+        self._handlers[namespace] = handler
+
+    def _dispatch(self, payload: str):
+        namespace, _, key = payload.partition(":")
+        handler = self._handlers.get(namespace)
+        if handler is not None:
+            handler(key)
+
+    def _dispatch_pending(self, session: Session):
+        for payload in session.info.pop(PENDING_KEY, []):
+            self._dispatch(payload)
+
+    def _drop_pending(self, session: Session):
+        session.info.pop(PENDING_KEY, None)
+
+    async def publish(self, db: AsyncSession, namespace: str, key: str):
+        """
+        Invalidate locally and, if enabled, notify other processes when db
+        commits. Call before committing the change that makes the entry stale.
+        """
+        payload = f"{namespace}:{key}"
+        db.sync_session.info.setdefault(PENDING_KEY, []).append(payload)
+        if settings.CACHE_INVALIDATION_NOTIFY_ENABLED:
+            await db.execute(
+                text("SELECT pg_notify(:channel, :payload)"),
+                {"channel": settings.CACHE_INVALIDATION_CHANNEL, "payload": payload}
+            )
+
+    async def listen(self):
+        """Receive invalidations from other processes, reconnecting on failure."""
+        dsn = make_url(settings.DATABASE_URL).set(drivername="postgresql").render_as_string(hide_password=False)
+        while True:
+            connection = None
+            try:
+                connection = await asyncpg.connect(dsn)
+                await connection.add_listener(
+                    settings.CACHE_INVALIDATION_CHANNEL,
+                    lambda conn, pid, channel, payload: self._dispatch(payload)
+                )
+                logger.info("Listening for cache invalidations on %s", settings.CACHE_INVALIDATION_CHANNEL)
+                while not connection.is_closed():
+                    await asyncio.sleep(5)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Cache invalidation listener failed, reconnecting")
+                await asyncio.sleep(5)
+            finally:
+                if connection is not None and not connection.is_closed():
+                    await connection.close()
+
+
+invalidation_bus = CacheInvalidationBus()
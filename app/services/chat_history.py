@@ -0,0 +1,53 @@
+from typing import Deque, List, Tuple
+from collections import OrderedDict, deque
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core import settings
+from app.services.database_service import DatabaseService
+
+Message = Tuple[str, str]
+
+
+class ChatHistoryCache:
+    """
+    Last CHAT_HISTORY_MESSAGES (role, content) pairs per conversation.
+
+    Loaded with a bounded query and then kept current by append(), so a chat
+    turn does not re-read the messages. Each entry records how many messages
+    the conversation had; messages are only ever added, so a different count
+    on get() means another process wrote to the conversation and the entry is
+    reloaded. The count is an index-only scan.
+    """
+
+    def __init__(self):
+        self._conversations: "OrderedDict[int, Tuple[Deque[Message], int]]" = OrderedDict()
+
+    async def get(self, db: AsyncSession, conversation_id: int) -> List[Message]:
+        count = await DatabaseService.count_messages(db, conversation_id)
+        entry = self._conversations.get(conversation_id)
+        if entry is not None and entry[1] == count:
+            self._conversations.move_to_end(conversation_id)
+            return list(entry[0])
+
+        messages = await DatabaseService.get_recent_messages(db, conversation_id, settings.CHAT_HISTORY_MESSAGES)
+        history = deque(((message.role, message.content) for message in messages), maxlen=settings.CHAT_HISTORY_MESSAGES)
+        self._store(conversation_id, history, count)
+        return list(history)
+
+    def append(self, conversation_id: int, role: str, content: str) -> None:
+        """Record a stored message; a no-op if the conversation is not cached."""
+        entry = self._conversations.get(conversation_id)
+        if entry is not None:
+            entry[0].append((role, content))
+            self._conversations[conversation_id] = (entry[0], entry[1] + 1)
+
+    def invalidate(self, conversation_id: int) -> None:
+        self._conversations.pop(conversation_id, None)
+
+    def _store(self, conversation_id: int, history: Deque[Message], count: int) -> None:
+        self._conversations[conversation_id] = (history, count)
+        self._conversations.move_to_end(conversation_id)
+        while len(self._conversations) > settings.CHAT_HISTORY_CACHE_SIZE:
+            self._conversations.popitem(last=False)
+
+
+chat_history = ChatHistoryCache()
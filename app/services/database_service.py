@@ -1,18 +1,39 @@
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, delete
-from typing import List, Optional
+from sqlalchemy import select, delete, update, func, tuple_, literal
+from sqlalchemy.sql import Select
+from typing import Dict, List, Optional, Type
 from app.models import Notebook, Conversation, ChatMessage, Source, ApiKey
 from app.schemas import (
     NotebookCreate, NotebookResponse,
     ConversationCreate, ConversationResponse,
     ChatMessageResponse, SourceResponse,
-    ApiKeyCreate, ApiKeyResponse
+    ApiKeyCreate, ApiKeyResponse, Page
 )
+from app.core.security import hash_api_key
+from app.utils.pagination import PageParams, encode_cursor
 import uuid as uuid_pkg
 import secrets
 
 
 class DatabaseService:
+    @staticmethod
+    async def _paginate(db: AsyncSession, query: Select, model, schema: Type, page: PageParams) -> Page:
+        """Keyset pagination on (created_at, id), oldest first."""
+        if page.after is not None:
+            created_at, row_id = page.after
+            query = query.where(
+                tuple_(model.created_at, model.id)
+                > tuple_(literal(created_at, model.created_at.type), literal(row_id, model.id.type))
+            )
+        result = await db.execute(query.order_by(model.created_at, model.id).limit(page.limit + 1))
+        rows = result.scalars().all()
+        
+        next_cursor = None
+        if len(rows) > page.limit:
+            rows = rows[:page.limit]
+            next_cursor = encode_cursor(rows[-1].created_at, rows[-1].id)
+        return Page(items=[schema.model_validate(row) for row in rows], next_cursor=next_cursor)
+    
     @staticmethod
     async def create_notebook(db: AsyncSession, notebook: NotebookCreate) -> NotebookResponse:
         db_notebook = Notebook(name=notebook.name)
@@ -22,10 +43,8 @@ class DatabaseService:
         return NotebookResponse.model_validate(db_notebook)
     
     @staticmethod
-    async def get_all_notebooks(db: AsyncSession) -> List[NotebookResponse]:
-        result = await db.execute(select(Notebook))
-        notebooks = result.scalars().all()
-        return [NotebookResponse.model_validate(nb) for nb in notebooks]
+    async def get_all_notebooks(db: AsyncSession, page: PageParams) -> Page[NotebookResponse]:
+        return await DatabaseService._paginate(db, select(Notebook), Notebook, NotebookResponse, page)
     
     @staticmethod
     async def get_notebook(db: AsyncSession, public_id: uuid_pkg.UUID) -> Optional[Notebook]:
@@ -42,6 +61,11 @@ class DatabaseService:
             await db.refresh(notebook)
         return NotebookResponse.model_validate(notebook)
     
+    @staticmethod
+    async def update_notebook_link_refresh(db: AsyncSession, public_id: uuid_pkg.UUID, hours: Optional[int]):
+        await db.execute(update(Notebook).where(Notebook.public_id == public_id).values(link_refresh_hours=hours))
+        await db.commit()
+    
     @staticmethod
     async def update_notebook_summary(db: AsyncSession, public_id: uuid_pkg.UUID, summary: str):
         result = await db.execute(select(Notebook).where(Notebook.public_id == public_id))
@@ -68,12 +92,13 @@ class DatabaseService:
         return ConversationResponse.model_validate(db_conversation)
     
     @staticmethod
-    async def get_conversations(db: AsyncSession, notebook_id: int) -> List[ConversationResponse]:
-        result = await db.execute(
-            select(Conversation).where(Conversation.notebook_id == notebook_id)
+    async def get_conversations(db: AsyncSession, notebook_id: int,
+                                page: PageParams) -> Page[ConversationResponse]:
+        return await DatabaseService._paginate(
+            db,
+            select(Conversation).where(Conversation.notebook_id == notebook_id),
+            Conversation, ConversationResponse, page
         )
-        conversations = result.scalars().all()
-        return [ConversationResponse.model_validate(conv) for conv in conversations]
     
     @staticmethod
     async def get_conversation(db: AsyncSession, public_id: uuid_pkg.UUID) -> Optional[Conversation]:
@@ -100,12 +125,31 @@ class DatabaseService:
         return ChatMessageResponse.model_validate(db_message)
     
     @staticmethod
-    async def get_chat_history(db: AsyncSession, conversation_id: int) -> List[ChatMessageResponse]:
+    async def get_chat_history(db: AsyncSession, conversation_id: int,
+                               page: PageParams) -> Page[ChatMessageResponse]:
+        return await DatabaseService._paginate(
+            db,
+            select(ChatMessage).where(ChatMessage.conversation_id == conversation_id),
+            ChatMessage, ChatMessageResponse, page
+        )
+    
+    @staticmethod
+    async def get_recent_messages(db: AsyncSession, conversation_id: int, limit: int) -> List[ChatMessage]:
+        """The last limit messages of a conversation, oldest first."""
         result = await db.execute(
-            select(ChatMessage).where(ChatMessage.conversation_id == conversation_id)
+            select(ChatMessage)
+            .where(ChatMessage.conversation_id == conversation_id)
+            .order_by(ChatMessage.created_at.desc(), ChatMessage.id.desc())
+            .limit(limit)
         )
-        messages = result.scalars().all()
-        return [ChatMessageResponse.model_validate(msg) for msg in messages]
+        return list(reversed(result.scalars().all()))
+    
+    @staticmethod
+    async def count_messages(db: AsyncSession, conversation_id: int) -> int:
+        result = await db.execute(
+            select(func.count()).select_from(ChatMessage).where(ChatMessage.conversation_id == conversation_id)
+        )
+        return result.scalar_one()
     
     @staticmethod
     async def add_source(db: AsyncSession, notebook_id: int, name: str, 
@@ -122,10 +166,30 @@ class DatabaseService:
         return db_source
     
     @staticmethod
-    async def get_sources(db: AsyncSession, notebook_id: int) -> List[SourceResponse]:
-        result = await db.execute(select(Source).where(Source.notebook_id == notebook_id))
-        sources = result.scalars().all()
-        return [SourceResponse.model_validate(src) for src in sources]
+    async def get_sources(db: AsyncSession, notebook_id: int, page: PageParams) -> Page[SourceResponse]:
+        return await DatabaseService._paginate(
+            db, select(Source).where(Source.notebook_id == notebook_id), Source, SourceResponse, page
+        )
+    
+    @staticmethod
+    async def get_source(db: AsyncSession, public_id: uuid_pkg.UUID) -> Optional[Source]:
+        result = await db.execute(select(Source).where(Source.public_id == public_id))
+        return result.scalar_one_or_none()
+    
+    @staticmethod
+    async def get_sources_by_payload(db: AsyncSession, notebook_id: int, source_type: str,
+                                     key: str, values: List[str]) -> Dict[str, Source]:
+        """Sources of a notebook fetched from the given urls/drive ids, keyed by that value."""
+        if not values:
+            return {}
+        result = await db.execute(
+            select(Source).where(
+                Source.notebook_id == notebook_id,
+                Source.type == source_type,
+                Source.payload[key].astext.in_(values)
+            )
+        )
+        return {source.payload[key]: source for source in result.scalars().all()}
     
     @staticmethod
     async def delete_source(db: AsyncSession, public_id: uuid_pkg.UUID):
@@ -135,24 +199,37 @@ class DatabaseService:
     @staticmethod
     async def create_api_key(db: AsyncSession, api_key_create: ApiKeyCreate) -> tuple[ApiKeyResponse, str]:
         api_key = f"dca_{secrets.token_urlsafe(32)}"
-        db_api_key = ApiKey(key=api_key, name=api_key_create.name)
+        db_api_key = ApiKey(key_hash=hash_api_key(api_key), name=api_key_create.name)
         db.add(db_api_key)
         await db.commit()
         await db.refresh(db_api_key)
         return ApiKeyResponse.model_validate(db_api_key), api_key
     
     @staticmethod
-    async def get_all_api_keys(db: AsyncSession) -> List[ApiKeyResponse]:
-        result = await db.execute(select(ApiKey))
-        api_keys = result.scalars().all()
-        return [ApiKeyResponse.model_validate(key) for key in api_keys]
+    async def get_all_api_keys(db: AsyncSession, page: PageParams) -> Page[ApiKeyResponse]:
+        return await DatabaseService._paginate(db, select(ApiKey), ApiKey, ApiKeyResponse, page)
     
     @staticmethod
     async def validate_api_key(db: AsyncSession, api_key: str) -> bool:
-        result = await db.execute(select(ApiKey).where(ApiKey.key == api_key, ApiKey.is_active == True))
+        result = await db.execute(
+            select(ApiKey.id).where(ApiKey.key_hash == hash_api_key(api_key), ApiKey.is_active == True)
+        )
         return result.scalar_one_or_none() is not None
     
     @staticmethod
-    async def delete_api_key(db: AsyncSession, public_id: uuid_pkg.UUID):
-        await db.execute(delete(ApiKey).where(ApiKey.public_id == public_id))
+    async def revoke_api_key(db: AsyncSession, public_id: uuid_pkg.UUID) -> Optional[str]:
+        """Deactivate a key. Returns its hash, or None if it does not exist."""
+        result = await db.execute(
+            update(ApiKey).where(ApiKey.public_id == public_id).values(is_active=False).returning(ApiKey.key_hash)
+        )
+        key_hash = result.scalar_one_or_none()
+        await db.commit()
+        return key_hash
+    
+    @staticmethod
+    async def delete_api_key(db: AsyncSession, public_id: uuid_pkg.UUID) -> Optional[str]:
+        """Delete a key. Returns its hash, or None if it does not exist."""
+        result = await db.execute(delete(ApiKey).where(ApiKey.public_id == public_id).returning(ApiKey.key_hash))
+        key_hash = result.scalar_one_or_none()
         await db.commit()
+        return key_hash
@@ -0,0 +1,183 @@
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+from collections import OrderedDict
+from array import array
+from sqlalchemy import select, delete
+from sqlalchemy.dialects.postgresql import insert
+from langchain_core.embeddings import Embeddings
+from app.db.base import async_session_maker
+from app.models import EmbeddingCacheEntry
+from app.core import settings
+import asyncio
+import hashlib
+import logging
+import unicodedata
+
+logger = logging.getLogger(__name__)
+
+LOOKUP_BATCH_SIZE = 1000
+
+CacheKey = Tuple[str, str, str]
+
+
+def content_hash(text: str) -> str:
+    """SHA-256 of the text after Unicode and whitespace normalisation."""
+    normalised = unicodedata.normalize("NFC", " ".join(text.split()))
+    return hashlib.sha256(normalised.encode("utf-8")).hexdigest()
+
+
+class EmbeddingCache:
+    """
+    Content-addressed embedding cache shared by all notebooks.
+
+    Entries are keyed by ("<embedding model>:<dimensions>", task type, content
+    hash). A bounded in-process LRU sits in front of the embedding_cache table.
+    Changing GEMINI_EMBEDDING_MODEL changes every key, and purge_stale_models()
+    removes the rows left behind by previous models.
+    """
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self._lru: "OrderedDict[CacheKey, array]" = OrderedDict()
+        self.memory_hits = 0
+        self.db_hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def model_key(dimensions: Optional[int] = None) -> str:
+        return f"{settings.GEMINI_EMBEDDING_MODEL}:{dimensions or settings.EMBEDDING_DIMENSIONS}"
+
+    def _key(self, task_type: str, text: str, dimensions: Optional[int] = None) -> CacheKey:
+        return (self.model_key(dimensions), task_type, content_hash(text))
+
+    def _remember(self, key: CacheKey, embedding) -> None:
+        self._lru[key] = array("f", embedding)
+        self._lru.move_to_end(key)
+        while len(self._lru) > self.max_size:
+            self._lru.popitem(last=False)
+
+    async def _load(self, keys: List[CacheKey]) -> Dict[CacheKey, List[float]]:
+        found = {}
+        model, task_type = keys[0][0], keys[0][1]
+        hashes = [key[2] for key in keys]
+        async with async_session_maker() as db:
+            for i in range(0, len(hashes), LOOKUP_BATCH_SIZE):
+                result = await db.execute(
+                    select(EmbeddingCacheEntry.content_hash, EmbeddingCacheEntry.embedding).where(
+                        EmbeddingCacheEntry.model == model,
+                        EmbeddingCacheEntry.task_type == task_type,
+                        EmbeddingCacheEntry.content_hash.in_(hashes[i:i + LOOKUP_BATCH_SIZE])
+                    )
+                )
+                for row in result:
+                    found[(model, task_type, row.content_hash)] = [float(x) for x in row.embedding]
+        return found
+
+    async def _store(self, entries: Dict[CacheKey, List[float]]) -> None:
+        rows = [
+            {"model": key[0], "task_type": key[1], "content_hash": key[2], "embedding": embedding}
+            for key, embedding in entries.items()
+        ]
+        async with async_session_maker() as db:
+            await db.execute(insert(EmbeddingCacheEntry).on_conflict_do_nothing(), rows)
+            await db.commit()
+
+    async def get_or_embed(self, task_type: str, texts: List[str],
+                           embed: Callable[[List[str]], Awaitable[List[List[float]]]],
+                           dimensions: Optional[int] = None) -> List[List[float]]:
+        """
+        Return embeddings for texts, calling embed only for texts not seen
+        before. embed must produce dimensions-sized embeddings.
+        """
+        if not settings.EMBEDDING_CACHE_ENABLED or not texts:
+            return await embed(texts)
+
+        keys = [self._key(task_type, text, dimensions) for text in texts]
+        embeddings: Dict[CacheKey, List[float]] = {}
+        for key in keys:
+            cached = self._lru.get(key)
+            if cached is not None:
+                self._lru.move_to_end(key)
+                embeddings[key] = cached.tolist()
+                self.memory_hits += 1
+
+        missing = list(dict.fromkeys(key for key in keys if key not in embeddings))
+        if missing:
+            try:
+                stored = await self._load(missing)
+            except Exception:
+                logger.exception("Embedding cache lookup failed")
+                stored = {}
+            self.db_hits += len(stored)
+            for key, embedding in stored.items():
+                embeddings[key] = embedding
+                self._remember(key, embedding)
+
+        # Embed each distinct missing text once
+        to_embed = {}
+        for key, text in zip(keys, texts):
+            if key not in embeddings and key not in to_embed:
+                to_embed[key] = text
+        if to_embed:
+            self.misses += len(to_embed)
+            computed = dict(zip(to_embed, await embed(list(to_embed.values()))))
+            for key, embedding in computed.items():
+                embeddings[key] = embedding
+                self._remember(key, embedding)
+            try:
+                await self._store(computed)
+            except Exception:
+                logger.exception("Embedding cache write failed")
+
+        return [embeddings[key] for key in keys]
+
+    async def purge_stale_models(self) -> int:
+        """Delete cached embeddings produced by any model other than the configured one."""
+        async with async_session_maker() as db:
+            result = await db.execute(
+                delete(EmbeddingCacheEntry)
+                .where(~EmbeddingCacheEntry.model.startswith(f"{settings.GEMINI_EMBEDDING_MODEL}:", autoescape=True))
+            )
+            await db.commit()
+        for key in [key for key in self._lru if not key[0].startswith(f"{settings.GEMINI_EMBEDDING_MODEL}:")]:
+            del self._lru[key]
+        return result.rowcount
+
+    def stats(self) -> dict:
+        lookups = self.memory_hits + self.db_hits + self.misses
+        return {
+            "enabled": settings.EMBEDDING_CACHE_ENABLED,
+            "model": settings.GEMINI_EMBEDDING_MODEL,
+            "memory_entries": len(self._lru),
+            "memory_hits": self.memory_hits,
+            "db_hits": self.db_hits,
+            "misses": self.misses,
+            "hit_rate": (self.memory_hits + self.db_hits) / lookups if lookups else 0.0,
+        }
+
+
+class CachedEmbeddings(Embeddings):
+    """
+    LangChain embeddings adapter for code running in worker threads (e.g. the
+    semantic chunker). Calls are scheduled on the event loop so they go through
+    the embedding cache and the shared embedding limits.
+    """
+
+    def __init__(self, loop: asyncio.AbstractEventLoop,
+                 embed_documents: Callable[[List[str], Optional[int]], Awaitable[List[List[float]]]],
+                 embed_query: Callable[[str, Optional[int]], Awaitable[List[float]]],
+                 dimensions: Optional[int] = None):
+        self._loop = loop
+        self._embed_documents = embed_documents
+        self._embed_query = embed_query
+        self._dimensions = dimensions
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return asyncio.run_coroutine_threadsafe(
+            self._embed_documents(texts, self._dimensions), self._loop
+        ).result()
+
+    def embed_query(self, text: str) -> List[float]:
+        return asyncio.run_coroutine_threadsafe(self._embed_query(text, self._dimensions), self._loop).result()
+
+
+embedding_cache = EmbeddingCache(settings.EMBEDDING_CACHE_MEMORY_SIZE)
@@ -1,86 +1,106 @@
-import requests
-import base64
+from typing import Any, List
+from pathlib import Path
 from app.core import settings
+from app.core.executor import run_in_thread
+from app.core.http_client import get_http_client
+from app.utils.ttl_cache import TTLCache
 from fastapi import HTTPException
-from typing import List
+import httpx
+
+DOWNLOAD_CHUNK_SIZE = 1024 * 1024
 
 
 class EstanteService:
-    """Service for interacting with Estante de Livros API."""
+    """
+    Service for interacting with Estante de Livros API.
+
+    Requests go through the shared pooled HTTP client. Catalogue lookups
+    (areas, modalities, books) are cached with stale-while-revalidate, and
+    concurrent identical lookups share one upstream request.
+    """
     
     def __init__(self):
-        self.base_url = settings.ESTANTE_BASE_URL
+        self.base_url = settings.ESTANTE_BASE_URL.rstrip("/")
         self.username = settings.ESTANTE_USERNAME
         self.password = settings.ESTANTE_PASSWORD
+        self._auth = httpx.BasicAuth(self.username, self.password) if self.username and self.password else None
+        self.catalogue_cache = TTLCache(
+            ttl=settings.ESTANTE_CACHE_TTL_SECONDS,
+            stale=settings.ESTANTE_CACHE_STALE_SECONDS,
+            max_entries=settings.ESTANTE_CACHE_MAX_ENTRIES
+        )
     
-    def _get_headers(self) -> dict:
-        """Get authorization headers."""
-        if not self.username or not self.password:
+    def _get_auth(self) -> httpx.BasicAuth:
+        """Get authorization for Estante requests."""
+        if self._auth is None:
             raise HTTPException(
                 status_code=500, 
                 detail="Credenciais da Estante não configuradas"
             )
-        
-        auth = base64.b64encode(f"{self.username}:{self.password}".encode()).decode()
-        return {"Authorization": f"Basic {auth}"}
+        return self._auth
     
-    async def get_areas(self) -> List[dict]:
-        """Get all technological areas."""
+    async def _get_json(self, path: str) -> Any:
+        response = await get_http_client().get(
+            f"{self.base_url}{path}",
+            auth=self._get_auth(),
+            timeout=settings.ESTANTE_TIMEOUT_SECONDS
+        )
+        response.raise_for_status()
+        return response.json()
+    
+    async def _get_catalogue(self, path: str, error: str) -> List[dict]:
         try:
-            response = requests.get(
-                f"{self.base_url}/areasTecnologicas",
-                headers=self._get_headers(),
-                timeout=10
-            )
-            response.raise_for_status()
-            return response.json()
+            return await self.catalogue_cache.get_or_load(path, lambda: self._get_json(path))
+        except HTTPException:
+            raise
         except Exception as e:
             raise HTTPException(
                 status_code=400, 
-                detail=f"Erro ao buscar áreas: {str(e)}"
+                detail=f"{error}: {str(e)}"
             )
     
+    async def get_areas(self) -> List[dict]:
+        """Get all technological areas."""
+        return await self._get_catalogue("/areasTecnologicas", "Erro ao buscar áreas")
+    
     async def get_modalidades(self, area_id: int) -> List[dict]:
         """Get modalities for a technological area."""
-        try:
-            response = requests.get(
-                f"{self.base_url}/areaTecnologica/{area_id}/modalidades",
-                headers=self._get_headers(),
-                timeout=10
-            )
-            response.raise_for_status()
-            return response.json()
-        except Exception as e:
-            raise HTTPException(
-                status_code=400, 
-                detail=f"Erro ao buscar modalidades: {str(e)}"
-            )
+        return await self._get_catalogue(
+            f"/areaTecnologica/{area_id}/modalidades", "Erro ao buscar modalidades"
+        )
     
     async def get_livros(self, area_id: int, modalidade_id: int) -> List[dict]:
         """Get books for an area and modality."""
-        try:
-            response = requests.get(
-                f"{self.base_url}/areaTecnologica/{area_id}/modalidade/{modalidade_id}/livros",
-                headers=self._get_headers(),
-                timeout=10
-            )
-            response.raise_for_status()
-            return response.json()
-        except Exception as e:
-            raise HTTPException(
-                status_code=400, 
-                detail=f"Erro ao buscar livros: {str(e)}"
-            )
+        return await self._get_catalogue(
+            f"/areaTecnologica/{area_id}/modalidade/{modalidade_id}/livros", "Erro ao buscar livros"
+        )
     
-    def download_book(self, drive_id: str) -> bytes:
-        """Download a book by drive ID."""
-        response = requests.get(
+    async def download_book(self, drive_id: str, destination: Path, max_bytes: int) -> int:
+        """
+        Stream a book by drive ID into destination, chunk by chunk.
+        Raises ValueError if it is larger than max_bytes. Returns the size written.
+        """
+        async with get_http_client().stream(
+            "GET",
             f"{self.base_url}/livros/{drive_id}/download",
-            headers=self._get_headers(),
-            timeout=30
-        )
-        response.raise_for_status()
-        return response.content
+            auth=self._get_auth(),
+            timeout=settings.ESTANTE_DOWNLOAD_TIMEOUT_SECONDS
+        ) as response:
+            response.raise_for_status()
+            declared = int(response.headers.get("Content-Length") or 0)
+            if declared > max_bytes:
+                raise ValueError(f"Book is {declared} bytes, above the {max_bytes} byte limit")
+            written = 0
+            with await run_in_thread("file", open, destination, "wb") as f:
+                async for chunk in response.aiter_bytes(DOWNLOAD_CHUNK_SIZE):
+                    written += len(chunk)
+                    if written > max_bytes:
+                        raise ValueError(f"Book exceeds the {max_bytes} byte limit")
+                    await run_in_thread("file", f.write, chunk)
+            return written
+    
+    def stats(self) -> dict:
+        return self.catalogue_cache.stats()
 
 
 estante_service = EstanteService()
@@ -0,0 +1,508 @@
+from typing import Callable, List, Optional
+from dataclasses import dataclass, field
+from pathlib import Path
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, update, delete, or_, and_, func
+from sqlalchemy.orm import selectinload
+from app.db.base import async_session_maker
+from app.models import IngestionJob, IngestionJobItem, Notebook, Source
+from app.core import settings
+from app.core.executor import limit, run_in_thread, run_in_process
+from app.services.vector_store import vector_store, chunk_hash
+from app.services.cache_invalidation import invalidation_bus
+from app.services.estante import estante_service
+from app.utils.text_extraction import ExtractionError, extract_from_path, text_extractor
+from app.utils.chunking import Chunk, chunk_document, chunk_embeddings
+from app.utils.web_scraper import fetch_page, html_to_markdown
+from datetime import timedelta
+import asyncio
+import hashlib
+import logging
+import shutil
+import uuid as uuid_pkg
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class _Document:
+    """A job item on its way through the ingestion pipeline."""
+    item_id: int
+    name: str
+    source_type: str
+    payload: dict
+    text: str = ""
+    extracted_chars: int = 0
+    chunks: List[Chunk] = field(default_factory=list)
+    embeddings: Optional[List[List[float]]] = None
+    # Embedding dimension of the notebook when the job started
+    dimensions: Optional[int] = None
+    # Source being refreshed, and the content_hash/etag/last_modified of its last fetch
+    source_id: Optional[int] = None
+    previous: dict = field(default_factory=dict)
+    # The same fields for this fetch, stored on the source
+    fetched: dict = field(default_factory=dict)
+    # The refreshed source's document has not changed since the last fetch
+    unchanged: bool = False
+
+
+def _read_spooled_page(path: str) -> str:
+    """Markdown spooled by the link refresh scheduler (raw HTML for jobs queued by older versions)."""
+    if path.endswith(".html"):
+        with open(path, "rb") as f:
+            return html_to_markdown(f.read())
+    return Path(path).read_text(encoding="utf-8")
+
+
+def _file_sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def max_file_bytes() -> int:
+    """Largest upload or download accepted for ingestion."""
+    return settings.INGESTION_MAX_FILE_SIZE_MB * 1024 * 1024
+
+
+class IngestionService:
+    """Postgres-backed queue of ingestion jobs (uploads, links and Estante books)."""
+
+    def __init__(self):
+        # Wakes up in-process workers as soon as a job is enqueued
+        self.job_available = asyncio.Event()
+
+    def spool_dir(self, job_public_id: uuid_pkg.UUID) -> Path:
+        """Directory holding the uploaded files of a job until it finishes."""
+        return Path(settings.INGESTION_SPOOL_DIR) / str(job_public_id)
+
+    async def enqueue_job(self, db: AsyncSession, notebook_id: int, kind: str, items: List[dict],
+                          public_id: Optional[uuid_pkg.UUID] = None) -> IngestionJob:
+        """
+        Create a pending job. Each item is a dict with name, source_type and payload.
+        """
+        job = IngestionJob(public_id=public_id or uuid_pkg.uuid4(), notebook_id=notebook_id, kind=kind)
+        job.items = [
+            IngestionJobItem(
+                position=i,
+                name=item["name"],
+                source_type=item["source_type"],
+                payload=item["payload"]
+            )
+            for i, item in enumerate(items)
+        ]
+        db.add(job)
+        await db.commit()
+        await db.refresh(job)
+        self.job_available.set()
+        return job
+
+    def refresh_item(self, source: Source) -> dict:
+        """Job item fetching an existing link or book again and updating it in place."""
+        return {
+            "name": source.name,
+            "source_type": source.type,
+            "payload": dict(source.payload, source_id=source.id)
+        }
+
+    async def get_job(self, db: AsyncSession, public_id: uuid_pkg.UUID) -> Optional[IngestionJob]:
+        result = await db.execute(
+            select(IngestionJob)
+            .options(selectinload(IngestionJob.items))
+            .where(IngestionJob.public_id == public_id)
+        )
+        return result.scalar_one_or_none()
+
+    async def claim_job(self, db: AsyncSession, worker_id: str) -> Optional[int]:
+        """
+        Lock the oldest pending job, or a running job whose worker stopped heartbeating.
+        SKIP LOCKED lets several workers drain the queue in parallel.
+        """
+        stale_before = func.now() - timedelta(seconds=settings.INGESTION_JOB_LEASE_SECONDS)
+        result = await db.execute(
+            select(IngestionJob)
+            .where(or_(
+                IngestionJob.status == "pending",
+                and_(IngestionJob.status == "running", IngestionJob.locked_at < stale_before)
+            ))
+            .order_by(IngestionJob.created_at)
+            .limit(1)
+            .with_for_update(skip_locked=True)
+        )
+        job = result.scalar_one_or_none()
+        if job is None:
+            await db.rollback()
+            return None
+
+        if job.attempts >= settings.INGESTION_JOB_MAX_ATTEMPTS:
+            job.status = "failed"
+            job.error = f"Gave up after {job.attempts} attempts"
+            job.finished_at = func.now()
+            await db.commit()
+            self._remove_spool_dir(job.public_id)
+            return None
+
+        job.status = "running"
+        job.attempts += 1
+        job.locked_by = worker_id
+        job.locked_at = func.now()
+        await db.commit()
+        return job.id
+
+    async def _heartbeat(self, job_id: int, worker_id: str):
+        """Keep the job lease fresh while it is being processed."""
+        interval = settings.INGESTION_JOB_LEASE_SECONDS / 3
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                async with async_session_maker() as db:
+                    await db.execute(
+                        update(IngestionJob)
+                        .where(IngestionJob.id == job_id, IngestionJob.locked_by == worker_id)
+                        .values(locked_at=func.now())
+                    )
+                    await db.commit()
+            except Exception:
+                logger.exception("Failed to refresh lease of ingestion job %s", job_id)
+
+    async def process_job(self, job_id: int, worker_id: str):
+        """Process every unfinished item of a claimed job through the ingestion pipeline."""
+        heartbeat = asyncio.create_task(self._heartbeat(job_id, worker_id))
+        try:
+            async with async_session_maker() as db:
+                job = await db.get(IngestionJob, job_id)
+                if job is None:
+                    return
+                result = await db.execute(
+                    select(IngestionJobItem)
+                    .where(IngestionJobItem.job_id == job_id)
+                    .order_by(IngestionJobItem.position)
+                )
+                items = result.scalars().all()
+                notebook_id = job.notebook_id
+                job_public_id = job.public_id
+
+                documents = []
+                for item in items:
+                    if item.status in ("completed", "failed"):
+                        continue
+                    if item.source_id is not None:
+                        # A previous attempt crashed halfway; drop its partial source and start over
+                        await vector_store.delete_source_embeddings(db, notebook_id, item.source_id)
+                        await db.execute(delete(Source).where(Source.id == item.source_id))
+                    item.status = "running"
+                    item.error = None
+                    item.source_id = None
+                    item.extracted_chars = item.chunked_count = item.embedded_count = 0
+                    document = _Document(item.id, item.name, item.source_type, item.payload)
+                    if "source_id" in item.payload:
+                        source = await db.get(Source, item.payload["source_id"])
+                        if source is None:
+                            item.status = "failed"
+                            item.error = "refresh: source no longer exists"
+                            continue
+                        document.source_id = source.id
+                        document.previous = {
+                            "content_hash": source.content_hash,
+                            "etag": source.etag,
+                            "last_modified": source.last_modified
+                        }
+                    documents.append(document)
+                dimensions = await vector_store.get_dimensions(db, notebook_id)
+                for document in documents:
+                    document.dimensions = dimensions
+                await db.commit()
+
+            if documents:
+                await self._run_pipeline(notebook_id, documents)
+
+            async with async_session_maker() as db:
+                statuses = (await db.execute(
+                    select(IngestionJobItem.status).where(IngestionJobItem.job_id == job_id)
+                )).scalars().all()
+                failed = [status for status in statuses if status == "failed"]
+                await db.execute(
+                    update(IngestionJob)
+                    .where(IngestionJob.id == job_id)
+                    .values(
+                        status="failed" if statuses and len(failed) == len(statuses) else "completed",
+                        error=f"{len(failed)} of {len(statuses)} item(s) failed" if failed else None,
+                        finished_at=func.now()
+                    )
+                )
+                await db.commit()
+            self._remove_spool_dir(job_public_id)
+        finally:
+            heartbeat.cancel()
+
+    async def _run_pipeline(self, notebook_id: int, documents: List["_Document"]):
+        """
+        Extract -> chunk -> embed -> write, with INGESTION_*_PARALLELISM workers
+        per stage and bounded queues in between, so a slow stage holds back the
+        ones before it instead of buffering whole documents in memory. A failing
+        document is marked failed and dropped; the others carry on.
+        """
+        queue_size = settings.INGESTION_QUEUE_SIZE
+        to_extract: asyncio.Queue = asyncio.Queue()
+        to_chunk: asyncio.Queue = asyncio.Queue(queue_size)
+        to_embed: asyncio.Queue = asyncio.Queue(queue_size)
+        to_write: asyncio.Queue = asyncio.Queue(queue_size)
+        for document in documents:
+            to_extract.put_nowait(document)
+        to_extract.put_nowait(None)
+
+        await asyncio.gather(
+            self._stage("extract", self._extract, to_extract, to_chunk,
+                        settings.INGESTION_EXTRACT_PARALLELISM, notebook_id),
+            self._stage("chunk", self._chunk, to_chunk, to_embed,
+                        settings.INGESTION_CHUNK_PARALLELISM, notebook_id),
+            self._stage("embed", self._embed, to_embed, to_write,
+                        settings.INGESTION_EMBED_PARALLELISM, notebook_id),
+            self._write(to_write, notebook_id),
+        )
+
+    async def _stage(self, name: str, func: Callable, inbox: asyncio.Queue, outbox: asyncio.Queue,
+                     parallelism: int, notebook_id: int):
+        """Run func on every document of inbox with parallelism workers; None ends the stream."""
+        async def worker():
+            while True:
+                document = await inbox.get()
+                if document is None:
+                    # Let the other workers of this stage see the end of the stream too
+                    inbox.put_nowait(None)
+                    return
+                try:
+                    await func(document)
+                except Exception as e:
+                    await self._fail(notebook_id, document, name, e)
+                    continue
+                await outbox.put(document)
+
+        try:
+            await asyncio.gather(*(worker() for _ in range(max(1, parallelism))))
+        finally:
+            await outbox.put(None)
+
+    async def _extract(self, document: "_Document"):
+        document.text = await self._load_text(document) or ""
+        document.extracted_chars = len(document.text)
+        if not document.text and not document.unchanged:
+            raise ValueError("No content extracted")
+
+    async def _chunk(self, document: "_Document"):
+        if document.unchanged:
+            return
+        document.chunks = await run_in_thread(
+            "chunking", chunk_document, document.text,
+            embeddings=vector_store.langchain_embeddings(document.dimensions)
+        )
+        document.text = ""
+        if not document.chunks:
+            raise ValueError("No chunks produced")
+
+    async def _embed(self, document: "_Document"):
+        if document.unchanged:
+            return
+        document.embeddings = chunk_embeddings(document.chunks)
+        if document.embeddings is not None:
+            return
+        texts = [chunk.text for chunk in document.chunks]
+        if document.source_id is None:
+            document.embeddings = await vector_store.embed_documents(texts, document.dimensions)
+            return
+
+        # Refresh: only chunks the source does not have yet need embedding
+        async with async_session_maker() as db:
+            stored = await vector_store.get_chunk_hashes(db, document.source_id)
+        missing = [i for i, text in enumerate(texts) if chunk_hash(text) not in stored]
+        document.embeddings = [None] * len(texts)
+        if missing:
+            embeddings = await vector_store.embed_documents([texts[i] for i in missing], document.dimensions)
+            for i, embedding in zip(missing, embeddings):
+                document.embeddings[i] = embedding
+
+    async def _write(self, inbox: asyncio.Queue, notebook_id: int):
+        """
+        Store embedded documents, up to INGESTION_WRITE_BATCH_SIZE per transaction.
+        If a batch fails, its documents are retried one by one so only the
+        offending document is marked failed.
+        """
+        finished = False
+        while not finished:
+            batch = []
+            document = await inbox.get()
+            while document is not None:
+                batch.append(document)
+                if len(batch) >= settings.INGESTION_WRITE_BATCH_SIZE or inbox.empty():
+                    break
+                document = inbox.get_nowait()
+            finished = document is None
+            if not batch:
+                continue
+
+            try:
+                await self._store(notebook_id, batch)
+            except Exception as e:
+                if len(batch) == 1:
+                    await self._fail(notebook_id, batch[0], "write", e)
+                    continue
+                logger.warning("Batch write of %d documents failed, retrying one by one", len(batch))
+                for document in batch:
+                    try:
+                        await self._store(notebook_id, [document])
+                    except Exception as e:
+                        await self._fail(notebook_id, document, "write", e)
+
+    async def _store(self, notebook_id: int, batch: List["_Document"]):
+        async with async_session_maker() as db:
+            # FOR NO KEY UPDATE: writers of a notebook are serialised on its counters anyway, so
+            # take that lock up front (a share lock upgraded by the counter UPDATE deadlocks).
+            # A notebook re-embedding waits for this batch, and vice versa.
+            dimensions = (await db.execute(
+                select(Notebook.embedding_dimensions).where(Notebook.id == notebook_id).with_for_update(key_share=True)
+            )).scalar_one()
+            for document in batch:
+                if document.source_id is not None:
+                    source_id = document.source_id
+                    embedded = await self._store_refresh(db, notebook_id, document, dimensions)
+                else:
+                    if len(document.embeddings[0]) != dimensions:
+                        # The notebook moved to another dimension while this job ran
+                        document.embeddings = await vector_store.embed_documents(
+                            [chunk.text for chunk in document.chunks], dimensions
+                        )
+                    source = Source(
+                        notebook_id=notebook_id,
+                        name=document.name,
+                        type=document.source_type,
+                        view_url=document.payload.get("view_url"),
+                        payload=None if document.source_type == "file" else document.payload,
+                        **document.fetched
+                    )
+                    db.add(source)
+                    await db.flush()
+                    source_id = source.id
+                    embedded = await vector_store.insert_embeddings(
+                        db, notebook_id, source.id, [chunk.text for chunk in document.chunks],
+                        document.embeddings, document.name
+                    )
+                await db.execute(
+                    update(IngestionJobItem)
+                    .where(IngestionJobItem.id == document.item_id)
+                    .values(
+                        status="completed",
+                        source_id=source_id,
+                        extracted_chars=document.extracted_chars,
+                        chunked_count=len(document.chunks),
+                        embedded_count=embedded
+                    )
+                )
+            await invalidation_bus.publish(db, "answer", str(notebook_id))
+            await db.commit()
+        logger.info("Stored %d document(s): %s", len(batch), ", ".join(document.name for document in batch))
+
+    async def _store_refresh(self, db: AsyncSession, notebook_id: int, document: "_Document",
+                             dimensions: int) -> int:
+        """
+        Bring a refreshed source up to date in the caller's transaction.
+        Returns the number of chunks embedded.
+        """
+        source_id = (await db.execute(
+            select(Source.id).where(Source.id == document.source_id).with_for_update()
+        )).scalar_one_or_none()
+        if source_id is None:
+            raise ValueError("Source no longer exists")
+        await db.execute(
+            update(Source).where(Source.id == source_id).values(refreshed_at=func.now(), **document.fetched)
+        )
+        if document.unchanged:
+            logger.info("Refreshed %s: unchanged", document.name)
+            return 0
+
+        embeddings = [
+            # Embedded at a dimension the notebook has since left
+            embedding if embedding is not None and len(embedding) == dimensions else None
+            for embedding in document.embeddings
+        ]
+        added, kept, removed = await vector_store.replace_source_embeddings(
+            db, notebook_id, source_id, [chunk.text for chunk in document.chunks],
+            embeddings, document.name, dimensions
+        )
+        logger.info("Refreshed %s: %d chunk(s) added, %d kept, %d removed", document.name, added, kept, removed)
+        return added
+
+    async def _fail(self, notebook_id: int, document: "_Document", stage: str, error: Exception):
+        """Record a document's failure on its job item; nothing of it was stored."""
+        message = f"{stage}: {str(error) or type(error).__name__}"
+        logger.warning("Ingestion of %s failed during %s: %s", document.name, stage, error)
+        try:
+            async with async_session_maker() as db:
+                await db.execute(
+                    update(IngestionJobItem)
+                    .where(IngestionJobItem.id == document.item_id)
+                    .values(
+                        status="failed",
+                        error=message,
+                        extracted_chars=document.extracted_chars,
+                        chunked_count=len(document.chunks)
+                    )
+                )
+                await db.commit()
+        except Exception:
+            logger.exception("Failed to record the failure of ingestion item %s", document.item_id)
+
+    async def _load_text(self, item: "_Document") -> str:
+        payload = item.payload
+        if item.source_type == "file":
+            return await self._extract_file(payload["path"], item.name)
+        if item.source_type == "link" and "path" in payload:
+            # Fetched by the link refresh scheduler, which only queues pages that changed
+            item.fetched = payload["fetched"]
+            return await run_in_thread("file", _read_spooled_page, payload["path"])
+        if item.source_type == "link":
+            async with limit("http"):
+                page = await fetch_page(
+                    payload["url"], item.previous.get("etag"),
+                    item.previous.get("last_modified"), item.previous.get("content_hash")
+                )
+            item.fetched = {"content_hash": page.content_hash, "etag": page.etag, "last_modified": page.last_modified}
+            if page.content_bytes is not None:
+                item.fetched["content_bytes"] = page.content_bytes
+            item.unchanged = page.not_modified
+            return page.text
+        if item.source_type == "estante":
+            download_dir = Path(settings.INGESTION_SPOOL_DIR) / "downloads"
+            download_dir.mkdir(parents=True, exist_ok=True)
+            path = download_dir / f"{uuid_pkg.uuid4()}.pdf"
+            try:
+                async with limit("http"):
+                    await estante_service.download_book(payload["drive_id"], path, max_file_bytes())
+                content_hash = await run_in_thread("extraction", _file_sha256, str(path))
+                item.fetched = {"content_hash": content_hash, "content_bytes": path.stat().st_size}
+                if content_hash == item.previous.get("content_hash"):
+                    item.unchanged = True
+                    return ""
+                return await self._extract_file(str(path), f"{item.name}.pdf")
+            finally:
+                path.unlink(missing_ok=True)
+        raise ValueError(f"Unknown source type: {item.source_type}")
+
+    async def _extract_file(self, path: str, filename: str) -> str:
+        try:
+            extraction = await run_in_process("extraction", extract_from_path, path, filename)
+        except ExtractionError as e:
+            if settings.EXTRACTION_EXECUTOR == "process":
+                text_extractor.record(e.format, e.seconds, failed=True)
+            raise
+        if settings.EXTRACTION_EXECUTOR == "process":
+            # Timed in the worker process; mirror it here so /metrics sees it
+            text_extractor.record(extraction.format, extraction.seconds)
+        return extraction.text
+
+    def _remove_spool_dir(self, job_public_id: uuid_pkg.UUID):
+        shutil.rmtree(self.spool_dir(job_public_id), ignore_errors=True)
+
+
+ingestion_service = IngestionService()
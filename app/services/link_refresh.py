@@ -0,0 +1,258 @@
+from typing import Dict, List, Optional, Tuple
+from contextlib import asynccontextmanager
+from datetime import datetime, timezone
+from pathlib import Path
+from urllib.parse import urlsplit
+from sqlalchemy import or_, select, update, func
+from sqlalchemy.engine import Row
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core import settings
+from app.core.executor import run_in_thread
+from app.db.base import async_session_maker
+from app.models import Notebook, Source
+from app.services.ingestion import ingestion_service
+from app.utils.web_scraper import fetch_page
+import asyncio
+import logging
+import shutil
+import uuid as uuid_pkg
+
+logger = logging.getLogger(__name__)
+
+
+def _interval_hours():
+    """Refresh interval of a link's notebook, in SQL (requires the notebooks join)."""
+    return func.coalesce(Notebook.link_refresh_hours, settings.LINK_REFRESH_INTERVAL_HOURS)
+
+
+def _refresh_enabled():
+    """_interval_hours() > 0, split so the planner estimates it from link_refresh_hours statistics."""
+    if settings.LINK_REFRESH_INTERVAL_HOURS > 0:
+        return or_(Notebook.link_refresh_hours.is_(None), Notebook.link_refresh_hours > 0)
+    return Notebook.link_refresh_hours > 0
+
+
+def _checked():
+    return func.coalesce(Source.checked_at, Source.created_at)
+
+
+class HostLimiter:
+    """
+    Politeness limits for the crawler: at most per_host requests in flight to
+    a host, and requests to the same host started at least delay seconds
+    apart. Kept across runs, so consecutive batches respect the delay too.
+    """
+
+    def __init__(self, per_host: int, delay: float):
+        self.per_host = max(1, per_host)
+        self.delay = delay
+        self._semaphores: Dict[str, asyncio.Semaphore] = {}
+        self._next_start: Dict[str, float] = {}
+        self._users: Dict[str, int] = {}
+
+    @asynccontextmanager
+    async def slot(self, host: str):
+        self._users[host] = self._users.get(host, 0) + 1
+        try:
+            semaphore = self._semaphores.setdefault(host, asyncio.Semaphore(self.per_host))
+            async with semaphore:
+                now = asyncio.get_running_loop().time()
+                start = max(now, self._next_start.get(host, now))
+                self._next_start[host] = start + self.delay
+                if start > now:
+                    await asyncio.sleep(start - now)
+                yield
+        finally:
+            self._users[host] -= 1
+            if not self._users[host]:
+                del self._users[host]
+
+    def prune(self):
+        """Forget hosts that are idle and past their delay."""
+        now = asyncio.get_running_loop().time()
+        for host in [host for host, start in self._next_start.items() if start <= now and host not in self._users]:
+            del self._next_start[host]
+            self._semaphores.pop(host, None)
+
+
+class LinkRefreshService:
+    """
+    Scheduled refresh of link sources.
+
+    Each run claims up to LINK_REFRESH_BATCH_SIZE links whose notebook
+    interval has passed and fetches them concurrently with fetch_page, like
+    add-link: conditionally (ETag/Last-Modified), within per-host limits, and
+    only parsing bodies whose hash changed. Pages answered with 304 or with
+    an unchanged hash are only marked refreshed; the markdown of the changed
+    ones is spooled and queued as one refresh job per notebook, which
+    re-embeds just their new chunks. Links that fail are retried after
+    LINK_REFRESH_RETRY_MINUTES instead of a full interval.
+    """
+
+    def __init__(self):
+        self.limiter = HostLimiter(settings.LINK_REFRESH_PER_HOST_CONCURRENCY, settings.LINK_REFRESH_HOST_DELAY_SECONDS)
+        self.runs = 0
+        self.pages_fetched = 0
+        self.pages_not_modified = 0
+        self.pages_unchanged = 0
+        self.pages_changed = 0
+        self.failures = 0
+        self.bytes_downloaded = 0
+        self.bytes_saved = 0
+
+    async def claim_due(self, db: AsyncSession) -> List[Row]:
+        """
+        Stamp checked_at on the links due for a refresh and return them.
+        SKIP LOCKED keeps several schedulers from claiming the same links.
+        """
+        due = (
+            select(Source.id)
+            .join(Notebook, Notebook.id == Source.notebook_id)
+            .where(
+                Source.type == "link",
+                Source.payload.isnot(None),
+                _refresh_enabled(),
+                _checked() < func.now() - func.make_interval(0, 0, 0, 0, _interval_hours())
+            )
+            .order_by(_checked())
+            .limit(settings.LINK_REFRESH_BATCH_SIZE)
+            .with_for_update(of=Source, skip_locked=True)
+        )
+        result = await db.execute(
+            update(Source)
+            .where(Source.id.in_(due.scalar_subquery()))
+            .values(checked_at=func.now())
+            .returning(
+                Source.id, Source.notebook_id, Source.name, Source.type, Source.payload,
+                Source.content_hash, Source.etag, Source.last_modified, Source.content_bytes
+            )
+            .execution_options(synchronize_session=False)
+        )
+        sources = result.all()
+        await db.commit()
+        return sources
+
+    async def _retry_soon(self, db: AsyncSession, source_ids: List[int]):
+        """Backdate checked_at so failed links fall due again after LINK_REFRESH_RETRY_MINUTES."""
+        await db.execute(
+            update(Source)
+            .where(Source.id.in_(source_ids), Notebook.id == Source.notebook_id)
+            .values(checked_at=(
+                func.now() - func.make_interval(0, 0, 0, 0, _interval_hours())
+                + func.make_interval(0, 0, 0, 0, 0, settings.LINK_REFRESH_RETRY_MINUTES)
+            ))
+            .execution_options(synchronize_session=False)
+        )
+        await db.commit()
+
+    async def _check(self, source: Row, spool_dir: Path,
+                     semaphore: asyncio.Semaphore) -> Tuple[str, Optional[dict]]:
+        """Fetch one link: ("not_modified" | "unchanged" | "changed" | "failed", fetched fields)."""
+        url = source.payload["url"]
+        try:
+            # The host slot (and its delay) first, so links waiting on a busy host hold no global slot
+            async with self.limiter.slot(urlsplit(url).netloc), semaphore:
+                page = await fetch_page(
+                    url, source.etag, source.last_modified, source.content_hash,
+                    timeout=settings.LINK_REFRESH_TIMEOUT_SECONDS
+                )
+            fetched = {
+                "content_hash": page.content_hash,
+                "etag": page.etag,
+                "last_modified": page.last_modified,
+                "content_bytes": source.content_bytes if page.content_bytes is None else page.content_bytes,
+            }
+            if page.content_bytes is None:
+                self.pages_not_modified += 1
+                self.pages_unchanged += 1
+                self.bytes_saved += source.content_bytes or 0
+                return "not_modified", fetched
+            self.pages_fetched += 1
+            self.bytes_downloaded += page.content_bytes
+            if page.not_modified:
+                self.pages_unchanged += 1
+                return "unchanged", fetched
+            await run_in_thread("file", (spool_dir / f"{source.id}.md").write_text, page.text, encoding="utf-8")
+        except Exception as e:
+            logger.warning("Refresh of %s failed: %s", url, e)
+            self.failures += 1
+            return "failed", None
+        self.pages_changed += 1
+        return "changed", fetched
+
+    async def run_once(self) -> int:
+        """Refresh one batch of due links. Returns the number of links claimed."""
+        async with async_session_maker() as db:
+            sources = await self.claim_due(db)
+        if not sources:
+            return 0
+        self.runs += 1
+
+        # The changed pages of a notebook become one job, spooled where its worker expects them
+        job_ids = {source.notebook_id: uuid_pkg.uuid4() for source in sources}
+        queued = set()
+        try:
+            for job_id in job_ids.values():
+                await run_in_thread("file", ingestion_service.spool_dir(job_id).mkdir, parents=True, exist_ok=True)
+            semaphore = asyncio.Semaphore(settings.LINK_REFRESH_CONCURRENCY)
+            results = await asyncio.gather(*(
+                self._check(source, ingestion_service.spool_dir(job_ids[source.notebook_id]), semaphore)
+                for source in sources
+            ))
+
+            refreshed_at = datetime.now(timezone.utc)
+            unchanged = []
+            failed = []
+            changed: Dict[int, List[dict]] = {}
+            for source, (status, fetched) in zip(sources, results):
+                if status in ("not_modified", "unchanged"):
+                    unchanged.append({"id": source.id, "refreshed_at": refreshed_at, **fetched})
+                elif status == "changed":
+                    item = ingestion_service.refresh_item(source)
+                    item["payload"].update(
+                        path=str(ingestion_service.spool_dir(job_ids[source.notebook_id]) / f"{source.id}.md"),
+                        fetched=fetched
+                    )
+                    changed.setdefault(source.notebook_id, []).append(item)
+                else:
+                    failed.append(source.id)
+
+            async with async_session_maker() as db:
+                if unchanged:
+                    await db.execute(update(Source), unchanged)
+                    await db.commit()
+                if failed:
+                    await self._retry_soon(db, failed)
+                for notebook_id, items in changed.items():
+                    await ingestion_service.enqueue_job(
+                        db, notebook_id, "refresh", items, public_id=job_ids[notebook_id]
+                    )
+                    queued.add(notebook_id)
+        finally:
+            for notebook_id, job_id in job_ids.items():
+                if notebook_id not in queued:
+                    await run_in_thread("file", shutil.rmtree, ingestion_service.spool_dir(job_id), ignore_errors=True)
+            self.limiter.prune()
+
+        logger.info(
+            "Link refresh: %d claimed, %d changed, %d unchanged, %d failed",
+            len(sources), sum(map(len, changed.values())), len(unchanged), len(failed)
+        )
+        return len(sources)
+
+    def stats(self) -> dict:
+        """Counters since the process started. bytes_saved is the last known size of pages answered 304."""
+        return {
+            "enabled": settings.LINK_REFRESH_ENABLED,
+            "runs": self.runs,
+            "pages_fetched": self.pages_fetched,
+            "pages_not_modified": self.pages_not_modified,
+            "pages_unchanged": self.pages_unchanged,
+            "pages_changed": self.pages_changed,
+            "failures": self.failures,
+            "bytes_downloaded": self.bytes_downloaded,
+            "bytes_saved": self.bytes_saved,
+        }
+
+
+link_refresh_service = LinkRefreshService()
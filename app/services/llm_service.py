@@ -1,5 +1,7 @@
+from typing import AsyncIterator
 import google.generativeai as genai
 from app.core import settings
+from app.core.executor import limit
 
 
 class LLMService:
@@ -7,7 +9,7 @@ class LLMService:
         genai.configure(api_key=settings.GEMINI_API_KEY)
         self.model = genai.GenerativeModel(settings.GEMINI_MODEL)
 
-    def generate_response(self, context: str, question: str) -> str:
+    async def generate_response(self, context: str, question: str) -> str:
         """
         [Original RAG Prompt]
         Generates a response based only on the context. Less conversational.
@@ -22,16 +24,35 @@ If the information is not in the documents, say that you did not find the inform
 
 IMPORTANT: Your final answer **must** be in Brazilian Portuguese."""
 
-        response = self.model.generate_content(prompt)
+        async with limit("llm"):
+            response = await self.model.generate_content_async(prompt)
         return response.text
 
-    def generate_chat_response(self, context: str, question: str) -> str:
+    async def condense_question(self, history: str, question: str) -> str:
         """
-        [Advanced Chat Prompt]
-        Generates a chat response that can handle RAG, casual conversation, and
-        out-of-scope questions, always replying in Brazilian Portuguese.
+        Rewrite a follow-up question as a standalone question for retrieval,
+        resolving references to earlier turns of the conversation.
         """
-        prompt = f"""You are a helpful and friendly virtual assistant. Your primary job is to answer questions using **only** the documents provided.
+        prompt = f"""Given the conversation below and a follow-up question, rewrite the follow-up as a single standalone question that can be understood without the conversation. Keep the language of the follow-up question. If it is already standalone, return it unchanged. Reply with the question only.
+
+**Conversation:**
+{history}
+
+**Follow-up question:**
+{question}"""
+
+        async with limit("llm"):
+            response = await self.model.generate_content_async(prompt)
+        return response.text.strip() or question
+
+    def _chat_prompt(self, context: str, question: str, history: str = "") -> str:
+        history_section = f"""**Conversation so far:**
+---
+{history}
+---
+
+""" if history else ""
+        return f"""You are a helpful and friendly virtual assistant. Your primary job is to answer questions using **only** the documents provided.
 
 **Behavioral Instructions:**
 1.  **Top Priority (Document-based Questions):** First, check if the user's question can be answered using the provided documents. If it can, provide an answer based **strictly** on the information within them.
@@ -43,16 +64,41 @@ IMPORTANT: Your final answer **must** be in Brazilian Portuguese."""
 {context}
 ---
 
-**User's Question:**
+{history_section}**User's Question:**
 {question}
 
 **IMPORTANT:** Your final answer **must** be in Brazilian Portuguese.
 """
 
-        response = self.model.generate_content(prompt)
+    async def generate_chat_response(self, context: str, question: str, history: str = "") -> str:
+        """
+        [Advanced Chat Prompt]
+        Generates a chat response that can handle RAG, casual conversation, and
+        out-of-scope questions, always replying in Brazilian Portuguese.
+        """
+        prompt = self._chat_prompt(context, question, history)
+        async with limit("llm"):
+            response = await self.model.generate_content_async(prompt)
         return response.text
 
-    def generate_summary(self, context: str, sources: list) -> str:
+    async def stream_chat_response(self, context: str, question: str, history: str = "") -> AsyncIterator[str]:
+        """
+        Streaming variant of generate_chat_response that yields text deltas.
+        Cancelling the consumer cancels the upstream generation RPC.
+        """
+        prompt = self._chat_prompt(context, question, history)
+        async with limit("llm"):
+            response = await self.model.generate_content_async(prompt, stream=True)
+            async for chunk in response:
+                try:
+                    text = chunk.text
+                except ValueError:
+                    # Chunks without text parts (e.g. the final finish_reason chunk)
+                    continue
+                if text:
+                    yield text
+
+    async def generate_summary(self, context: str, sources: list) -> str:
         """
         [Summary Prompt]
         Generates a summary from the context, outputting in Brazilian Portuguese.
@@ -73,7 +119,8 @@ IMPORTANT: Your final answer **must** be in Brazilian Portuguese."""
 
 **IMPORTANT:** The final summary **must** be written in Brazilian Portuguese."""
 
-        response = self.model.generate_content(prompt)
+        async with limit("llm"):
+            response = await self.model.generate_content_async(prompt)
         return response.text
 
 
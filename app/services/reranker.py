@@ -0,0 +1,155 @@
+from typing import List, Optional
+from dataclasses import dataclass
+from app.core import settings
+from app.core.executor import run_in_thread
+from app.utils.prompt import estimate_tokens, fit_documents
+import logging
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+# Shortest shared prefix/suffix treated as chunk overlap rather than coincidence
+MIN_OVERLAP_CHARS = 50
+
+
+def strip_overlap(text: str, others: List[str]) -> str:
+    """
+    Remove the start or end of text that repeats the end or start of another
+    chunk (the CHUNK_OVERLAP shared by neighbouring chunks of a document).
+    """
+    for other in others:
+        probe = text[:MIN_OVERLAP_CHARS]
+        position = other.find(probe, max(0, len(other) - len(text)))
+        if len(probe) == MIN_OVERLAP_CHARS and position != -1 and text.startswith(other[position:]):
+            text = text[len(other) - position:].lstrip()
+        probe = text[-MIN_OVERLAP_CHARS:]
+        position = other.rfind(probe, 0, len(text))
+        if len(probe) == MIN_OVERLAP_CHARS and position != -1 and text.endswith(other[:position + len(probe)]):
+            text = text[:len(text) - position - len(probe)].rstrip()
+    return text
+
+
+@dataclass
+class RankedContext:
+    documents: List[str]
+    sources: List[str]
+    # Tokens of the top n_results chunks as retrieved, i.e. the prompt without this stage
+    tokens_retrieved: int
+    tokens_used: int
+
+    @property
+    def tokens_saved(self) -> int:
+        return max(0, self.tokens_retrieved - self.tokens_used)
+
+
+class Reranker:
+    """
+    Post-retrieval stage between vector_store.query and the prompt.
+
+    Takes RERANK_OVERFETCH x n_results candidates with their embeddings, drops
+    chunks whose cosine similarity to an already selected chunk reaches
+    RERANK_DEDUP_THRESHOLD (chunk overlap, the same book in several sources)
+    and picks n_results by maximal marginal relevance. Relevance is the
+    retrieval rank, or the score of a local cross-encoder when
+    RERANK_CROSS_ENCODER_MODEL is set. Text shared with a neighbouring
+    selected chunk is cut, and the result is trimmed to the token budget.
+    """
+
+    def __init__(self):
+        self._cross_encoder = None
+        self._cross_encoder_unavailable = False
+        self.requests = 0
+        self.duplicates_removed = 0
+        self.tokens_retrieved = 0
+        self.tokens_used = 0
+
+    def _get_cross_encoder(self):
+        if self._cross_encoder is None and not self._cross_encoder_unavailable:
+            try:
+                from sentence_transformers import CrossEncoder
+                self._cross_encoder = CrossEncoder(settings.RERANK_CROSS_ENCODER_MODEL, device="cpu")
+            except Exception:
+                logger.exception("Cross-encoder %s unavailable, reranking by retrieval order",
+                                 settings.RERANK_CROSS_ENCODER_MODEL)
+                self._cross_encoder_unavailable = True
+        return self._cross_encoder
+
+    def _cross_encoder_scores(self, question: str, documents: List[str]) -> Optional[np.ndarray]:
+        model = self._get_cross_encoder()
+        if model is None:
+            return None
+        return np.asarray(model.predict([(question, document) for document in documents]), dtype=np.float32)
+
+    async def _relevance(self, question: str, documents: List[str]) -> np.ndarray:
+        """Relevance in [0, 1]: cross-encoder scores if configured, otherwise retrieval rank."""
+        if settings.RERANK_CROSS_ENCODER_MODEL:
+            scores = await run_in_thread("rerank", self._cross_encoder_scores, question, documents)
+            if scores is not None:
+                spread = scores.max() - scores.min()
+                return (scores - scores.min()) / spread if spread else np.ones_like(scores)
+        return 1 - np.arange(len(documents), dtype=np.float32) / len(documents)
+
+    def _mmr(self, relevance: np.ndarray, vectors: np.ndarray, n_results: int) -> List[int]:
+        selected: List[int] = []
+        candidates = np.arange(len(relevance))
+        redundancy = np.zeros(len(relevance), dtype=np.float32)
+        while len(candidates) and len(selected) < n_results:
+            duplicates = redundancy[candidates] >= settings.RERANK_DEDUP_THRESHOLD
+            self.duplicates_removed += int(duplicates.sum())
+            candidates = candidates[~duplicates]
+            if not len(candidates):
+                break
+
+            scores = (settings.RERANK_MMR_LAMBDA * relevance[candidates]
+                      - (1 - settings.RERANK_MMR_LAMBDA) * redundancy[candidates])
+            best = int(candidates[np.argmax(scores)])
+            selected.append(best)
+            candidates = candidates[candidates != best]
+            # Highest similarity of every chunk to the selected set
+            redundancy = np.maximum(redundancy, vectors @ vectors[best])
+        return selected
+
+    async def select(self, question: str, results: dict, n_results: int, budget: int) -> RankedContext:
+        """Choose the chunks of a vector_store.query result that go into the prompt."""
+        documents = results["documents"][0]
+        filenames = [meta["filename"] for meta in results["metadatas"][0]]
+        tokens_retrieved = sum(estimate_tokens(document) for document in documents[:n_results])
+
+        order = list(range(min(n_results, len(documents))))
+        embeddings = results.get("embeddings", [[]])[0]
+        if settings.RERANK_ENABLED and len(documents) > 1 and len(embeddings) == len(documents):
+            vectors = np.asarray(embeddings, dtype=np.float32)
+            norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+            vectors = vectors / np.where(norms == 0, 1, norms)
+            order = self._mmr(await self._relevance(question, documents), vectors, n_results)
+
+        deduplicated = []
+        for i in order:
+            text = strip_overlap(documents[i], deduplicated)
+            deduplicated.append(text if text else documents[i])
+        selected = fit_documents(deduplicated, budget)
+        context = RankedContext(
+            documents=selected,
+            sources=[filenames[i] for i in order[:len(selected)]],
+            tokens_retrieved=tokens_retrieved,
+            tokens_used=sum(estimate_tokens(document) for document in selected)
+        )
+        self.requests += 1
+        self.tokens_retrieved += context.tokens_retrieved
+        self.tokens_used += context.tokens_used
+        return context
+
+    def stats(self) -> dict:
+        return {
+            "enabled": settings.RERANK_ENABLED,
+            "cross_encoder": settings.RERANK_CROSS_ENCODER_MODEL or None,
+            "requests": self.requests,
+            "duplicates_removed": self.duplicates_removed,
+            "tokens_retrieved": self.tokens_retrieved,
+            "tokens_used": self.tokens_used,
+            "tokens_saved": max(0, self.tokens_retrieved - self.tokens_used),
+        }
+
+
+reranker = Reranker()
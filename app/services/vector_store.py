@@ -1,83 +1,556 @@
-from typing import List, Optional
+from typing import Dict, List, Optional, Set, Tuple
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, delete, func
-from app.models import DocumentEmbedding
+from sqlalchemy import select, delete, update, func, text, insert, cast, literal_column, Text
+from sqlalchemy.dialects.postgresql import TSQUERY
+from pgvector.sqlalchemy import BIT, HALFVEC, Vector
+from app.models import DocumentEmbedding, Notebook
 from app.core import settings
+from app.core.executor import limit
+from app.services.embedding_cache import embedding_cache, CachedEmbeddings
+from app.services.cache_invalidation import invalidation_bus
+from google.api_core import exceptions as google_exceptions
+from google.generativeai.embedding import EMBEDDING_MAX_BATCH_SIZE
 import google.generativeai as genai
+import asyncio
+import hashlib
+import numpy as np
+import logging
+import random
+import time
 import uuid as uuid_pkg
 
+logger = logging.getLogger(__name__)
+
+VECTOR_STORAGES = ("full", "halfvec", "binary")
+
+
+def quantize_binary(embedding: List[float]) -> str:
+    """Sign bits of an embedding, as pgvector's binary_quantize computes them."""
+    return "".join("1" if value > 0 else "0" for value in embedding)
+
+
+def chunk_hash(chunk: str) -> str:
+    """Hex SHA-256 of a chunk's text, as migration 014 computes it in Postgres."""
+    return hashlib.sha256(chunk.encode("utf-8")).hexdigest()
+
+
+RETRYABLE_ERRORS = (
+    google_exceptions.ResourceExhausted,
+    google_exceptions.ServiceUnavailable,
+    google_exceptions.DeadlineExceeded,
+    google_exceptions.InternalServerError,
+)
+
 
 class VectorStoreService:
     def __init__(self):
         
         genai.configure(api_key=settings.GEMINI_API_KEY)
     
-    def _get_embedding(self, text: str) -> List[float]:
+    async def _get_embedding(self, text: str, dimensions: Optional[int] = None) -> List[float]:
         """Generate embedding using Google's API."""
-        result = genai.embed_content(
-            model=settings.GEMINI_EMBEDDING_MODEL,
-            content=text,
-            task_type="retrieval_document"
-        )
-        return result['embedding']
+        return (await self._get_embeddings([text], dimensions))[0]
     
-    def _get_query_embedding(self, text: str) -> List[float]:
+    async def _get_query_embedding(self, text: str, dimensions: Optional[int] = None) -> List[float]:
         """Generate embedding for query using Google's API."""
-        result = genai.embed_content(
-            model=settings.GEMINI_EMBEDDING_MODEL,
-            content=text,
-            task_type="retrieval_query"
+        dimensions = dimensions or settings.EMBEDDING_DIMENSIONS
+        return (await embedding_cache.get_or_embed(
+            "retrieval_query", [text], lambda texts: self._embed_queries(texts, dimensions), dimensions
+        ))[0]
+    
+    async def embed_query(self, text: str, dimensions: Optional[int] = None) -> List[float]:
+        """Embedding of a search query (cached), at the dimension of the notebook it searches."""
+        return await self._get_query_embedding(text, dimensions)
+    
+    async def _request_embeddings(self, texts: List[str], task_type: str, dimensions: int) -> List[List[float]]:
+        """
+        Call the embedding API for dimensions-sized embeddings. Matryoshka
+        models truncate to output_dimensionality without re-normalising, so
+        the vectors are scaled back to unit length here.
+        """
+        async with limit("embedding"):
+            result = await genai.embed_content_async(
+                model=settings.GEMINI_EMBEDDING_MODEL,
+                content=texts,
+                task_type=task_type,
+                output_dimensionality=dimensions
+            )
+        vectors = np.asarray(result['embedding'], dtype=np.float32)
+        if vectors.shape[1] != dimensions:
+            raise ValueError(
+                f"{settings.GEMINI_EMBEDDING_MODEL} returned {vectors.shape[1]} dimensions, expected {dimensions}"
+            )
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return (vectors / np.where(norms == 0, 1, norms)).tolist()
+    
+    async def _embed_queries(self, texts: List[str], dimensions: int) -> List[List[float]]:
+        return await self._request_embeddings(texts, "retrieval_query", dimensions)
+    
+    async def _embed_batch(self, texts: List[str], dimensions: int) -> List[List[float]]:
+        """Embed one batch of documents, retrying transient failures with exponential backoff."""
+        for attempt in range(settings.EMBEDDING_MAX_RETRIES + 1):
+            try:
+                return await self._request_embeddings(texts, "retrieval_document", dimensions)
+            except RETRYABLE_ERRORS as e:
+                if attempt == settings.EMBEDDING_MAX_RETRIES:
+                    raise
+                delay = settings.EMBEDDING_RETRY_BASE_DELAY * (2 ** attempt)
+                delay += random.uniform(0, delay / 2)
+                logger.warning("Embedding batch of %d failed (%s), retrying in %.1fs", len(texts), e, delay)
+                await asyncio.sleep(delay)
+    
+    async def _get_embeddings(self, texts: List[str], dimensions: Optional[int] = None) -> List[List[float]]:
+        """Embed documents, reusing cached embeddings of identical chunks."""
+        dimensions = dimensions or settings.EMBEDDING_DIMENSIONS
+        return await embedding_cache.get_or_embed(
+            "retrieval_document", texts, lambda missing: self._embed_documents(missing, dimensions), dimensions
+        )
+    
+    async def _embed_documents(self, texts: List[str], dimensions: int) -> List[List[float]]:
+        """Embed documents in provider-sized batches, running several batches concurrently."""
+        batch_size = min(settings.EMBEDDING_BATCH_SIZE, EMBEDDING_MAX_BATCH_SIZE)
+        batches = [texts[i:i + batch_size] for i in range(0, len(texts), batch_size)]
+        semaphore = asyncio.Semaphore(settings.EMBEDDING_BATCH_CONCURRENCY)
+        
+        async def embed(batch: List[str]) -> List[List[float]]:
+            async with semaphore:
+                return await self._embed_batch(batch, dimensions)
+        
+        results = await asyncio.gather(*(embed(batch) for batch in batches))
+        return [embedding for batch in results for embedding in batch]
+    
+    async def embed_documents(self, texts: List[str], dimensions: Optional[int] = None) -> List[List[float]]:
+        """Embed document chunks (cached) without storing them."""
+        return await self._get_embeddings(texts, dimensions)
+    
+    def langchain_embeddings(self, dimensions: Optional[int] = None) -> CachedEmbeddings:
+        """Cached embeddings for LangChain components running in worker threads."""
+        return CachedEmbeddings(
+            asyncio.get_running_loop(), self._get_embeddings, self._get_query_embedding, dimensions
+        )
+    
+    async def get_dimensions(self, db: AsyncSession, notebook_id: int) -> int:
+        """Embedding dimension of a notebook (EMBEDDING_DIMENSIONS if it does not exist)."""
+        result = await db.execute(select(Notebook.embedding_dimensions).where(Notebook.id == notebook_id))
+        return result.scalar_one_or_none() or settings.EMBEDDING_DIMENSIONS
+    
+    async def add_documents(self, db: AsyncSession, notebook_id: int, source_id: int,
+                            chunks: List[str], filename: str,
+                            embeddings: Optional[List[List[float]]] = None,
+                            dimensions: Optional[int] = None) -> int:
+        """
+        Add document chunks to the vector store. Returns the number of chunks stored.
+        Pass embeddings when the chunker already computed them.
+        """
+        if not chunks:
+            return 0
+        
+        started = time.perf_counter()
+        if embeddings is None:
+            embeddings = await self._get_embeddings(chunks, dimensions or await self.get_dimensions(db, notebook_id))
+        embedded = time.perf_counter()
+        
+        await self.insert_embeddings(db, notebook_id, source_id, chunks, embeddings, filename)
+        await invalidation_bus.publish(db, "answer", str(notebook_id))
+        await db.commit()
+        finished = time.perf_counter()
+        
+        logger.info(
+            "Stored %d chunks for %s: embed %.2fs, insert %.2fs, %.1f chunks/s",
+            len(chunks), filename, embedded - started, finished - embedded,
+            len(chunks) / max(finished - started, 1e-9)
         )
-        return result['embedding']
+        return len(chunks)
     
-    async def add_documents(self, db: AsyncSession, notebook_id: int, source_id: int, chunks: List[str], filename: str):
-        """Add document chunks to the vector store."""
+    async def insert_embeddings(self, db: AsyncSession, notebook_id: int, source_id: int,
+                                chunks: List[str], embeddings: List[List[float]], filename: str) -> int:
+        """
+        Insert already embedded chunks and update the notebook counters in the
+        caller's transaction (no commit, no answer cache invalidation).
+        """
+        rows = [
+            {
+                "notebook_id": notebook_id,
+                "source_id": source_id,
+                "content": chunk,
+                "content_hash": chunk_hash(chunk),
+                "embedding": embedding,
+                "embedding_bits": quantize_binary(embedding),
+                "filename": filename,
+                "chunk_index": i,
+            }
+            for i, (chunk, embedding) in enumerate(zip(chunks, embeddings))
+        ]
+        await db.execute(insert(DocumentEmbedding), rows)
+        await self._adjust_counts(db, notebook_id, len(rows), len(rows))
+        return len(rows)
+    
+    async def get_chunk_hashes(self, db: AsyncSession, source_id: int) -> Set[str]:
+        """Hashes of the chunks stored for a source."""
+        result = await db.execute(
+            select(DocumentEmbedding.content_hash).where(DocumentEmbedding.source_id == source_id)
+        )
+        return set(result.scalars().all())
+    
+    async def replace_source_embeddings(self, db: AsyncSession, notebook_id: int, source_id: int,
+                                        chunks: List[str], embeddings: List[Optional[List[float]]],
+                                        filename: str, dimensions: int) -> Tuple[int, int, int]:
+        """
+        Swap the chunks of a source for a new version in the caller's
+        transaction, so searches see either version but never a mix. Stored
+        chunks whose hash matches a new chunk keep their row and embedding
+        (renumbered), the others are deleted, and the remaining new chunks are
+        inserted, embedded here unless embeddings has them. A disabled source
+        stays disabled. Returns (added, kept, removed).
+        """
+        existing = (await db.execute(
+            select(DocumentEmbedding.id, DocumentEmbedding.content_hash,
+                   DocumentEmbedding.chunk_index, DocumentEmbedding.enabled)
+            .where(DocumentEmbedding.source_id == source_id)
+            .order_by(DocumentEmbedding.chunk_index)
+            .with_for_update()
+        )).all()
+        stored: Dict[str, list] = {}
+        for row in existing:
+            stored.setdefault(row.content_hash, []).append(row)
+        enabled = not existing or any(row.enabled for row in existing)
+
+        renumbered, new = [], []
         for i, chunk in enumerate(chunks):
-            embedding = self._get_embedding(chunk)
-            doc_embedding = DocumentEmbedding(
-                notebook_id=notebook_id,
-                source_id=source_id,
-                content=chunk,
-                embedding=embedding,
-                filename=filename,
-                chunk_index=i
+            matches = stored.get(chunk_hash(chunk))
+            if matches:
+                row = matches.pop(0)
+                if row.chunk_index != i:
+                    renumbered.append({"id": row.id, "chunk_index": i})
+            else:
+                new.append(i)
+        removed = [row for rows in stored.values() for row in rows]
+
+        missing = [i for i in new if embeddings[i] is None]
+        if missing:
+            for i, embedding in zip(missing, await self._get_embeddings([chunks[i] for i in missing], dimensions)):
+                embeddings[i] = embedding
+
+        if removed:
+            await db.execute(delete(DocumentEmbedding).where(DocumentEmbedding.id.in_([row.id for row in removed])))
+        if renumbered:
+            await db.execute(update(DocumentEmbedding), renumbered)
+        if new:
+            await db.execute(insert(DocumentEmbedding), [
+                {
+                    "notebook_id": notebook_id,
+                    "source_id": source_id,
+                    "content": chunks[i],
+                    "content_hash": chunk_hash(chunks[i]),
+                    "embedding": embeddings[i],
+                    "embedding_bits": quantize_binary(embeddings[i]),
+                    "filename": filename,
+                    "chunk_index": i,
+                    "enabled": enabled,
+                }
+                for i in new
+            ])
+        await self._adjust_counts(
+            db, notebook_id, len(new) - len(removed),
+            (len(new) if enabled else 0) - sum(1 for row in removed if row.enabled)
+        )
+        return len(new), len(chunks) - len(new), len(removed)
+    
+    async def _adjust_counts(self, db: AsyncSession, notebook_id: int, embeddings: int, enabled: int) -> None:
+        """Apply a delta to the notebook's embedding counters in the caller's transaction."""
+        if embeddings or enabled:
+            await db.execute(
+                update(Notebook)
+                .where(Notebook.id == notebook_id)
+                .values(
+                    embedding_count=Notebook.embedding_count + embeddings,
+                    enabled_count=Notebook.enabled_count + enabled
+                )
             )
-            db.add(doc_embedding)
-        await db.commit()
+    
+    async def _set_local(self, db: AsyncSession, name: str, value) -> None:
+        """Set a configuration parameter for the current transaction only."""
+        await db.execute(
+            text("SELECT set_config(:name, :value, true)"),
+            {"name": name, "value": str(value)}
+        )
+    
+    async def _configure_search(self, db: AsyncSession, exact: bool,
+                                ef_search: Optional[int] = None, probes: Optional[int] = None):
+        """Tune the ANN index scan (or disable it) for the next query in this transaction."""
+        if exact:
+            # Small notebooks: skip the ANN index and rank every row of the notebook exactly
+            await self._set_local(db, "enable_indexscan", "off")
+            return
+        
+        iterative_scan = settings.VECTOR_ITERATIVE_SCAN
+        if settings.VECTOR_INDEX_TYPE == "ivfflat":
+            await self._set_local(db, "ivfflat.probes", probes or settings.VECTOR_PROBES)
+            if iterative_scan != "off":
+                # ivfflat only supports relaxed ordering
+                await self._set_local(db, "ivfflat.iterative_scan", "relaxed_order")
+        else:
+            await self._set_local(db, "hnsw.ef_search", ef_search or settings.VECTOR_EF_SEARCH)
+            if iterative_scan != "off":
+                await self._set_local(db, "hnsw.iterative_scan", iterative_scan)
+                await self._set_local(db, "hnsw.max_scan_tuples", settings.VECTOR_MAX_SCAN_TUPLES)
+    
+    def _lexical_query(self, query_text: str):
+        """
+        OR of the question's lexemes, so a chunk containing any of the terms
+        (a course code, an acronym) is a candidate; ts_rank_cd favours chunks
+        matching more of them.
+        """
+        config = literal_column(f"'{settings.SEARCH_TEXT_CONFIG}'::regconfig")
+        plain = func.plainto_tsquery(config, query_text)
+        return cast(func.replace(cast(plain, Text), "&", "|"), TSQUERY)
+    
+    @staticmethod
+    def _ranked(name: str, score, descending: bool, filters, limit: int):
+        """Top-limit candidates by score as a CTE of (id, rank)."""
+        inner = (
+            select(DocumentEmbedding.id, score.label("score"))
+            .where(*filters)
+            .order_by(score.desc() if descending else score)
+            .limit(limit)
+            .subquery()
+        )
+        order = inner.c.score.desc() if descending else inner.c.score
+        return select(inner.c.id, func.row_number().over(order_by=order).label("rank")).cte(name)
+    
+    @staticmethod
+    def _dimension_filter(dimensions: int):
+        """
+        Restrict to embeddings of one dimension, matching the predicate of that
+        dimension's partial ANN index. The value is inlined so generic plans of
+        prepared statements can still use the index.
+        """
+        return func.vector_dims(DocumentEmbedding.embedding) == literal_column(str(int(dimensions)))
+    
+    @staticmethod
+    def _distance(query_embedding: List[float]):
+        """Cosine distance in the form the full-precision ANN index of its dimension serves."""
+        dimensions = len(query_embedding)
+        return cast(DocumentEmbedding.embedding, Vector(dimensions)).cosine_distance(query_embedding)
+    
+    def _compact_distance(self, query_embedding: List[float]):
+        """Distance on the reduced-precision copy of the embeddings selected by VECTOR_STORAGE."""
+        dimensions = len(query_embedding)
+        if settings.VECTOR_STORAGE == "halfvec":
+            return cast(DocumentEmbedding.embedding, HALFVEC(dimensions)).cosine_distance(query_embedding)
+        if settings.VECTOR_STORAGE == "binary":
+            return cast(DocumentEmbedding.embedding_bits, BIT(dimensions)).hamming_distance(
+                quantize_binary(query_embedding)
+            )
+        raise ValueError(f"Unknown vector storage: {settings.VECTOR_STORAGE}")
+    
+    def _vector_hits(self, name: str, query_embedding: List[float], filters, limit: int, exact: bool):
+        """
+        Top-limit chunks by cosine distance as a CTE of (id, rank). With a
+        compact VECTOR_STORAGE, the ANN index picks VECTOR_RESCORE_CANDIDATES
+        on the reduced-precision copy and those are re-ranked exactly.
+        """
+        distance = self._distance(query_embedding)
+        if exact or settings.VECTOR_STORAGE == "full":
+            return self._ranked(name, distance, False, filters, limit)
+        # LIMIT keeps the subquery from being flattened, so the rescoring sorts these
+        # rows in memory instead of walking the full-precision index again
+        candidates = (
+            select(DocumentEmbedding.id, DocumentEmbedding.embedding)
+            .where(*filters)
+            .order_by(self._compact_distance(query_embedding))
+            .limit(max(limit, settings.VECTOR_RESCORE_CANDIDATES))
+            .subquery("candidates")
+        )
+        score = candidates.c.embedding.cosine_distance(query_embedding)
+        rescored = select(candidates.c.id, score.label("score")).order_by(score).limit(limit).subquery()
+        return select(
+            rescored.c.id, func.row_number().over(order_by=rescored.c.score).label("rank")
+        ).cte(name)
     
     async def query(self, db: AsyncSession, notebook_id: int, query_text: str, 
-                   n_results: int = 10) -> dict:
-        """Query the vector store using cosine similarity."""
-        query_embedding = self._get_query_embedding(query_text)
+                   n_results: int = 10, collection_count: Optional[int] = None,
+                   ef_search: Optional[int] = None, probes: Optional[int] = None,
+                   query_embedding: Optional[List[float]] = None,
+                   mode: Optional[str] = None, lexical_weight: Optional[float] = None,
+                   include_embeddings: bool = False, dimensions: Optional[int] = None) -> dict:
+        """
+        Query the notebook's enabled chunks.
+        
+        mode (default SEARCH_MODE) is "vector" (cosine similarity), "lexical"
+        (Postgres full-text search) or "hybrid": the top SEARCH_CANDIDATES of
+        both are merged with reciprocal-rank fusion, weighting the lexical
+        ranks by lexical_weight (default SEARCH_LEXICAL_WEIGHT), in a single
+        statement.
         
-        stmt = select(
-            DocumentEmbedding.content,
-            DocumentEmbedding.filename,
-            DocumentEmbedding.embedding.cosine_distance(query_embedding).label('distance')
-        ).where(
-            DocumentEmbedding.notebook_id == notebook_id,
-            DocumentEmbedding.enabled == True
-        ).order_by('distance').limit(n_results)
+        Vector search uses the ANN index with iterative scans so the
+        notebook/enabled filter still returns enough rows. When collection_count
+        is known and below VECTOR_EXACT_SEARCH_THRESHOLD, an exact scan is used
+        instead. With VECTOR_STORAGE "halfvec" or "binary", the index search runs
+        on reduced-precision embeddings and the candidates are rescored at full
+        precision. Pass query_embedding when the caller already embedded query_text
+        (at the notebook's embedding dimension), or dimensions when it is known.
+        With include_embeddings, the chunk embeddings are returned under "embeddings".
+        """
+        mode = mode or settings.SEARCH_MODE
+        if mode not in ("vector", "hybrid", "lexical"):
+            raise ValueError(f"Unknown search mode: {mode}")
+        lexical_weight = settings.SEARCH_LEXICAL_WEIGHT if lexical_weight is None else lexical_weight
+        filters = (DocumentEmbedding.notebook_id == notebook_id, DocumentEmbedding.enabled == True)
+        columns = [DocumentEmbedding.content, DocumentEmbedding.filename]
+        if include_embeddings:
+            columns.append(DocumentEmbedding.embedding)
+        
+        exact = False
+        if mode != "lexical":
+            if query_embedding is None:
+                dimensions = dimensions or await self.get_dimensions(db, notebook_id)
+                query_embedding = await self._get_query_embedding(query_text, dimensions)
+            vector_filters = filters + (self._dimension_filter(len(query_embedding)),)
+            exact = collection_count is not None and collection_count < settings.VECTOR_EXACT_SEARCH_THRESHOLD
+            if settings.VECTOR_STORAGE != "full" and not exact:
+                # The index scan has to yield every candidate that gets rescored
+                ef_search = max(ef_search or settings.VECTOR_EF_SEARCH, settings.VECTOR_RESCORE_CANDIDATES)
+            await self._configure_search(db, exact, ef_search, probes)
+            distance = self._distance(query_embedding)
+        
+        if mode == "vector" and (exact or settings.VECTOR_STORAGE == "full"):
+            stmt = (
+                select(*columns, distance.label('distance'))
+                .where(*vector_filters)
+                .order_by('distance')
+                .limit(n_results)
+            )
+            result = await db.execute(stmt)
+            # Iterative index scans with relaxed ordering may return rows slightly out of order
+            rows = sorted(result.all(), key=lambda row: row.distance)
+        elif mode == "vector":
+            hits = self._vector_hits("vector_hits", query_embedding, vector_filters, n_results, exact)
+            stmt = select(*columns).join(hits, hits.c.id == DocumentEmbedding.id).order_by(hits.c.rank)
+            rows = (await db.execute(stmt)).all()
+        else:
+            tsquery = self._lexical_query(query_text)
+            lexical = self._ranked(
+                "lexical_hits",
+                func.ts_rank_cd(DocumentEmbedding.content_tsv, tsquery),
+                True,
+                filters + (DocumentEmbedding.content_tsv.op("@@")(tsquery),),
+                n_results if mode == "lexical" else settings.SEARCH_CANDIDATES
+            )
+            if mode == "lexical":
+                hits = select(lexical.c.id, (-lexical.c.rank).label("score")).cte("hits")
+            else:
+                vector = self._vector_hits(
+                    "vector_hits", query_embedding, vector_filters, max(settings.SEARCH_CANDIDATES, n_results), exact
+                )
+                k = settings.SEARCH_RRF_K
+                score = (
+                    func.coalesce((1 - lexical_weight) / (k + vector.c.rank), 0.0)
+                    + func.coalesce(lexical_weight / (k + lexical.c.rank), 0.0)
+                )
+                hits = (
+                    select(func.coalesce(vector.c.id, lexical.c.id).label("id"), score.label("score"))
+                    .select_from(vector.join(lexical, vector.c.id == lexical.c.id, full=True))
+                    .cte("hits")
+                )
+            stmt = (
+                select(*columns)
+                .join(hits, hits.c.id == DocumentEmbedding.id)
+                .order_by(hits.c.score.desc())
+                .limit(n_results)
+            )
+            rows = (await db.execute(stmt)).all()
         
-        result = await db.execute(stmt)
-        rows = result.all()
+        if exact:
+            await self._set_local(db, "enable_indexscan", "on")
         
         documents = [[row.content for row in rows]]
         metadatas = [[{"filename": row.filename} for row in rows]]
         
-        return {"documents": documents, "metadatas": metadatas}
+        results = {"documents": documents, "metadatas": metadatas}
+        if include_embeddings:
+            results["embeddings"] = [[row.embedding for row in rows]]
+        return results
     
     async def delete_collection(self, db: AsyncSession, notebook_id: int):
         """Delete all embeddings for a notebook."""
         await db.execute(delete(DocumentEmbedding).where(DocumentEmbedding.notebook_id == notebook_id))
+        await db.execute(
+            update(Notebook).where(Notebook.id == notebook_id).values(embedding_count=0, enabled_count=0)
+        )
+        await invalidation_bus.publish(db, "answer", str(notebook_id))
         await db.commit()
     
-    async def get_collection_count(self, db: AsyncSession, notebook_id: int) -> int:
-        """Get the number of embeddings for a notebook."""
+    async def delete_source_embeddings(self, db: AsyncSession, notebook_id: int, source_id: int) -> int:
+        """
+        Delete the embeddings of a source and update the notebook counters,
+        without committing. Call before deleting the source row itself, and
+        publish an "answer" invalidation before committing.
+        """
+        deleted = (
+            delete(DocumentEmbedding)
+            .where(DocumentEmbedding.source_id == source_id)
+            .returning(DocumentEmbedding.enabled)
+            .cte("deleted")
+        )
+        result = await db.execute(
+            select(func.count(), func.count().filter(deleted.c.enabled))
+        )
+        total, enabled = result.one()
+        await self._adjust_counts(db, notebook_id, -total, -enabled)
+        return total
+    
+    async def set_source_enabled(self, db: AsyncSession, notebook_id: int, source_id: int, enabled: bool) -> int:
+        """Enable or disable every embedding of a source. Returns the number of rows changed."""
         result = await db.execute(
-            select(func.count(DocumentEmbedding.id)).where(DocumentEmbedding.notebook_id == notebook_id)
+            update(DocumentEmbedding)
+            .where(
+                DocumentEmbedding.notebook_id == notebook_id,
+                DocumentEmbedding.source_id == source_id,
+                DocumentEmbedding.enabled != enabled
+            )
+            .values(enabled=enabled)
         )
+        await self._adjust_counts(db, notebook_id, 0, result.rowcount if enabled else -result.rowcount)
+        await invalidation_bus.publish(db, "answer", str(notebook_id))
+        await db.commit()
+        return result.rowcount
+    
+    async def get_collection_count(self, db: AsyncSession, notebook_id: int) -> int:
+        """Get the number of enabled embeddings for a notebook (a primary-key lookup)."""
+        result = await db.execute(select(Notebook.enabled_count).where(Notebook.id == notebook_id))
         return result.scalar() or 0
+    
+    async def recompute_counts(self, db: AsyncSession, notebook_id: Optional[int] = None) -> int:
+        """
+        Recount the embeddings of one notebook, or of every notebook, and fix
+        the stored counters. Returns the number of notebooks whose counters changed.
+        """
+        counts = (
+            select(
+                Notebook.id.label("notebook_id"),
+                func.count(DocumentEmbedding.id).label("embedding_count"),
+                func.count(DocumentEmbedding.id).filter(DocumentEmbedding.enabled).label("enabled_count")
+            )
+            .select_from(Notebook)
+            .outerjoin(DocumentEmbedding, DocumentEmbedding.notebook_id == Notebook.id)
+            .group_by(Notebook.id)
+        )
+        if notebook_id is not None:
+            counts = counts.where(Notebook.id == notebook_id)
+        counts = counts.subquery()
+        
+        result = await db.execute(
+            update(Notebook)
+            .where(
+                Notebook.id == counts.c.notebook_id,
+                (Notebook.embedding_count != counts.c.embedding_count)
+                | (Notebook.enabled_count != counts.c.enabled_count)
+            )
+            .values(embedding_count=counts.c.embedding_count, enabled_count=counts.c.enabled_count)
+        )
+        await db.commit()
+        return result.rowcount
 
 
 vector_store = VectorStoreService()
@@ -1,4 +1,5 @@
-from .text_extraction import extract_text, chunk_text
+from .text_extraction import extract_text, extract_text_from_path
+from .chunking import chunk_text, chunk_document, Chunk
 from .web_scraper import scrape_url
 
-__all__ = ["extract_text", "chunk_text", "scrape_url"]
+__all__ = ["extract_text", "extract_text_from_path", "chunk_text", "chunk_document", "Chunk", "scrape_url"]
@@ -0,0 +1,125 @@
+from typing import List, Optional
+from dataclasses import dataclass
+from langchain_core.embeddings import Embeddings
+from langchain_text_splitters import Language, MarkdownHeaderTextSplitter, RecursiveCharacterTextSplitter
+from app.core import settings
+import numpy as np
+import re
+
+MARKDOWN_HEADERS = [("#", "h1"), ("##", "h2"), ("###", "h3")]
+
+# Semantic mode groups sentences inside pre-chunks of this size
+SEMANTIC_PRE_CHUNK_SIZE = 10000
+
+SENTENCE_SPLIT = re.compile(r"(?<=[.?!])\s+")
+
+
+@dataclass
+class Chunk:
+    text: str
+    # Set when the chunker already computed a document embedding for the chunk
+    embedding: Optional[List[float]] = None
+
+
+def markdown_chunks(text: str, chunk_size: int, overlap: int) -> List[Chunk]:
+    """
+    Fast local chunking: split on the markdown headings MarkItDown produces,
+    then on paragraphs/lines/words so chunks stay within chunk_size characters.
+    """
+    header_splitter = MarkdownHeaderTextSplitter(headers_to_split_on=MARKDOWN_HEADERS, strip_headers=False)
+    splitter = RecursiveCharacterTextSplitter.from_language(
+        Language.MARKDOWN,
+        chunk_size=chunk_size,
+        chunk_overlap=overlap
+    )
+    chunks = []
+    for section in header_splitter.split_text(text):
+        chunks.extend(Chunk(piece) for piece in splitter.split_text(section.page_content) if piece.strip())
+    return chunks
+
+
+def semantic_chunks(text: str, embeddings: Embeddings, reuse_embeddings: bool = True) -> List[Chunk]:
+    """
+    Split where the embedding distance between neighbouring sentences exceeds
+    the CHUNK_SEMANTIC_BREAKPOINT_PERCENTILE. With reuse_embeddings, each chunk
+    gets the normalised mean of its sentence embeddings, so the document is not
+    embedded a second time.
+    """
+    pre_splitter = RecursiveCharacterTextSplitter(chunk_size=SEMANTIC_PRE_CHUNK_SIZE, chunk_overlap=0)
+    buffer_size = settings.CHUNK_SEMANTIC_BUFFER_SIZE
+
+    chunks = []
+    for block in pre_splitter.split_text(text):
+        sentences = [sentence for sentence in SENTENCE_SPLIT.split(block) if sentence.strip()]
+        if not sentences:
+            continue
+
+        combined = [
+            " ".join(sentences[max(0, i - buffer_size):i + buffer_size + 1])
+            for i in range(len(sentences))
+        ]
+        vectors = np.asarray(embeddings.embed_documents(combined), dtype=np.float32)
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        vectors = vectors / np.where(norms == 0, 1, norms)
+
+        distances = 1 - np.sum(vectors[:-1] * vectors[1:], axis=1)
+        breakpoints = []
+        if len(distances):
+            threshold = np.percentile(distances, settings.CHUNK_SEMANTIC_BREAKPOINT_PERCENTILE)
+            breakpoints = [i for i, distance in enumerate(distances) if distance > threshold]
+
+        start = 0
+        for end in breakpoints + [len(sentences) - 1]:
+            embedding = None
+            if reuse_embeddings:
+                mean = vectors[start:end + 1].mean(axis=0)
+                norm = np.linalg.norm(mean)
+                embedding = (mean / norm if norm else mean).tolist()
+            chunks.append(Chunk(" ".join(sentences[start:end + 1]), embedding))
+            start = end + 1
+    return chunks
+
+
+def chunk_document(text: str, chunk_size: Optional[int] = None, overlap: Optional[int] = None,
+                   strategy: Optional[str] = None, embeddings: Optional[Embeddings] = None) -> List[Chunk]:
+    """
+    Split text with the configured CHUNKING_STRATEGY ("markdown" or "semantic").
+
+    The semantic strategy needs embeddings; pass the cached adapter from the
+    vector store to avoid paying twice for sentences seen before.
+    """
+    if not text or not text.strip():
+        return []
+
+    strategy = strategy or settings.CHUNKING_STRATEGY
+    try:
+        if strategy == "semantic":
+            if embeddings is None:
+                from langchain_google_genai import GoogleGenerativeAIEmbeddings
+                embeddings = GoogleGenerativeAIEmbeddings(
+                    model=settings.GEMINI_EMBEDDING_MODEL,
+                    google_api_key=settings.GEMINI_API_KEY
+                )
+            return semantic_chunks(text, embeddings, settings.CHUNK_SEMANTIC_REUSE_EMBEDDINGS)
+        if strategy == "markdown":
+            return markdown_chunks(
+                text,
+                chunk_size or settings.CHUNK_SIZE,
+                overlap if overlap is not None else settings.CHUNK_OVERLAP
+            )
+    except Exception as e:
+        raise ValueError(f"Failed to chunk text: {str(e)}")
+    raise ValueError(f"Unknown chunking strategy: {strategy}")
+
+
+def chunk_text(text: str, chunk_size: Optional[int] = None, overlap: Optional[int] = None,
+               embeddings: Optional[Embeddings] = None) -> List[str]:
+    """Split text into chunks using the configured chunking strategy."""
+    return [chunk.text for chunk in chunk_document(text, chunk_size, overlap, embeddings=embeddings)]
+
+
+def chunk_embeddings(chunks: List[Chunk]) -> Optional[List[List[float]]]:
+    """Embeddings computed by the chunker, or None if any chunk still needs embedding."""
+    if chunks and all(chunk.embedding is not None for chunk in chunks):
+        return [chunk.embedding for chunk in chunks]
+    return None
@@ -0,0 +1,26 @@
+from typing import NamedTuple, Optional, Tuple
+from datetime import datetime
+import base64
+
+Cursor = Tuple[datetime, int]
+
+
+class PageParams(NamedTuple):
+    # (created_at, id) of the last row of the previous page
+    after: Optional[Cursor]
+    limit: int
+
+
+def encode_cursor(created_at: datetime, row_id: int) -> str:
+    raw = f"{created_at.isoformat()}|{row_id}".encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Cursor:
+    """Parse a cursor produced by encode_cursor. Raises ValueError if it is malformed."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode("utf-8")
+        created_at, row_id = raw.split("|")
+        return datetime.fromisoformat(created_at), int(row_id)
+    except Exception:
+        raise ValueError("Invalid cursor")
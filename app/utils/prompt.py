@@ -0,0 +1,51 @@
+from typing import List, Sequence, Tuple
+from app.core import settings
+import math
+
+ROLE_LABELS = {"user": "User", "assistant": "Assistant"}
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (CHARS_PER_TOKEN characters per token); no tokenizer round-trip."""
+    return math.ceil(len(text) / settings.CHARS_PER_TOKEN)
+
+
+def truncate_to_tokens(text: str, budget: int) -> str:
+    max_chars = int(budget * settings.CHARS_PER_TOKEN)
+    return text if len(text) <= max_chars else text[:max_chars].rstrip() + "…"
+
+
+def fit_documents(documents: Sequence[str], budget: int) -> List[str]:
+    """
+    Keep documents in rank order while they fit in budget tokens. The first
+    document is truncated rather than dropped so the context is never empty.
+    """
+    kept, used = [], 0
+    for document in documents:
+        tokens = estimate_tokens(document)
+        if used + tokens > budget:
+            if not kept and budget > 0:
+                kept.append(truncate_to_tokens(document, budget))
+            break
+        kept.append(document)
+        used += tokens
+    return kept
+
+
+def format_history(messages: Sequence[Tuple[str, str]], budget: int) -> str:
+    """
+    Render (role, content) pairs oldest first, keeping the most recent turns
+    that fit in budget tokens. The newest message is truncated if it alone
+    exceeds the budget.
+    """
+    lines, used = [], 0
+    for role, content in reversed(messages):
+        line = f"{ROLE_LABELS.get(role, role)}: {content}"
+        tokens = estimate_tokens(line)
+        if used + tokens > budget:
+            if not lines and budget > 0:
+                lines.append(truncate_to_tokens(line, budget))
+            break
+        lines.append(line)
+        used += tokens
+    return "\n".join(reversed(lines))
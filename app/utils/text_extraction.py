@@ -1,62 +1,171 @@
-import tempfile
-from typing import List
+from typing import BinaryIO, Dict, NamedTuple, Tuple
 from pathlib import Path
-from langchain_experimental.text_splitter import SemanticChunker
-from langchain_google_genai import GoogleGenerativeAIEmbeddings
-from markitdown import MarkItDown
-from app.core import settings
+from markitdown import MarkItDown, StreamInfo
+import io
+import threading
+import time
+import zipfile
+
+# Bytes read from the start of a file to recognise its format
+SNIFF_SIZE = 2048
+
+# Top-level entries that tell the OOXML/EPUB flavours of a zip archive apart
+ZIP_MARKERS = (
+    ("word/", ".docx"),
+    ("ppt/", ".pptx"),
+    ("xl/", ".xlsx"),
+    ("META-INF/container.xml", ".epub"),
+)
+
+MIMETYPES = {
+    ".pdf": "application/pdf",
+    ".docx": "application/vnd.openxmlformats-officedocument.wordprocessingml.document",
+    ".pptx": "application/vnd.openxmlformats-officedocument.presentationml.presentation",
+    ".xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+    ".epub": "application/epub+zip",
+    ".zip": "application/zip",
+    ".html": "text/html",
+    ".png": "image/png",
+    ".jpg": "image/jpeg",
+}
+
+
+class Extraction(NamedTuple):
+    text: str
+    # Format the document was converted as, e.g. ".pdf"
+    format: str
+    seconds: float
+
+
+class ExtractionError(ValueError):
+    """A failed conversion, with the format and time it took (picklable across processes)."""
+
+    def __init__(self, message: str, format: str, seconds: float):
+        super().__init__(message, format, seconds)
+        self.format = format
+        self.seconds = seconds
+
+    def __str__(self) -> str:
+        return self.args[0]
+
+
+def sniff_format(stream: BinaryIO, filename: str) -> str:
+    """
+    Guess a document's format from its first bytes, falling back to the
+    filename suffix for plain-text formats (and anything unrecognised).
+    Leaves the stream position unchanged.
+    """
+    position = stream.tell()
+    head = stream.read(SNIFF_SIZE)
+    stream.seek(position)
+
+    if head.startswith(b"%PDF-"):
+        return ".pdf"
+    if head.startswith(b"\x89PNG\r\n\x1a\n"):
+        return ".png"
+    if head.startswith(b"\xff\xd8\xff"):
+        return ".jpg"
+    if head.startswith(b"PK\x03\x04"):
+        try:
+            names = zipfile.ZipFile(stream).namelist()
+        except zipfile.BadZipFile:
+            names = []
+        finally:
+            stream.seek(position)
+        for marker, extension in ZIP_MARKERS:
+            if any(name.startswith(marker) for name in names):
+                return extension
+        return ".zip"
+
+    text = head.lstrip(b"\xef\xbb\xbf \t\r\n").lower()
+    if text.startswith((b"<!doctype html", b"<html")):
+        return ".html"
+    return Path(filename).suffix.lower()
+
+
+class TextExtractor:
+    """
+    Long-lived MarkItDown wrapper.
+
+    Building a MarkItDown registers every converter and loads the magika
+    model, which costs far more than converting a small file, so each thread
+    keeps one warmed instance (MarkItDown makes no thread-safety promises).
+    Documents are converted from streams, never copied to a temp file, and
+    the converter is chosen by sniffing the content rather than trusting the
+    filename. Conversion time is accumulated per format.
+    """
+
+    def __init__(self):
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._timings: Dict[str, Tuple[int, int, float, float]] = {}
+
+    def _converter(self) -> MarkItDown:
+        converter = getattr(self._local, "converter", None)
+        if converter is None:
+            converter = self._local.converter = MarkItDown()
+        return converter
+
+    def warm(self) -> None:
+        """Build the current thread's converter ahead of the first document."""
+        self._converter()
+
+    def extract_stream(self, stream: BinaryIO, filename: str) -> Extraction:
+        """Convert a seekable binary stream to markdown."""
+        extension = sniff_format(stream, filename)
+        stream_info = StreamInfo(extension=extension or None, mimetype=MIMETYPES.get(extension), filename=filename)
+        started = time.perf_counter()
+        try:
+            text = self._converter().convert_stream(stream, stream_info=stream_info).text_content
+        except Exception as e:
+            seconds = time.perf_counter() - started
+            self.record(extension, seconds, failed=True)
+            raise ExtractionError(f"Failed to extract text from {filename}: {str(e)}", extension, seconds)
+        extraction = Extraction(text, extension, time.perf_counter() - started)
+        self.record(extension, extraction.seconds)
+        return extraction
+
+    def record(self, extension: str, seconds: float, failed: bool = False) -> None:
+        """Add one conversion to the per-format timings."""
+        with self._lock:
+            count, failures, total, slowest = self._timings.get(extension or "unknown", (0, 0, 0.0, 0.0))
+            self._timings[extension or "unknown"] = (
+                count + 1, failures + failed, total + seconds, max(slowest, seconds)
+            )
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                extension: {
+                    "count": count,
+                    "failures": failures,
+                    "mean_ms": round(total / count * 1000, 2),
+                    "max_ms": round(slowest * 1000, 2),
+                }
+                for extension, (count, failures, total, slowest) in sorted(self._timings.items())
+            }
+
+
+# One per process: the process pool workers each get their own
+text_extractor = TextExtractor()
+
+
+def warm_text_extractor() -> None:
+    """Process pool initializer: load the converter before the first job arrives."""
+    text_extractor.warm()
+
+
+def extract_from_path(path: str, filename: str) -> Extraction:
+    """Extract text and timing from a file on disk, read as a stream (picklable, for run_in_process)."""
+    with open(path, "rb") as f:
+        return text_extractor.extract_stream(f, filename)
+
+
+def extract_text_from_path(path: str, filename: str) -> str:
+    """Extract text from a file on disk using MarkItDown."""
+    return extract_from_path(path, filename).text
 
 
 def extract_text(file_content: bytes, filename: str) -> str:
     """Extract text from various file formats using MarkItDown."""
-    md = MarkItDown()
-    
-    tmp_path = None
-    try:
-        with tempfile.NamedTemporaryFile(delete=False, suffix=Path(filename).suffix) as tmp_file:
-            tmp_path = tmp_file.name
-            tmp_file.write(file_content)
-            tmp_file.flush()
-        
-        result = md.convert(tmp_path)
-        return result.text_content
-    except Exception as e:
-        raise ValueError(f"Failed to extract text from {filename}: {str(e)}")
-    finally:
-        if tmp_path:
-            Path(tmp_path).unlink(missing_ok=True)
-
-
-def chunk_text(text: str, chunk_size: int = 500, overlap: int = 50) -> List[str]: 
-    """Split text into semantic chunks using LangChain's SemanticChunker."""
-    if not text or not text.strip():
-        return []
-    
-    try:
-        from langchain_text_splitters import RecursiveCharacterTextSplitter
-        
-        embeddings = GoogleGenerativeAIEmbeddings(
-            model=settings.GEMINI_EMBEDDING_MODEL,
-            google_api_key=settings.GEMINI_API_KEY
-        )
-        
-        text_splitter = SemanticChunker(
-            embeddings,
-            breakpoint_threshold_type="percentile",
-            buffer_size=1
-        )
-        
-        pre_splitter = RecursiveCharacterTextSplitter(
-            chunk_size=10000,
-            chunk_overlap=500
-        )
-        pre_chunks = pre_splitter.split_text(text)
-        
-        final_chunks = []
-        for pre_chunk in pre_chunks:
-            semantic_chunks = text_splitter.split_text(pre_chunk)
-            final_chunks.extend(semantic_chunks)
-        
-        return final_chunks
-    except Exception as e:
-        raise ValueError(f"Failed to chunk text: {str(e)}")
+    return text_extractor.extract_stream(io.BytesIO(file_content), filename).text
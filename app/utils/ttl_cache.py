@@ -0,0 +1,98 @@
+from typing import Any, Awaitable, Callable, Dict, Hashable, Set, Tuple
+from collections import OrderedDict
+import asyncio
+import functools
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class TTLCache:
+    """
+    Async TTL cache with stale-while-revalidate and request coalescing.
+
+    Values are fresh for ttl seconds. For stale seconds after that, the old
+    value is returned immediately while one background task reloads it.
+    Concurrent misses for the same key share a single load. Failed loads are
+    not cached; a failed background refresh keeps serving the stale value.
+    """
+
+    def __init__(self, ttl: float, stale: float, max_entries: int):
+        self.ttl = ttl
+        self.stale = stale
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Hashable, Tuple[Any, float]]" = OrderedDict()
+        self._loading: Dict[Hashable, asyncio.Task] = {}
+        # Strong references to running loads, including background refreshes nobody awaits
+        self._tasks: Set[asyncio.Task] = set()
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.coalesced = 0
+
+    async def get_or_load(self, key: Hashable, load: Callable[[], Awaitable[Any]]) -> Any:
+        entry = self._entries.get(key)
+        if entry is not None:
+            value, loaded_at = entry
+            age = time.monotonic() - loaded_at
+            if age < self.ttl:
+                self.hits += 1
+                self._entries.move_to_end(key)
+                return value
+            if age < self.ttl + self.stale:
+                self.stale_hits += 1
+                self._entries.move_to_end(key)
+                self._refresh(key, load)
+                return value
+
+        if key in self._loading:
+            self.coalesced += 1
+        else:
+            self.misses += 1
+        return await asyncio.shield(self._refresh(key, load))
+
+    def _refresh(self, key: Hashable, load: Callable[[], Awaitable[Any]]) -> asyncio.Task:
+        task = self._loading.get(key)
+        if task is None:
+            task = asyncio.create_task(self._load(key, load))
+            self._loading[key] = task
+            self._tasks.add(task)
+            task.add_done_callback(functools.partial(self._finished, key))
+        return task
+
+    def _finished(self, key: Hashable, task: asyncio.Task) -> None:
+        """Retrieve and log the outcome of a load, so background failures are not lost."""
+        self._tasks.discard(task)
+        if task.cancelled() or task.exception() is None:
+            return
+        if key in self._entries:
+            logger.warning("Refreshing %r failed, serving the stale value", key, exc_info=task.exception())
+        else:
+            logger.warning("Loading %r failed", key, exc_info=task.exception())
+
+    async def _load(self, key: Hashable, load: Callable[[], Awaitable[Any]]) -> Any:
+        try:
+            value = await load()
+        finally:
+            self._loading.pop(key, None)
+        self._entries[key] = (value, time.monotonic())
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        return value
+
+    def invalidate(self, key: Hashable = None) -> None:
+        if key is None:
+            self._entries.clear()
+        else:
+            self._entries.pop(key, None)
+
+    def stats(self) -> dict:
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+        }
@@ -1,19 +1,491 @@
-import requests
-from bs4 import BeautifulSoup
+from typing import Awaitable, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+from dataclasses import dataclass
+from html.parser import HTMLParser
+from pathlib import Path
 from fastapi import HTTPException
+from app.core import executor, settings
+from app.core.http_client import get_http_client
+import asyncio
+import codecs
+import functools
+import hashlib
+import httpx
+import re
+import tempfile
+import threading
 
+try:
+    from lxml import etree
+except ImportError:
+    etree = None
 
-def scrape_url(url: str) -> str:
-    """Scrape text content from a URL."""
+READ_CHUNK_SIZE = 64 * 1024
+
+USER_AGENT = "Mozilla/5.0"
+
+HTML_TYPES = ("text/html", "application/xhtml+xml")
+
+# Never part of the main content
+SKIP_TAGS = {
+    "head", "script", "style", "noscript", "template", "svg", "canvas", "iframe", "object", "embed",
+    "form", "button", "select", "textarea", "nav", "aside", "footer", "dialog",
+}
+SKIP_ROLES = {"navigation", "banner", "contentinfo", "complementary", "search", "menu", "menubar", "dialog"}
+# Words of a class or id (split on - and _) that mark navigation and other boilerplate,
+# unless the same class or id also has a content word ("content-with-sidebar")
+BOILERPLATE_WORDS = {
+    "nav", "navbar", "navigation", "menu", "sidebar", "footer", "breadcrumb", "breadcrumbs", "cookie",
+    "cookies", "banner", "ads", "advert", "advertisement", "share", "sharing", "social", "related",
+    "subscribe", "newsletter", "popup", "modal", "skip",
+}
+CONTENT_WORDS = {"content", "main", "article", "post", "entry", "body", "text"}
+# Content landmarks: when a page has them, only their text is kept
+MAIN_TAGS = {"main", "article"}
+# Never dropped by the class/id heuristic
+ROOT_TAGS = {"html", "body"} | MAIN_TAGS
+
+HEADINGS = {"h1": 1, "h2": 2, "h3": 3, "h4": 4, "h5": 5, "h6": 6}
+BLOCK_TAGS = {
+    "p", "div", "section", "article", "main", "header", "li", "ul", "ol", "dl", "dt", "dd", "pre",
+    "blockquote", "table", "tr", "figure", "figcaption", "address", "details", "summary",
+} | set(HEADINGS)
+VOID_TAGS = {"br", "hr", "img", "meta", "link", "input", "source", "wbr", "area", "base", "col", "embed", "track"}
+
+META_CHARSET = re.compile(rb"""<meta[^>]+charset=["']?([\w-]+)""", re.IGNORECASE)
+WHITESPACE = re.compile(r"\s+")
+NAME_SEPARATORS = re.compile(r"[-_]")
+
+
+@dataclass
+class Page:
+    # Markdown of the main content; empty when not_modified
+    text: str
+    # SHA-256 of the response body
+    content_hash: Optional[str]
+    etag: Optional[str]
+    last_modified: Optional[str]
+    # Size of the response body (None after a 304)
+    content_bytes: Optional[int] = None
+    # The server answered 304 to the conditional request, or the body hash matched
+    not_modified: bool = False
+
+
+class MarkdownBuilder:
+    """
+    Parser target turning HTML start/end/data events into markdown of the
+    page's main content.
+
+    Headings, lists, quotes, code blocks and tables keep their structure.
+    Scripts, navigation, footers and blocks whose role, class or id mark
+    them as boilerplate are skipped while parsing. If the page has <main>,
+    <article> or role="main" elements, only the text inside them is kept.
+    Serves both lxml's target parser interface and html.parser.
+    """
+
+    def __init__(self):
+        # Open elements: (tag, starts a skipped subtree, content landmark)
+        self._stack: List[tuple] = []
+        self._skipping = 0
+        self._main = 0
+        self._inline: List[str] = []
+        self._pre: Optional[List[str]] = None
+        self._cells: Optional[List[str]] = None
+        self._rows: Optional[List[str]] = None
+        # One entry per open list: next number of an <ol>, None for <ul>
+        self._lists: List[Optional[int]] = []
+        self._item_started = False
+        self._title: Optional[List[str]] = None
+        self.title = ""
+        # (markdown, inside a content landmark)
+        self.blocks: List[tuple] = []
+
+    def _is_boilerplate(self, tag: str, attrib: Dict[str, str]) -> bool:
+        if tag in SKIP_TAGS or (attrib.get("role") or "").lower() in SKIP_ROLES:
+            return True
+        if tag == "header" and not self._main:
+            return True
+        if attrib.get("aria-hidden") == "true" or "hidden" in attrib:
+            return True
+        if tag in ROOT_TAGS:
+            return False
+        for name in f"{attrib.get('class') or ''} {attrib.get('id') or ''}".lower().split():
+            words = set(NAME_SEPARATORS.split(name))
+            if words & BOILERPLATE_WORDS and not words & CONTENT_WORDS:
+                return True
+        return False
+
+    def _prefix(self) -> str:
+        quote = "> " * sum(1 for tag, *_ in self._stack if tag == "blockquote")
+        for tag, *_ in reversed(self._stack):
+            if tag in HEADINGS:
+                return quote + "#" * HEADINGS[tag] + " "
+            if tag == "li":
+                indent = "  " * (len(self._lists) - 1)
+                if self._item_started:
+                    return quote + indent + "  "
+                self._item_started = True
+                number = self._lists[-1] if self._lists else None
+                return quote + indent + (f"{number}. " if number is not None else "- ")
+        return quote
+
+    def _emit(self, text: str) -> None:
+        self.blocks.append((text, self._main > 0))
+
+    def _flush(self) -> None:
+        text = WHITESPACE.sub(" ", "".join(self._inline)).strip()
+        self._inline = []
+        if text:
+            self._emit(self._prefix() + text)
+
+    def start(self, tag: str, attrib: Dict[str, str]) -> None:
+        tag = tag.lower() if isinstance(tag, str) else ""
+        if tag == "title" and not self.title:
+            self._title = []
+        if tag in VOID_TAGS:
+            if self._skipping:
+                return
+            if tag == "br" and self._pre is not None:
+                self._pre.append("\n")
+            elif tag in ("br", "hr") and self._cells is None:
+                self._flush()
+            return
+        if tag in ("p", "li") and self._stack and self._stack[-1][0] == tag:
+            # html.parser does not close <p> and <li> implicitly
+            self.end(tag)
+
+        skipped = not self._skipping and self._is_boilerplate(tag, attrib)
+        main = not self._skipping and (tag in MAIN_TAGS or attrib.get("role") == "main")
+        in_block = self._cells is None and self._pre is None
+        if not self._skipping and in_block and (tag in BLOCK_TAGS or skipped):
+            # Text so far belongs to the enclosing element
+            self._flush()
+        self._stack.append((tag, skipped, main))
+        self._skipping += skipped
+        self._main += main
+        if self._skipping:
+            return
+
+        if tag == "pre":
+            self._pre = []
+        elif tag == "code" and self._pre is None:
+            self._inline.append("`")
+        elif tag == "table":
+            self._rows = []
+        elif tag == "tr" and self._rows is not None:
+            self._cells = []
+        elif tag in ("td", "th") and self._cells is not None:
+            self._inline = []
+        elif tag in ("ul", "ol") and in_block:
+            self._lists.append(1 if tag == "ol" else None)
+        elif tag == "li" and in_block:
+            self._item_started = False
+
+    def end(self, tag: str) -> None:
+        tag = tag.lower() if isinstance(tag, str) else ""
+        if tag == "title" and self._title is not None:
+            self.title = WHITESPACE.sub(" ", "".join(self._title)).strip()
+            self._title = None
+        if tag in VOID_TAGS or not any(open_tag == tag for open_tag, *_ in self._stack):
+            return
+        # Also close the elements left open inside this one (html.parser does not)
+        while self._stack:
+            open_tag, skipped, main = self._stack[-1]
+            if not self._skipping:
+                self._close(open_tag)
+            self._stack.pop()
+            self._skipping -= skipped
+            self._main -= main
+            if open_tag == tag:
+                break
+
+    def _close(self, tag: str) -> None:
+        if tag == "pre" and self._pre is not None:
+            code = "".join(self._pre).strip("\n")
+            self._pre = None
+            if code.strip():
+                self._emit(f"```\n{code}\n```")
+        elif tag == "code" and self._pre is None:
+            self._inline.append("`")
+        elif tag in ("td", "th") and self._cells is not None:
+            self._cells.append(WHITESPACE.sub(" ", "".join(self._inline)).strip().replace("|", "\\|"))
+            self._inline = []
+        elif tag == "tr" and self._cells is not None:
+            if any(self._cells):
+                self._rows.append("| " + " | ".join(self._cells) + " |")
+                if len(self._rows) == 1:
+                    self._rows.append("|" + " --- |" * len(self._cells))
+            self._cells = None
+        elif tag == "table" and self._rows is not None:
+            if self._rows:
+                self._emit("\n".join(self._rows))
+            self._rows = None
+        elif tag in BLOCK_TAGS and self._cells is None and self._pre is None:
+            self._flush()
+            if tag in ("ul", "ol") and self._lists:
+                self._lists.pop()
+            elif tag == "li" and self._lists and self._lists[-1] is not None:
+                self._lists[-1] += 1
+
+    def data(self, text: str) -> None:
+        if self._title is not None:
+            self._title.append(text)
+        if self._skipping:
+            return
+        if self._pre is not None:
+            self._pre.append(text)
+        else:
+            self._inline.append(text)
+
+    def comment(self, text: str) -> None:
+        pass
+
+    def close(self) -> str:
+        self._flush()
+        blocks = [text for text, main in self.blocks if main] or [text for text, _ in self.blocks]
+        if self.title and not any(block.startswith("# ") for block in blocks):
+            blocks.insert(0, f"# {self.title}")
+        return "\n\n".join(blocks)
+
+
+class _StdlibParser(HTMLParser):
+    """html.parser front end for MarkdownBuilder, used when lxml is not available."""
+
+    def __init__(self, target: MarkdownBuilder):
+        super().__init__(convert_charrefs=True)
+        self.target = target
+
+    def handle_starttag(self, tag, attrs):
+        self.target.start(tag, {name: value or "" for name, value in attrs})
+
+    def handle_startendtag(self, tag, attrs):
+        self.handle_starttag(tag, attrs)
+        self.target.end(tag)
+
+    def handle_endtag(self, tag):
+        self.target.end(tag)
+
+    def handle_data(self, data):
+        self.target.data(data)
+
+    def close(self) -> str:
+        super().close()
+        return self.target.close()
+
+
+class HtmlToMarkdown:
+    """
+    Incremental HTML to markdown conversion: feed() decoded text as it
+    arrives, close() for the markdown. Parses with lxml's C parser unless
+    SCRAPER_PARSER is "html.parser" or lxml is not installed.
+    """
+
+    def __init__(self, parser: Optional[str] = None):
+        parser = parser or settings.SCRAPER_PARSER
+        if parser == "lxml" and etree is None:
+            raise ValueError("SCRAPER_PARSER is lxml but lxml is not installed")
+        self.builder = MarkdownBuilder()
+        if parser != "html.parser" and etree is not None:
+            self.parser = "lxml"
+            self._parser = etree.HTMLParser(target=self.builder)
+        else:
+            self.parser = "html.parser"
+            self._parser = _StdlibParser(self.builder)
+
+    def feed(self, text: str) -> None:
+        if text:
+            self._parser.feed(text)
+
+    def close(self) -> str:
+        return self._parser.close() or ""
+
+
+class _PlainText:
+    """Stands in for HtmlToMarkdown when a page is text/plain."""
+
+    def __init__(self):
+        self._parts: List[str] = []
+
+    def feed(self, text: str) -> None:
+        self._parts.append(text)
+
+    def close(self) -> str:
+        return "".join(self._parts).strip()
+
+
+def _decoder(charset: Optional[str], head: bytes) -> codecs.IncrementalDecoder:
+    """Incremental decoder for the declared charset, else the <meta> one, else UTF-8."""
+    declared = [match.decode("ascii") for match in META_CHARSET.findall(head[:4096])]
+    for candidate in [charset, *declared, "utf-8"]:
+        if candidate:
+            try:
+                return codecs.getincrementaldecoder(candidate)(errors="replace")
+            except LookupError:
+                continue
+
+
+def html_to_markdown(content: bytes, charset: Optional[str] = None, parser: Optional[str] = None) -> str:
+    """Convert a whole HTML document to markdown of its main content."""
+    converter = HtmlToMarkdown(parser)
+    converter.feed(_decoder(charset, content).decode(content, final=True))
+    return converter.close()
+
+
+# Chunks buffered between a download and its converter thread
+CONVERT_QUEUE_CHUNKS = 16
+
+
+def _convert(chunks: Iterable[bytes], media_type: str, charset: Optional[str]) -> str:
+    """Decode and convert a body chunk by chunk (in a worker thread)."""
+    converter = _PlainText() if media_type == "text/plain" else HtmlToMarkdown()
+    decoder = None
+    for chunk in chunks:
+        if decoder is None:
+            decoder = _decoder(charset, chunk)
+        converter.feed(decoder.decode(chunk))
+    if decoder is not None:
+        converter.feed(decoder.decode(b"", final=True))
+    return converter.close()
+
+
+def _convert_file(path: str, media_type: str, charset: Optional[str]) -> str:
+    with open(path, "rb") as f:
+        return _convert(iter(functools.partial(f.read, READ_CHUNK_SIZE), b""), media_type, charset)
+
+
+class _Conversion:
+    """
+    Converts a body in a worker thread, under the "scraping" limit, while it
+    downloads. The queue between them is bounded, so a download waiting for
+    a conversion slot stops reading instead of buffering the page.
+    """
+
+    def __init__(self, media_type: str, charset: Optional[str]):
+        self._loop = asyncio.get_running_loop()
+        self._chunks: asyncio.Queue = asyncio.Queue(CONVERT_QUEUE_CHUNKS)
+        self._aborted = threading.Event()
+        self._task = asyncio.create_task(
+            executor.run_in_thread("scraping", _convert, self._received(), media_type, charset)
+        )
+
+    def _received(self) -> Iterator[bytes]:
+        """The queued chunks, as seen from the converter thread."""
+        while True:
+            chunk = asyncio.run_coroutine_threadsafe(self._chunks.get(), self._loop).result()
+            if chunk is None or self._aborted.is_set():
+                return
+            yield chunk
+
+    async def feed(self, chunk: Optional[bytes]) -> None:
+        """Queue a chunk (None ends the body), waiting while the queue is full."""
+        if not self._chunks.full():
+            self._chunks.put_nowait(chunk)
+            return
+        put = asyncio.ensure_future(self._chunks.put(chunk))
+        await asyncio.wait({put, self._task}, return_when=asyncio.FIRST_COMPLETED)
+        if not put.done():
+            # The converter stopped reading: raise its error
+            put.cancel()
+            self._task.result()
+
+    async def close(self) -> str:
+        await self.feed(None)
+        return await self._task
+
+    def abort(self) -> None:
+        """Stop the converter thread after a failed download."""
+        self._aborted.set()
+        self._task.cancel()
+        try:
+            # Wakes the thread if it is waiting for a chunk; a full queue means it is not
+            self._chunks.put_nowait(None)
+        except asyncio.QueueFull:
+            pass
+
+
+async def _read_body(response: httpx.Response, sink: Callable[[bytes], Awaitable]) -> Tuple[str, int]:
+    """Pass the body to sink chunk by chunk, within SCRAPER_MAX_PAGE_MB. Returns (hash, size)."""
+    digest = hashlib.sha256()
+    size = 0
+    async for chunk in response.aiter_bytes(READ_CHUNK_SIZE):
+        size += len(chunk)
+        if size > max_page_bytes():
+            raise ValueError(f"Page exceeds the {max_page_bytes()} byte limit")
+        digest.update(chunk)
+        await sink(chunk)
+    return digest.hexdigest(), size
+
+
+def max_page_bytes() -> int:
+    return settings.SCRAPER_MAX_PAGE_MB * 1024 * 1024
+
+
+async def fetch_page(url: str, etag: Optional[str] = None, last_modified: Optional[str] = None,
+                     known_hash: Optional[str] = None, timeout: Optional[float] = None) -> Page:
+    """
+    Fetch a page through the shared HTTP client, conditionally when the
+    validators of the previous fetch are given, within timeout (default
+    SCRAPER_TIMEOUT_SECONDS). Raises ValueError for content types other than
+    HTML and plain text, and above SCRAPER_MAX_PAGE_MB.
+
+    Parsing runs in the thread pool. Without known_hash it overlaps the
+    download. With known_hash the body is spooled to a temporary file and
+    only parsed when its hash differs; otherwise the page is reported as
+    not_modified.
+    """
+    headers = {"User-Agent": USER_AGENT}
+    if etag:
+        headers["If-None-Match"] = etag
+    if last_modified:
+        headers["If-Modified-Since"] = last_modified
+
+    spool = None
+    try:
+        async with get_http_client().stream(
+            "GET", url, headers=headers, timeout=timeout or settings.SCRAPER_TIMEOUT_SECONDS
+        ) as response:
+            if response.status_code == 304:
+                return Page("", known_hash, etag, last_modified, None, not_modified=True)
+            response.raise_for_status()
+
+            media_type = response.headers.get("Content-Type", "").split(";")[0].strip().lower()
+            if media_type and media_type not in HTML_TYPES and media_type != "text/plain":
+                raise ValueError(f"Unsupported content type {media_type}")
+            declared = int(response.headers.get("Content-Length") or 0)
+            if declared > max_page_bytes():
+                raise ValueError(f"Page is {declared} bytes, above the {max_page_bytes()} byte limit")
+            charset = response.charset_encoding
+
+            if known_hash is None:
+                conversion = _Conversion(media_type, charset)
+                try:
+                    content_hash, size = await _read_body(response, conversion.feed)
+                    text = await conversion.close()
+                except BaseException:
+                    conversion.abort()
+                    raise
+            else:
+                spool = await executor.run_in_thread("file", tempfile.NamedTemporaryFile, "wb", delete=False)
+                with spool:
+                    content_hash, size = await _read_body(
+                        response, lambda chunk: executor.run_in_thread("file", spool.write, chunk)
+                    )
+
+        not_modified = content_hash == known_hash
+        if spool is not None and not not_modified:
+            text = await executor.run_in_thread("scraping", _convert_file, spool.name, media_type, charset)
+        return Page(
+            "" if not_modified else text, content_hash,
+            response.headers.get("ETag"), response.headers.get("Last-Modified"),
+            size, not_modified=not_modified
+        )
+    finally:
+        if spool is not None:
+            Path(spool.name).unlink(missing_ok=True)
+
+
+async def scrape_url(url: str) -> str:
+    """Scrape the main content of a URL as markdown."""
     try:
-        response = requests.get(url, timeout=10, headers={'User-Agent': 'Mozilla/5.0'})
-        response.raise_for_status()
-        soup = BeautifulSoup(response.content, 'html.parser')
-        for script in soup(["script", "style"]):
-            script.decompose()
-        text = soup.get_text()
-        lines = (line.strip() for line in text.splitlines())
-        chunks = (phrase.strip() for line in lines for phrase in line.split("  "))
-        return '\n'.join(chunk for chunk in chunks if chunk)
+        return (await fetch_page(url)).text
     except Exception as e:
         raise HTTPException(status_code=400, detail=f"Error scraping URL: {str(e)}")
@@ -0,0 +1,62 @@
+from typing import Optional
+from app.db.base import async_session_maker
+from app.core import settings
+from app.services.ingestion import ingestion_service
+import asyncio
+import logging
+import os
+import socket
+import uuid as uuid_pkg
+
+logger = logging.getLogger(__name__)
+
+
+class IngestionWorker:
+    """Drains the ingestion job queue. Several workers (and processes) can run side by side."""
+
+    def __init__(self, worker_id: Optional[str] = None):
+        self.worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}:{uuid_pkg.uuid4().hex[:8]}"
+        self._stopping = asyncio.Event()
+
+    async def run_once(self) -> bool:
+        """Claim and process a single job. Returns False when the queue is empty."""
+        async with async_session_maker() as db:
+            job_id = await ingestion_service.claim_job(db, self.worker_id)
+        if job_id is None:
+            return False
+
+        logger.info("Worker %s processing ingestion job %s", self.worker_id, job_id)
+        await ingestion_service.process_job(job_id, self.worker_id)
+        return True
+
+    async def run(self):
+        while not self._stopping.is_set():
+            try:
+                processed = await self.run_once()
+            except Exception:
+                logger.exception("Ingestion worker %s failed", self.worker_id)
+                processed = False
+
+            if not processed:
+                ingestion_service.job_available.clear()
+                try:
+                    await asyncio.wait_for(
+                        ingestion_service.job_available.wait(),
+                        timeout=settings.INGESTION_POLL_INTERVAL
+                    )
+                except asyncio.TimeoutError:
+                    pass
+
+    def stop(self):
+        self._stopping.set()
+        ingestion_service.job_available.set()
+
+
+async def main():
+    workers = [IngestionWorker() for _ in range(settings.INGESTION_WORKER_CONCURRENCY)]
+    await asyncio.gather(*(worker.run() for worker in workers))
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=settings.LOG_LEVEL, format="%(levelname)s [%(name)s] %(message)s")
+    asyncio.run(main())
@@ -0,0 +1,47 @@
+from app.core import settings
+from app.core.http_client import close_http_client
+from app.services.link_refresh import link_refresh_service
+import asyncio
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class LinkRefreshWorker:
+    """
+    Refreshes link sources as they fall due. Run one: several are safe (links
+    are claimed with SKIP LOCKED) but each enforces per-host limits alone.
+    """
+
+    def __init__(self):
+        self._stopping = asyncio.Event()
+
+    async def run(self):
+        while not self._stopping.is_set():
+            try:
+                claimed = await link_refresh_service.run_once()
+            except Exception:
+                logger.exception("Link refresh failed")
+                claimed = 0
+
+            # A full batch means more links may be due right away
+            if claimed < settings.LINK_REFRESH_BATCH_SIZE:
+                try:
+                    await asyncio.wait_for(self._stopping.wait(), timeout=settings.LINK_REFRESH_POLL_INTERVAL)
+                except asyncio.TimeoutError:
+                    pass
+
+    def stop(self):
+        self._stopping.set()
+
+
+async def main():
+    try:
+        await LinkRefreshWorker().run()
+    finally:
+        await close_http_client()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=settings.LOG_LEVEL, format="%(levelname)s [%(name)s] %(message)s")
+    asyncio.run(main())
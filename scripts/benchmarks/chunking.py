@@ -0,0 +1,120 @@
+"""
+Compare chunking strategies: wall time and embedding API calls per MB of text.
+
+    uv run python -m scripts.benchmarks.chunking docs/*.md
+    uv run python -m scripts.benchmarks.chunking --synthetic-mb 2 --offline
+
+--offline replaces Gemini with a deterministic fake embedder that sleeps
+--latency seconds per request, so runs are repeatable and free.
+"""
+from typing import List
+from langchain_core.embeddings import Embeddings
+from app.core import settings
+from app.utils.chunking import chunk_document
+import argparse
+import hashlib
+import random
+import time
+import numpy as np
+
+BATCH_LIMIT = 100
+
+
+class CountingEmbeddings(Embeddings):
+    """Counts embedding requests (batched like the provider) and texts."""
+
+    def __init__(self, inner: Embeddings = None, latency: float = 0.0):
+        self.inner = inner
+        self.latency = latency
+        self.calls = 0
+        self.texts = 0
+
+    def _fake(self, text: str) -> List[float]:
+        seed = int.from_bytes(hashlib.sha256(text.encode()).digest()[:4], "little")
+        return np.random.default_rng(seed).standard_normal(768).tolist()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        self.calls += (len(texts) + BATCH_LIMIT - 1) // BATCH_LIMIT
+        self.texts += len(texts)
+        if self.inner is not None:
+            return self.inner.embed_documents(texts)
+        time.sleep(self.latency * ((len(texts) + BATCH_LIMIT - 1) // BATCH_LIMIT))
+        return [self._fake(text) for text in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_documents([text])[0]
+
+
+def synthetic_markdown(megabytes: float) -> str:
+    words = ["aula", "módulo", "segurança", "elétrica", "projeto", "norma", "circuito", "processo",
+             "qualidade", "manutenção", "sistema", "controle", "dados", "rede", "energia"]
+    rng = random.Random(42)
+    parts, size, section = [], 0, 0
+    while size < megabytes * 1024 * 1024:
+        section += 1
+        block = [f"## Seção {section}\n"]
+        for _ in range(rng.randint(2, 6)):
+            sentences = [
+                " ".join(rng.choice(words) for _ in range(rng.randint(6, 18))).capitalize() + "."
+                for _ in range(rng.randint(3, 8))
+            ]
+            block.append(" ".join(sentences) + "\n")
+        text = "\n".join(block)
+        parts.append(text)
+        size += len(text.encode())
+    return "\n".join(parts)
+
+
+def run(strategy: str, text: str, embeddings: CountingEmbeddings) -> dict:
+    started = time.perf_counter()
+    chunks = chunk_document(text, strategy=strategy, embeddings=embeddings)
+    elapsed = time.perf_counter() - started
+
+    # Chunks without a chunker-provided embedding still need one embedding request per batch
+    pending = sum(1 for chunk in chunks if chunk.embedding is None)
+    megabytes = len(text.encode()) / (1024 * 1024)
+    calls = embeddings.calls + (pending + BATCH_LIMIT - 1) // BATCH_LIMIT
+    return {
+        "strategy": strategy,
+        "chunks": len(chunks),
+        "seconds": elapsed,
+        "seconds_per_mb": elapsed / megabytes,
+        "api_calls_per_mb": calls / megabytes,
+        "texts_embedded_per_mb": (embeddings.texts + pending) / megabytes,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("files", nargs="*", help="Markdown/text files to chunk")
+    parser.add_argument("--synthetic-mb", type=float, default=1.0, help="Size of generated text when no files are given")
+    parser.add_argument("--offline", action="store_true", help="Use a fake embedder instead of Gemini")
+    parser.add_argument("--latency", type=float, default=0.3, help="Simulated seconds per embedding request (offline)")
+    parser.add_argument("--strategies", default="markdown,semantic")
+    args = parser.parse_args()
+
+    if args.files:
+        text = "\n\n".join(open(path, encoding="utf-8").read() for path in args.files)
+    else:
+        text = synthetic_markdown(args.synthetic_mb)
+
+    print(f"{len(text.encode()) / (1024 * 1024):.2f} MB of text")
+    print(f"{'strategy':<10} {'chunks':>8} {'s':>8} {'s/MB':>8} {'calls/MB':>9} {'texts/MB':>9}")
+    for strategy in args.strategies.split(","):
+        inner = None
+        if not args.offline:
+            from langchain_google_genai import GoogleGenerativeAIEmbeddings
+            inner = GoogleGenerativeAIEmbeddings(
+                model=settings.GEMINI_EMBEDDING_MODEL,
+                google_api_key=settings.GEMINI_API_KEY
+            )
+        result = run(strategy, text, CountingEmbeddings(inner, args.latency))
+        print(
+            f"{result['strategy']:<10} {result['chunks']:>8} {result['seconds']:>8.2f} "
+            f"{result['seconds_per_mb']:>8.2f} {result['api_calls_per_mb']:>9.1f} "
+            f"{result['texts_embedded_per_mb']:>9.0f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
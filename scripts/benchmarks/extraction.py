@@ -0,0 +1,137 @@
+"""
+Per-file extraction overhead on small documents: a fresh MarkItDown plus a
+temp file per document (the old extract_text) against the warmed, stream-based
+TextExtractor.
+
+    uv run python -m scripts.benchmarks.extraction --repeat 20
+
+The DOCX, HTML and PDF inputs are generated in memory and hold a few
+paragraphs each, so the numbers are dominated by setup rather than parsing.
+Pass --files to time your own documents as well.
+"""
+from typing import Callable, Dict, List, Tuple
+from pathlib import Path
+from markitdown import MarkItDown
+from app.utils.text_extraction import TextExtractor
+import argparse
+import io
+import statistics
+import tempfile
+import time
+import zipfile
+
+PARAGRAPHS = [f"Paragraph {i}: redes de computadores, protocolos e camadas do modelo OSI." for i in range(5)]
+
+
+def make_html() -> bytes:
+    body = "".join(f"<p>{paragraph}</p>" for paragraph in PARAGRAPHS)
+    return f"<!DOCTYPE html><html><head><title>Sample</title></head><body><h1>Sample</h1>{body}</body></html>".encode()
+
+
+def make_docx() -> bytes:
+    paragraphs = "".join(f"<w:p><w:r><w:t>{paragraph}</w:t></w:r></w:p>" for paragraph in PARAGRAPHS)
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as docx:
+        docx.writestr("[Content_Types].xml", (
+            '<?xml version="1.0" encoding="UTF-8"?>'
+            '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+            '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+            '<Default Extension="xml" ContentType="application/xml"/>'
+            '<Override PartName="/word/document.xml" ContentType="application/vnd.openxmlformats-'
+            'officedocument.wordprocessingml.document.main+xml"/></Types>'
+        ))
+        docx.writestr("_rels/.rels", (
+            '<?xml version="1.0" encoding="UTF-8"?>'
+            '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+            '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/'
+            'relationships/officeDocument" Target="word/document.xml"/></Relationships>'
+        ))
+        docx.writestr("word/document.xml", (
+            '<?xml version="1.0" encoding="UTF-8"?>'
+            '<w:document xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main">'
+            f'<w:body>{paragraphs}</w:body></w:document>'
+        ))
+    return buffer.getvalue()
+
+
+def make_pdf() -> bytes:
+    lines = " ".join(f"({paragraph}) Tj 0 -16 Td" for paragraph in PARAGRAPHS)
+    stream = f"BT /F1 11 Tf 50 750 Td {lines} ET".encode()
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        b"<< /Type /Pages /Kids [3 0 R] /Count 1 >>",
+        b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] /Contents 4 0 R "
+        b"/Resources << /Font << /F1 5 0 R >> >> >>",
+        b"<< /Length " + str(len(stream)).encode() + b" >>\nstream\n" + stream + b"\nendstream",
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    ]
+    pdf = io.BytesIO()
+    pdf.write(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(pdf.tell())
+        pdf.write(f"{number} 0 obj\n".encode() + body + b"\nendobj\n")
+    xref = pdf.tell()
+    pdf.write(f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode())
+    for offset in offsets:
+        pdf.write(f"{offset:010d} 00000 n \n".encode())
+    pdf.write(f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode())
+    return pdf.getvalue()
+
+
+def fresh_converter(content: bytes, filename: str) -> str:
+    """What extract_text did before: new MarkItDown, temp file, convert by path."""
+    md = MarkItDown()
+    with tempfile.NamedTemporaryFile(suffix=Path(filename).suffix) as tmp_file:
+        tmp_file.write(content)
+        tmp_file.flush()
+        return md.convert(tmp_file.name).text_content
+
+
+def time_runs(func: Callable[[bytes, str], str], content: bytes, filename: str, repeat: int) -> List[float]:
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        text = func(content, filename)
+        timings.append((time.perf_counter() - started) * 1000)
+    if not text.strip():
+        raise SystemExit(f"{filename}: no text extracted")
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--files", nargs="*", default=[], help="Extra documents to time")
+    args = parser.parse_args()
+
+    inputs: List[Tuple[str, bytes]] = [
+        ("sample.docx", make_docx()),
+        ("sample.html", make_html()),
+        ("sample.pdf", make_pdf()),
+    ] + [(Path(path).name, Path(path).read_bytes()) for path in args.files]
+
+    extractor = TextExtractor()
+    started = time.perf_counter()
+    extractor.warm()
+    print(f"warm-up {(time.perf_counter() - started) * 1000:.0f} ms (paid once per process)")
+
+    def warmed(content: bytes, filename: str) -> str:
+        return extractor.extract_stream(io.BytesIO(content), filename).text
+
+    results: Dict[str, Tuple[float, float]] = {}
+    for filename, content in inputs:
+        results[filename] = (
+            statistics.median(time_runs(fresh_converter, content, filename, args.repeat)),
+            statistics.median(time_runs(warmed, content, filename, args.repeat)),
+        )
+
+    print(f"{'file':<24} {'bytes':>8} {'fresh ms':>9} {'warmed ms':>10} {'speed-up':>9}")
+    for filename, content in inputs:
+        fresh, warm = results[filename]
+        print(f"{filename:<24} {len(content):>8} {fresh:>9.1f} {warm:>10.1f} {fresh / max(warm, 1e-9):>8.1f}x")
+    print(f"\nper-format timings: {extractor.stats()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""
+Compare retrieval latency of the vector, hybrid and lexical search modes on a
+real notebook.
+
+    uv run python -m scripts.benchmarks.retrieval <notebook_id> "question one" "question two"
+    uv run python -m scripts.benchmarks.retrieval <notebook_id> --queries-file questions.txt
+
+Each question is embedded once up front, so the timings cover only the
+database round trip. Every mode runs --repeat times per question after one
+warm-up run, and the overlap column is the share of each mode's results that
+vector-only search also returned.
+"""
+from typing import Dict, List
+from app.db.base import async_session_maker, engine
+from app.services import DatabaseService, vector_store
+import argparse
+import asyncio
+import statistics
+import time
+import uuid as uuid_pkg
+
+MODES = ("vector", "hybrid", "lexical")
+
+
+def percentile(values: List[float], fraction: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+async def run(notebook_public_id: str, questions: List[str], n_results: int, repeat: int):
+    async with async_session_maker() as db:
+        notebook = await DatabaseService.get_notebook(db, uuid_pkg.UUID(notebook_public_id))
+        if notebook is None:
+            raise SystemExit(f"Notebook {notebook_public_id} not found")
+        count = await vector_store.get_collection_count(db, notebook.id)
+        embeddings = [await vector_store.embed_query(question, notebook.embedding_dimensions) for question in questions]
+
+        timings: Dict[str, List[float]] = {mode: [] for mode in MODES}
+        overlap: Dict[str, List[float]] = {mode: [] for mode in MODES}
+        for question, embedding in zip(questions, embeddings):
+            results = {}
+            for mode in MODES:
+                for attempt in range(repeat + 1):
+                    started = time.perf_counter()
+                    result = await vector_store.query(
+                        db, notebook.id, question, n_results, collection_count=count,
+                        query_embedding=embedding, mode=mode
+                    )
+                    elapsed = time.perf_counter() - started
+                    # Each query runs in its own transaction, like a chat request
+                    await db.rollback()
+                    if attempt:
+                        timings[mode].append(elapsed * 1000)
+                results[mode] = set(result["documents"][0])
+            for mode in MODES:
+                if results[mode]:
+                    overlap[mode].append(len(results[mode] & results["vector"]) / len(results[mode]))
+    await engine.dispose()
+
+    print(f"{count} enabled chunks, {len(questions)} question(s), {repeat} run(s) each, top {n_results}")
+    print(f"{'mode':<8} {'p50 ms':>8} {'p95 ms':>8} {'mean ms':>8} {'overlap':>8}")
+    for mode in MODES:
+        print(
+            f"{mode:<8} {percentile(timings[mode], 0.5):>8.1f} {percentile(timings[mode], 0.95):>8.1f} "
+            f"{statistics.mean(timings[mode]):>8.1f} "
+            f"{statistics.mean(overlap[mode]) if overlap[mode] else 0.0:>8.0%}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("notebook_id", help="Public id of the notebook to search")
+    parser.add_argument("questions", nargs="*", help="Questions to run")
+    parser.add_argument("--queries-file", help="File with one question per line")
+    parser.add_argument("--n-results", type=int, default=10)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    questions = list(args.questions)
+    if args.queries_file:
+        with open(args.queries_file, encoding="utf-8") as f:
+            questions.extend(line.strip() for line in f if line.strip())
+    if not questions:
+        parser.error("give at least one question or --queries-file")
+
+    asyncio.run(run(args.notebook_id, questions, args.n_results, args.repeat))
+
+
+if __name__ == "__main__":
+    main()
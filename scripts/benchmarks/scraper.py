@@ -0,0 +1,106 @@
+"""
+HTML to text for link sources: the old BeautifulSoup get_text pass against
+the streaming markdown converter, with the lxml and html.parser front ends.
+
+    uv run --extra benchmarks python -m scripts.benchmarks.scraper --repeat 20
+    uv run --extra benchmarks python -m scripts.benchmarks.scraper --corpus saved_pages/
+
+Without --corpus, synthetic pages are generated: an article of --sections
+sections (headings, paragraphs, a list and a table) wrapped in navigation,
+sidebar and footer boilerplate. With --corpus, every *.html file in the
+directory is timed. Output chars show how much boilerplate is dropped;
+headings are the markdown headings kept (the old text had none).
+"""
+from typing import Callable, Dict, List, Tuple
+from pathlib import Path
+from bs4 import BeautifulSoup
+from app.utils.web_scraper import etree, html_to_markdown
+import argparse
+import statistics
+import time
+
+NAV = "".join(f'<li><a href="/section/{i}">Section {i}</a></li>' for i in range(40))
+
+
+def make_page(sections: int) -> bytes:
+    body = []
+    for i in range(sections):
+        body.append(f"<h2>Capítulo {i}</h2>")
+        body.extend(
+            f"<p>Parágrafo {j} do capítulo {i}: redes de computadores, protocolos e camadas do modelo OSI, "
+            f"com <a href='#'>referências</a> e <strong>termos</strong> em destaque.</p>"
+            for j in range(6)
+        )
+        body.append("<ul>" + "".join(f"<li>Item {j} do capítulo {i}</li>" for j in range(5)) + "</ul>")
+        body.append(
+            "<table><tr><th>Camada</th><th>Protocolo</th></tr>"
+            + "".join(f"<tr><td>{j}</td><td>TCP/{j}</td></tr>" for j in range(4)) + "</table>"
+        )
+    return (
+        "<!DOCTYPE html><html><head><meta charset='utf-8'><title>Sample</title>"
+        "<style>body { font-family: sans-serif; }</style><script>var tracking = 1;</script></head>"
+        f"<body><header><nav><ul>{NAV}</ul></nav></header>"
+        f"<aside class='sidebar'><ul>{NAV}</ul></aside>"
+        f"<main><article><h1>Sample</h1>{''.join(body)}</article></main>"
+        f"<footer><p>Copyright</p><ul>{NAV}</ul></footer></body></html>"
+    ).encode()
+
+
+def beautifulsoup_text(content: bytes) -> str:
+    """What html_to_text did before: html.parser tree, get_text, line splitting."""
+    soup = BeautifulSoup(content, "html.parser")
+    for script in soup(["script", "style"]):
+        script.decompose()
+    lines = (line.strip() for line in soup.get_text().splitlines())
+    chunks = (phrase.strip() for line in lines for phrase in line.split("  "))
+    return "\n".join(chunk for chunk in chunks if chunk)
+
+
+def time_runs(func: Callable[[bytes], str], content: bytes, repeat: int) -> Tuple[float, str]:
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        text = func(content)
+        timings.append((time.perf_counter() - started) * 1000)
+    return statistics.median(timings), text
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--corpus", help="Directory of saved .html pages to time instead of synthetic ones")
+    parser.add_argument("--sections", type=int, nargs="*", default=[5, 50, 500], help="Sizes of the synthetic pages")
+    args = parser.parse_args()
+
+    if args.corpus:
+        inputs: List[Tuple[str, bytes]] = [(path.name, path.read_bytes()) for path in sorted(Path(args.corpus).glob("*.html"))]
+        if not inputs:
+            raise SystemExit(f"No .html files in {args.corpus}")
+    else:
+        inputs = [(f"synthetic-{sections}", make_page(sections)) for sections in args.sections]
+
+    converters: Dict[str, Callable[[bytes], str]] = {"bs4 get_text": beautifulsoup_text}
+    if etree is not None:
+        converters["markdown lxml"] = lambda content: html_to_markdown(content, parser="lxml")
+    converters["markdown html.parser"] = lambda content: html_to_markdown(content, parser="html.parser")
+
+    print(f"{'page':<24} {'converter':<22} {'KB':>7} {'ms':>8} {'MB/s':>7} {'chars':>8} {'headings':>9}")
+    totals: Dict[str, List[float]] = {name: [] for name in converters}
+    for name, content in inputs:
+        for converter, func in converters.items():
+            elapsed, text = time_runs(func, content, args.repeat)
+            totals[converter].append(elapsed)
+            headings = sum(1 for line in text.splitlines() if line.startswith("#"))
+            print(
+                f"{name[:24]:<24} {converter:<22} {len(content) / 1024:>7.0f} {elapsed:>8.2f} "
+                f"{len(content) / 1024 / 1024 / max(elapsed / 1000, 1e-9):>7.1f} {len(text):>8} {headings:>9}"
+            )
+
+    baseline = sum(totals["bs4 get_text"])
+    print()
+    for converter, timings in totals.items():
+        print(f"{converter:<22} total {sum(timings):>9.1f} ms  {baseline / max(sum(timings), 1e-9):>5.1f}x")
+
+
+if __name__ == "__main__":
+    main()
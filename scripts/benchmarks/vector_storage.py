@@ -0,0 +1,131 @@
+"""
+Recall, latency and size of the VECTOR_STORAGE modes on a real notebook.
+
+    uv run python -m scripts.benchmarks.vector_storage <notebook_id>
+    uv run python -m scripts.benchmarks.vector_storage <notebook_id> --queries-file questions.txt
+
+Without questions, the embeddings of --samples random chunks of the notebook
+are used as queries. The reference is an exact full-precision scan; recall is
+the share of its top --n-results that each mode returns through the index.
+Sizes are the average stored size per embedding and the size of each mode's
+ANN index (missing indexes are reported, and that mode then falls back to a
+sequential scan, so its latency is not representative).
+"""
+from typing import Dict, List
+from sqlalchemy import func, select, text
+from app.core import settings
+from app.db.base import async_session_maker, engine
+from app.db.vector_indexes import ann_index
+from app.models import DocumentEmbedding
+from app.services import DatabaseService, vector_store
+from app.services.vector_store import VECTOR_STORAGES
+import argparse
+import asyncio
+import statistics
+import time
+import uuid as uuid_pkg
+
+def percentile(values: List[float], fraction: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+async def sizes(db, notebook_id: int, dimensions: int) -> Dict[str, tuple]:
+    row = (await db.execute(text(
+        'SELECT avg(pg_column_size(embedding)), '
+        f'avg(pg_column_size(embedding::halfvec({dimensions}))), '
+        'avg(pg_column_size(embedding_bits)), '
+        'count(*) FILTER (WHERE embedding_bits IS NULL) '
+        'FROM document_embeddings WHERE notebook_id = :notebook_id'
+    ), {"notebook_id": notebook_id})).one()
+    result = {}
+    for storage, column_size in zip(VECTOR_STORAGES, row[:3]):
+        index_size = (await db.execute(
+            text("SELECT pg_relation_size(to_regclass(:name))"), {"name": ann_index(dimensions, storage)[0]}
+        )).scalar()
+        result[storage] = (column_size or 0, index_size)
+    result["missing_bits"] = row[3]
+    return result
+
+
+async def run(notebook_public_id: str, questions: List[str], samples: int, n_results: int, repeat: int):
+    async with async_session_maker() as db:
+        notebook = await DatabaseService.get_notebook(db, uuid_pkg.UUID(notebook_public_id))
+        if notebook is None:
+            raise SystemExit(f"Notebook {notebook_public_id} not found")
+        count = await vector_store.get_collection_count(db, notebook.id)
+        if questions:
+            embeddings = [await vector_store.embed_query(question, notebook.embedding_dimensions) for question in questions]
+        else:
+            embeddings = (await db.execute(
+                select(DocumentEmbedding.embedding)
+                .where(DocumentEmbedding.notebook_id == notebook.id, DocumentEmbedding.enabled == True)
+                .order_by(func.random())
+                .limit(samples)
+            )).scalars().all()
+            embeddings = [list(embedding) for embedding in embeddings]
+
+        async def search(embedding, exact: bool) -> set:
+            result = await vector_store.query(
+                db, notebook.id, "", n_results, collection_count=0 if exact else None,
+                query_embedding=embedding, mode="vector"
+            )
+            await db.rollback()
+            return set(result["documents"][0])
+
+        configured = settings.VECTOR_STORAGE
+        timings: Dict[str, List[float]] = {storage: [] for storage in VECTOR_STORAGES}
+        recall: Dict[str, List[float]] = {storage: [] for storage in VECTOR_STORAGES}
+        try:
+            for embedding in embeddings:
+                settings.VECTOR_STORAGE = "full"
+                reference = await search(embedding, exact=True)
+                for storage in VECTOR_STORAGES:
+                    settings.VECTOR_STORAGE = storage
+                    for attempt in range(repeat + 1):
+                        started = time.perf_counter()
+                        found = await search(embedding, exact=False)
+                        if attempt:
+                            timings[storage].append((time.perf_counter() - started) * 1000)
+                    if reference:
+                        recall[storage].append(len(found & reference) / len(reference))
+        finally:
+            settings.VECTOR_STORAGE = configured
+        storage_sizes = await sizes(db, notebook.id, notebook.embedding_dimensions)
+    await engine.dispose()
+
+    print(f"{count} enabled chunks, {len(embeddings)} quer(ies), {repeat} run(s) each, top {n_results}, "
+          f"{settings.VECTOR_RESCORE_CANDIDATES} rescored candidates")
+    print(f"{'storage':<8} {'recall':>7} {'p50 ms':>8} {'p95 ms':>8} {'bytes/row':>10} {'index MB':>9}")
+    for storage in VECTOR_STORAGES:
+        column_size, index_size = storage_sizes[storage]
+        index = f"{index_size / 1024 / 1024:>9.1f}" if index_size is not None else f"{'missing':>9}"
+        print(
+            f"{storage:<8} {statistics.mean(recall[storage]) if recall[storage] else 0.0:>7.1%} "
+            f"{percentile(timings[storage], 0.5):>8.1f} {percentile(timings[storage], 0.95):>8.1f} "
+            f"{float(column_size):>10.0f} {index}"
+        )
+    if storage_sizes["missing_bits"]:
+        print(f"\n{storage_sizes['missing_bits']} embedding(s) of this notebook have no embedding_bits yet")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("notebook_id", help="Public id of the notebook to search")
+    parser.add_argument("questions", nargs="*", help="Questions to run instead of sampled chunks")
+    parser.add_argument("--queries-file", help="File with one question per line")
+    parser.add_argument("--samples", type=int, default=50, help="Chunks sampled as queries without questions")
+    parser.add_argument("--n-results", type=int, default=10)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    questions = list(args.questions)
+    if args.queries_file:
+        with open(args.queries_file, encoding="utf-8") as f:
+            questions.extend(line.strip() for line in f if line.strip())
+
+    asyncio.run(run(args.notebook_id, questions, args.samples, args.n_results, args.repeat))
+
+
+if __name__ == "__main__":
+    main()
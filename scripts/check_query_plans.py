@@ -0,0 +1,291 @@
+"""
+Check that the queries issued by DatabaseService, VectorStoreService and the
+ingestion queue are served by indexes.
+
+    uv run python -m scripts.check_query_plans [--scale 0.1]
+
+Everything runs inside a transaction that is rolled back at the end, so the
+database is left untouched. Synthetic rows at production-like proportions
+(SEED_ROWS, times --scale) are inserted first and every table is analyzed, so
+the planner costs each query with realistic statistics and no overrides. The
+SQL the service methods issue is then captured and passed to EXPLAIN. Foreign
+keys are checked the same way, since ON DELETE CASCADE / SET NULL look rows
+up by the referencing column. A sequential scan fails the check unless the
+table has fewer than SMALL_TABLE_ROWS rows, where it is the cheaper plan, or
+it is listed in EXPECTED_SEQ_SCANS.
+Exits with status 1 on failures; tests/test_query_plans.py runs the same check.
+"""
+from typing import Dict, Iterator, List, Tuple
+from datetime import datetime, timezone
+from sqlalchemy import event, select, text
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncSession
+from app.core import settings
+from app.db.base import Base, engine
+from app.services import DatabaseService, vector_store, ingestion_service
+from app.services.link_refresh import link_refresh_service
+from app.utils.pagination import PageParams
+import app.models  # noqa: F401  (registers every table on Base.metadata)
+import argparse
+import asyncio
+import json
+import sys
+import uuid as uuid_pkg
+
+CHECKED_STATEMENTS = ("SELECT", "UPDATE", "DELETE", "WITH")
+
+# Sequential scans are accepted on tables smaller than this
+SMALL_TABLE_ROWS = 1000
+
+# (query, table) scans that are the intended plan. The scheduler's due time
+# depends on each notebook's link_refresh_hours, so it reads every notebook,
+# once per LINK_REFRESH_POLL_INTERVAL.
+EXPECTED_SEQ_SCANS = {("claim_due_links", "notebooks")}
+
+# Rows inserted at --scale 1: per table, or per parent row for child tables
+SEED_ROWS = {
+    "notebooks": 2000,
+    "api_keys": 200,
+    "embedding_cache": 5000,
+    "sources per notebook": 20,
+    "chunks per source": 2,
+    "conversations per notebook": 10,
+    "messages per conversation": 20,
+    "jobs per notebook": 5,
+    "items per job": 4,
+}
+
+# Dimension of the chunks of every seeded notebook but the first, which uses
+# EMBEDDING_DIMENSIONS. They fall outside the partial ANN indexes, whose
+# inserts would dominate seeding, while the row counts stay realistic.
+SEED_DIMENSIONS = 16
+
+# Run in order with :notebooks, :api_keys, :cache_rows, the per-parent counts,
+# :dimensions and :first, the largest notebook id before seeding
+SEED_STATEMENTS = [
+    """
+    INSERT INTO notebooks (public_id, name, embedding_dimensions, link_refresh_hours)
+    SELECT gen_random_uuid(), 'notebook ' || g,
+           CASE WHEN g = 1 THEN CAST(:dimensions AS integer) ELSE CAST(:seed_dimensions AS integer) END,
+           CASE WHEN g % 10 = 0 THEN 24 END
+    FROM generate_series(1, :notebooks) g
+    """,
+    """
+    INSERT INTO api_keys (public_id, key_hash, name, is_active)
+    SELECT gen_random_uuid(), md5(random()::text) || md5(random()::text), 'key ' || g, g % 10 <> 0
+    FROM generate_series(1, :api_keys) g
+    """,
+    """
+    INSERT INTO embedding_cache (model, task_type, content_hash, embedding)
+    SELECT 'check_query_plans', 'RETRIEVAL_DOCUMENT', md5(g::text) || md5(random()::text),
+           (SELECT array_agg(random()::real) FROM generate_series(1, :dimensions) WHERE g > 0)::vector
+    FROM generate_series(1, :cache_rows) g
+    """,
+    """
+    INSERT INTO sources (public_id, notebook_id, name, type, payload, content_hash, checked_at, created_at)
+    SELECT gen_random_uuid(), n.id, 'source ' || g, CASE WHEN g % 4 = 0 THEN 'link' ELSE 'file' END,
+           CASE WHEN g % 4 = 0 THEN jsonb_build_object('url', 'https://example.com/' || n.id || '/' || g) END,
+           md5(random()::text), now() - random() * interval '48 hours', now() - random() * interval '90 days'
+    FROM notebooks n, generate_series(1, :sources) g WHERE n.id > :first
+    """,
+    """
+    INSERT INTO document_embeddings
+        (public_id, notebook_id, source_id, content, content_hash, embedding, embedding_bits, filename, chunk_index)
+    SELECT gen_random_uuid(), notebook_id, id, content, md5(content), embedding,
+           binary_quantize(embedding)::bit varying, name, chunk_index
+    FROM (
+        SELECT s.id, s.notebook_id, s.name, g - 1 AS chunk_index,
+               'redes de computadores ' || md5(random()::text) || ' camada ' || g AS content,
+               (SELECT array_agg(random()::real - 0.5) FROM generate_series(1, n.embedding_dimensions)
+                WHERE s.id + g > 0)::vector AS embedding
+        FROM notebooks n JOIN sources s ON s.notebook_id = n.id, generate_series(1, :chunks) g
+        WHERE n.id > :first
+    ) chunks
+    """,
+    """
+    INSERT INTO conversations (public_id, notebook_id, title, created_at)
+    SELECT gen_random_uuid(), n.id, 'conversation ' || g, now() - random() * interval '90 days'
+    FROM notebooks n, generate_series(1, :conversations) g WHERE n.id > :first
+    """,
+    """
+    INSERT INTO chat_messages (public_id, conversation_id, role, content, sources, created_at)
+    SELECT gen_random_uuid(), c.id, CASE WHEN g % 2 = 1 THEN 'user' ELSE 'assistant' END,
+           'message ' || g, '[]'::jsonb, c.created_at + g * interval '1 minute'
+    FROM conversations c, generate_series(1, :messages) g WHERE c.notebook_id > :first
+    """,
+    """
+    INSERT INTO ingestion_jobs (public_id, notebook_id, kind, status, attempts, created_at, finished_at)
+    SELECT gen_random_uuid(), n.id, 'upload', CASE WHEN n.id % 200 = 0 AND g = 1 THEN 'pending' ELSE 'completed' END,
+           1, now() - random() * interval '90 days', now()
+    FROM notebooks n, generate_series(1, :jobs) g WHERE n.id > :first
+    """,
+    """
+    INSERT INTO ingestion_job_items (job_id, position, name, source_type, payload, status)
+    SELECT j.id, g - 1, 'file ' || g, 'file', '{}'::jsonb, j.status
+    FROM ingestion_jobs j, generate_series(1, :items) g WHERE j.notebook_id > :first
+    """,
+]
+
+
+def _seq_scans(plan: dict) -> Iterator[str]:
+    if plan.get("Node Type") == "Seq Scan":
+        yield plan["Relation Name"]
+    for child in plan.get("Plans", []):
+        yield from _seq_scans(child)
+
+
+async def _seed(connection: AsyncConnection, scale: float) -> Dict[str, int]:
+    """Insert the synthetic rows and analyze every table. Returns ids of seeded rows to query by."""
+    first = (await connection.execute(text("SELECT coalesce(max(id), 0) FROM notebooks"))).scalar()
+    counts = {
+        "notebooks": max(1, round(SEED_ROWS["notebooks"] * scale)),
+        "api_keys": max(1, round(SEED_ROWS["api_keys"] * scale)),
+        "cache_rows": max(1, round(SEED_ROWS["embedding_cache"] * scale)),
+        "sources": SEED_ROWS["sources per notebook"],
+        "chunks": SEED_ROWS["chunks per source"],
+        "conversations": SEED_ROWS["conversations per notebook"],
+        "messages": SEED_ROWS["messages per conversation"],
+        "jobs": SEED_ROWS["jobs per notebook"],
+        "items": SEED_ROWS["items per job"],
+    }
+    parameters = {
+        **counts, "first": first, "dimensions": settings.EMBEDDING_DIMENSIONS, "seed_dimensions": SEED_DIMENSIONS
+    }
+    for statement in SEED_STATEMENTS:
+        await connection.execute(text(statement), parameters)
+    for table in Base.metadata.sorted_tables:
+        await connection.exec_driver_sql(f"ANALYZE {table.name}")
+
+    async def seeded(query: str) -> int:
+        return (await connection.execute(text(query), {"first": first})).scalar()
+
+    return {
+        "notebook": await seeded("SELECT min(id) FROM notebooks WHERE id > :first"),
+        "conversation": await seeded("SELECT min(id) FROM conversations WHERE notebook_id > :first"),
+        "source": await seeded("SELECT min(id) FROM sources WHERE notebook_id > :first"),
+    }
+
+
+async def _table_rows(connection: AsyncConnection) -> Dict[str, float]:
+    result = await connection.execute(text(
+        "SELECT relname, reltuples FROM pg_class WHERE relkind = 'r' AND relname = ANY(:names)"
+    ), {"names": [table.name for table in Base.metadata.sorted_tables]})
+    return dict(result.all())
+
+
+async def _run_services(session: AsyncSession, label: List[str], ids: Dict[str, int]):
+    missing = uuid_pkg.uuid4()
+    page = PageParams(after=(datetime.now(timezone.utc), 0), limit=50)
+    notebook_id, conversation_id, source_id = ids["notebook"], ids["conversation"], ids["source"]
+
+    async def run(name, coro):
+        label[0] = name
+        await coro
+
+    await run("get_all_notebooks", DatabaseService.get_all_notebooks(session, page))
+    await run("get_notebook", DatabaseService.get_notebook(session, missing))
+    await run("update_notebook_summary", DatabaseService.update_notebook_summary(session, missing, ""))
+    await run("get_conversations", DatabaseService.get_conversations(session, notebook_id, page))
+    await run("get_conversation", DatabaseService.get_conversation(session, missing))
+    await run("get_chat_history", DatabaseService.get_chat_history(session, conversation_id, page))
+    await run("get_recent_messages", DatabaseService.get_recent_messages(session, conversation_id, 10))
+    await run("count_messages", DatabaseService.count_messages(session, conversation_id))
+    await run("get_sources", DatabaseService.get_sources(session, notebook_id, page))
+    await run("get_source", DatabaseService.get_source(session, missing))
+    await run("get_all_api_keys", DatabaseService.get_all_api_keys(session, page))
+    await run("validate_api_key", DatabaseService.validate_api_key(session, "missing"))
+    await run("revoke_api_key", DatabaseService.revoke_api_key(session, missing))
+    await run("delete_api_key", DatabaseService.delete_api_key(session, missing))
+    await run("delete_conversation", DatabaseService.delete_conversation(session, missing))
+    await run("delete_source", DatabaseService.delete_source(session, missing))
+    await run("delete_notebook", DatabaseService.delete_notebook(session, missing))
+
+    await run("get_collection_count", vector_store.get_collection_count(session, notebook_id))
+    dimensions = settings.EMBEDDING_DIMENSIONS
+    await run("query", vector_store.query(
+        session, notebook_id, "redes", query_embedding=[1.0] + [0.0] * (dimensions - 1)
+    ))
+    await run("set_source_enabled", vector_store.set_source_enabled(session, notebook_id, source_id, False))
+    await run("delete_source_embeddings", vector_store.delete_source_embeddings(session, notebook_id, source_id))
+    await run("delete_collection", vector_store.delete_collection(session, notebook_id))
+
+    await run("get_job", ingestion_service.get_job(session, missing))
+    await run("claim_job", ingestion_service.claim_job(session, "check_query_plans"))
+    await run("claim_due_links", link_refresh_service.claim_due(session))
+
+
+def _foreign_keys() -> Iterator[Tuple[str, object]]:
+    for table in Base.metadata.sorted_tables:
+        for foreign_key in table.foreign_keys:
+            yield f"{foreign_key.ondelete or 'NO ACTION'} {table.name}.{foreign_key.parent.name}", foreign_key.parent
+
+
+async def _explain(connection: AsyncConnection, statement: str, parameters) -> dict:
+    result = await connection.exec_driver_sql(f"EXPLAIN (FORMAT JSON) {statement}", parameters)
+    plan = result.scalar()
+    return (json.loads(plan) if isinstance(plan, str) else plan)[0]["Plan"]
+
+
+async def check_plans(scale: float = 1.0) -> List[str]:
+    """Print the verdict for every plan and return the names of those scanning large tables sequentially."""
+    captured: List[Tuple[str, str, object]] = []
+    label = [""]
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith(CHECKED_STATEMENTS):
+            captured.append((label[0], statement, parameters))
+
+    failures = []
+    async with engine.connect() as connection:
+        transaction = await connection.begin()
+        try:
+            ids = await _seed(connection, scale)
+            rows = await _table_rows(connection)
+
+            async def check(name: str, statement: str, parameters):
+                scans = sorted(set(_seq_scans(await _explain(connection, statement, parameters))))
+                large = [
+                    table for table in scans
+                    if rows.get(table, 0) >= SMALL_TABLE_ROWS and (name, table) not in EXPECTED_SEQ_SCANS
+                ]
+                if large:
+                    failures.append(name)
+                verdict = "SEQ SCAN" if large else "ok"
+                print(f"{verdict:8}  {name}" + (f"  ({', '.join(scans)})" if scans else ""))
+
+            session = AsyncSession(bind=connection, join_transaction_mode="create_savepoint",
+                                   expire_on_commit=False)
+            event.listen(engine.sync_engine, "before_cursor_execute", capture)
+            try:
+                await _run_services(session, label, ids)
+            finally:
+                event.remove(engine.sync_engine, "before_cursor_execute", capture)
+
+            for name, statement, parameters in captured:
+                if "set_config" in statement:
+                    continue
+                await check(name, statement, parameters)
+
+            for name, column in _foreign_keys():
+                # Look up a referenced value that exists, as a cascade from a real parent would
+                value = (await connection.execute(
+                    select(column).where(column.isnot(None)).limit(1)
+                )).scalar()
+                compiled = select(column).where(column == (value or 0)).compile(connection.sync_connection)
+                await check(name, str(compiled), tuple(compiled.params[key] for key in compiled.positiontup))
+        finally:
+            await transaction.rollback()
+    await engine.dispose()
+    return failures
+
+
+async def main(scale: float) -> int:
+    failures = await check_plans(scale)
+    print(f"\n{len(failures)} plan(s) with sequential scans on tables of {SMALL_TABLE_ROWS}+ rows")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--scale", type=float, default=1.0, help="multiplier of the top-level SEED_ROWS counts")
+    args = parser.parse_args()
+    sys.exit(asyncio.run(main(args.scale)))
@@ -0,0 +1,137 @@
+"""
+Local stand-in for the Estante de Livros API.
+
+    uv run python -m scripts.estante_stub --port 8765
+    uv run python -m scripts.estante_stub --check
+
+Serves the catalogue and download endpoints EstanteService uses, with an
+optional --delay per request to make pooling and caching visible. Point
+ESTANTE_BASE_URL at it to run the app without the real API. With --check it
+starts on a free port, runs EstanteService against it and verifies that
+concurrent identical lookups are coalesced, cached values are served, stale
+values are refreshed in the background and downloads are streamed to disk
+within the size limit.
+"""
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from collections import Counter
+from pathlib import Path
+import argparse
+import asyncio
+import json
+import re
+import tempfile
+import threading
+import time
+
+BOOK_BYTES = b"%PDF-1.4\n% estante stub\n"
+
+ROUTES = [
+    (re.compile(r"^/areasTecnologicas$"), lambda: [{"id": 1, "nome": "Informação e Comunicação"}]),
+    (re.compile(r"^/areaTecnologica/(\d+)/modalidades$"), lambda area: [{"id": 1, "nome": "Subsequente"}]),
+    (re.compile(r"^/areaTecnologica/(\d+)/modalidade/(\d+)/livros$"),
+     lambda area, modalidade: [{"id": 1, "titulo": "Redes de Computadores", "driveId": "stub-book"}]),
+]
+
+
+def make_server(port: int = 0, delay: float = 0.0) -> ThreadingHTTPServer:
+    hits = Counter()
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_GET(self):
+            hits[self.path] += 1
+            time.sleep(delay)
+            if not self.headers.get("Authorization", "").startswith("Basic "):
+                return self._send(401, b"{}", "application/json")
+            if self.path.startswith("/livros/") and self.path.endswith("/download"):
+                return self._send(200, BOOK_BYTES, "application/pdf")
+            for pattern, handler in ROUTES:
+                match = pattern.match(self.path)
+                if match:
+                    body = json.dumps(handler(*match.groups())).encode()
+                    return self._send(200, body, "application/json")
+            self._send(404, b"{}", "application/json")
+
+        def _send(self, status: int, body: bytes, content_type: str):
+            self.send_response(status)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", port), Handler)
+    server.hits = hits
+    return server
+
+
+async def check(delay: float) -> None:
+    from app.core import settings
+    from app.core.http_client import close_http_client
+
+    server = make_server(delay=delay)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    settings.ESTANTE_BASE_URL = f"http://127.0.0.1:{server.server_port}"
+    settings.ESTANTE_USERNAME = settings.ESTANTE_USERNAME or "stub"
+    settings.ESTANTE_PASSWORD = settings.ESTANTE_PASSWORD or "stub"
+
+    from app.services.estante import EstanteService
+    service = EstanteService()
+    try:
+        started = time.perf_counter()
+        results = await asyncio.gather(*(service.get_areas() for _ in range(20)))
+        elapsed = time.perf_counter() - started
+        assert all(result == results[0] for result in results)
+        assert server.hits["/areasTecnologicas"] == 1, server.hits
+        print(f"ok  20 concurrent lookups, 1 upstream request ({elapsed * 1000:.0f} ms)")
+
+        started = time.perf_counter()
+        await service.get_areas()
+        print(f"ok  cached lookup ({(time.perf_counter() - started) * 1000:.2f} ms)")
+
+        service.catalogue_cache.ttl = 0
+        await service.get_areas()
+        await asyncio.sleep(delay + 0.2)
+        assert server.hits["/areasTecnologicas"] == 2, server.hits
+        print("ok  stale value served, refreshed in the background")
+
+        await service.get_livros(1, 1)
+        with tempfile.TemporaryDirectory() as directory:
+            path = Path(directory) / "book.pdf"
+            size = await service.download_book("stub-book", path, max_bytes=1024)
+            assert path.read_bytes() == BOOK_BYTES and size == len(BOOK_BYTES)
+            print(f"ok  streamed download ({size} bytes)")
+            try:
+                await service.download_book("stub-book", path, max_bytes=len(BOOK_BYTES) - 1)
+                raise AssertionError("size limit not enforced")
+            except ValueError:
+                print("ok  download above the size limit rejected")
+        print(f"    cache {service.stats()}")
+    finally:
+        await close_http_client()
+        server.shutdown()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--delay", type=float, default=0.05, help="Seconds to wait before each response")
+    parser.add_argument("--check", action="store_true", help="Run EstanteService against the stub and exit")
+    args = parser.parse_args()
+
+    if args.check:
+        asyncio.run(check(args.delay))
+        return
+    server = make_server(args.port, args.delay)
+    print(f"Estante stub on http://127.0.0.1:{server.server_port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
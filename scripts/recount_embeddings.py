@@ -0,0 +1,38 @@
+"""
+Recompute the embedding counters of notebooks from document_embeddings.
+
+    uv run python -m scripts.recount_embeddings            # every notebook
+    uv run python -m scripts.recount_embeddings <uuid>...  # selected notebooks
+
+The counters are kept up to date by the vector store; run this after editing
+document_embeddings by hand or if chat reports an empty notebook that is not.
+Counts written while ingestion is running may be off by the rows inserted
+concurrently, so prefer a quiet moment (or run it twice).
+"""
+from app.db.base import async_session_maker, engine
+from app.services import DatabaseService, vector_store
+import argparse
+import asyncio
+import uuid as uuid_pkg
+
+
+async def main(notebook_ids):
+    async with async_session_maker() as db:
+        if not notebook_ids:
+            fixed = await vector_store.recompute_counts(db)
+        else:
+            fixed = 0
+            for public_id in notebook_ids:
+                notebook = await DatabaseService.get_notebook(db, uuid_pkg.UUID(public_id))
+                if notebook is None:
+                    print(f"Notebook {public_id} not found")
+                    continue
+                fixed += await vector_store.recompute_counts(db, notebook.id)
+    await engine.dispose()
+    print(f"Fixed the counters of {fixed} notebook(s)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("notebook_ids", nargs="*", help="public ids of the notebooks to recount")
+    asyncio.run(main(parser.parse_args().notebook_ids))
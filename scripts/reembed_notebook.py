@@ -0,0 +1,133 @@
+"""
+Re-embed a notebook at another embedding dimension.
+
+    uv run python -m scripts.reembed_notebook <uuid> --dimensions 256
+
+The ANN index for the new dimension is built first (CREATE INDEX CONCURRENTLY,
+skipped when it exists). Every chunk is then re-embedded into an unlogged
+staging table, reembed_<notebook>_<dimensions>, committing each batch, so
+no transaction stays open for the run and ingestion keeps writing meanwhile.
+An interrupted run resumes from the staged rows. Only the switch holds the
+notebook row locked: chunks stored during the run are embedded, the
+embeddings are copied over and the dimension is changed in one short
+transaction, which ingestion of the notebook waits for. The staging table is
+dropped afterwards. Chat
+searches the old embeddings until it commits. Cached answers of the running
+app stay valid (the chunks are unchanged); similarity lookups skip those
+cached at the old dimension.
+"""
+from sqlalchemy import column, exists, insert, select, table, text, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.sql.expression import TableClause
+from pgvector.sqlalchemy import BIT, Vector
+from app.db.base import async_session_maker, engine
+from app.db.vector_indexes import ensure_ann_index
+from app.models import DocumentEmbedding, Notebook
+from app.services import DatabaseService, vector_store
+from app.services.vector_store import quantize_binary
+import argparse
+import asyncio
+import uuid as uuid_pkg
+
+
+def staging_table(notebook_id: int, dimensions: int) -> TableClause:
+    return table(
+        f"reembed_{notebook_id}_{dimensions}",
+        column("id"), column("embedding", Vector()), column("embedding_bits", BIT(varying=True))
+    )
+
+
+async def embed_missing(db: AsyncSession, reembedded: TableClause, notebook_id: int, dimensions: int,
+                        batch_size: int, commit: bool) -> int:
+    """
+    Embed the notebook's chunks that are not in the staging table yet,
+    committing each batch if commit is set. Returns how many.
+    """
+    embedded, last_id = 0, 0
+    while True:
+        rows = (await db.execute(
+            select(DocumentEmbedding.id, DocumentEmbedding.content)
+            .where(
+                DocumentEmbedding.notebook_id == notebook_id,
+                DocumentEmbedding.id > last_id,
+                ~exists().where(reembedded.c.id == DocumentEmbedding.id)
+            )
+            .order_by(DocumentEmbedding.id)
+            .limit(batch_size)
+        )).all()
+        if not rows:
+            return embedded
+        if commit:
+            # Do not sit idle in a transaction while the embeddings are requested
+            await db.commit()
+        embeddings = await vector_store.embed_documents([row.content for row in rows], dimensions)
+        await db.execute(insert(reembedded), [
+            {"id": row.id, "embedding": embedding, "embedding_bits": quantize_binary(embedding)}
+            for row, embedding in zip(rows, embeddings)
+        ])
+        if commit:
+            await db.commit()
+        embedded += len(rows)
+        last_id = rows[-1].id
+        print(f"  {embedded} chunk(s) re-embedded")
+
+
+async def main(public_id: str, dimensions: int, batch_size: int):
+    async with async_session_maker() as db:
+        notebook = await DatabaseService.get_notebook(db, uuid_pkg.UUID(public_id))
+        if notebook is None:
+            raise SystemExit(f"Notebook {public_id} not found")
+        notebook_id = notebook.id
+        if notebook.embedding_dimensions == dimensions:
+            raise SystemExit(f"Notebook {public_id} already uses {dimensions} dimensions")
+        await db.rollback()
+
+    index = await ensure_ann_index(engine, dimensions)
+    print(f"Index {index} ready")
+
+    reembedded = staging_table(notebook_id, dimensions)
+    async with async_session_maker() as db:
+        await db.execute(text(
+            f"CREATE UNLOGGED TABLE IF NOT EXISTS {reembedded.name} "
+            "(id bigint PRIMARY KEY, embedding vector NOT NULL, embedding_bits bit varying)"
+        ))
+        await db.commit()
+        await embed_missing(db, reembedded, notebook_id, dimensions, batch_size, commit=True)
+
+        current = (await db.execute(
+            select(Notebook.embedding_dimensions).where(Notebook.id == notebook_id).with_for_update()
+        )).scalar_one()
+        if current == dimensions:
+            await db.rollback()
+            await db.execute(text(f"DROP TABLE {reembedded.name}"))
+            await db.commit()
+            await engine.dispose()
+            print(f"Notebook {public_id} already uses {dimensions} dimensions")
+            return
+
+        # Chunks stored while the rest were embedded
+        late = await embed_missing(db, reembedded, notebook_id, dimensions, batch_size, commit=False)
+        rewritten = (await db.execute(
+            update(DocumentEmbedding)
+            .where(DocumentEmbedding.id == reembedded.c.id, DocumentEmbedding.notebook_id == notebook_id)
+            .values(embedding=reembedded.c.embedding, embedding_bits=reembedded.c.embedding_bits)
+            .execution_options(synchronize_session=False)
+        )).rowcount
+        await db.execute(
+            update(Notebook).where(Notebook.id == notebook_id).values(embedding_dimensions=dimensions)
+        )
+        await db.commit()
+        await db.execute(text(f"DROP TABLE {reembedded.name}"))
+        await db.commit()
+    await engine.dispose()
+    print(f"Notebook {public_id} moved from {current} to {dimensions} dimensions "
+          f"({rewritten} chunk(s), {late} stored during the run)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("notebook_id", help="public id of the notebook to re-embed")
+    parser.add_argument("--dimensions", type=int, required=True, help="new embedding dimension")
+    parser.add_argument("--batch-size", type=int, default=500, help="chunks re-embedded per round")
+    args = parser.parse_args()
+    asyncio.run(main(args.notebook_id, args.dimensions, args.batch_size))
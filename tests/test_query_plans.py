@@ -0,0 +1,22 @@
+"""
+Service queries are served by indexes under realistic statistics.
+
+Needs a migrated database at DATABASE_URL and is skipped when none is
+reachable:
+
+    uv run --extra test pytest
+"""
+from scripts.check_query_plans import check_plans
+import asyncio
+import pytest
+
+# Small enough to seed in seconds, large enough that every big table stays above SMALL_TABLE_ROWS
+SCALE = 0.2
+
+
+def test_queries_avoid_sequential_scans():
+    try:
+        failures = asyncio.run(check_plans(SCALE))
+    except OSError as e:
+        pytest.skip(f"No database at DATABASE_URL: {e}")
+    assert not failures, f"Sequential scans in: {', '.join(failures)}"